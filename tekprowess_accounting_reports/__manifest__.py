@@ -30,12 +30,21 @@ All reports support:
     'website': 'https://www.tekprowess.com',
     'depends': [
         'account',
+        'tekprowess_dashboard',
     ],
     'data': [
         'security/ir.model.access.csv',
+        'security/security.xml',
+        'data/account_balance_monthly_data.xml',
+        'data/report_job_data.xml',
+        'data/report_cache_data.xml',
+        'data/consolidation_data.xml',
+        'data/aged_balance_snapshot_data.xml',
         'views/report_templates.xml',
         'views/financial_report_wizard_views.xml',
         'views/dashboard_view.xml',
+        'views/report_job_views.xml',
+        'views/aged_balance_snapshot_views.xml',
         'views/menuitems.xml',
     ],
     'assets': {
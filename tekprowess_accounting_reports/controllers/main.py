@@ -2,8 +2,15 @@
 
 from odoo import http
 from odoo.http import request, content_disposition
+from werkzeug.wsgi import wrap_file
 import json
 
+EXPORT_CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
 
 class FinancialReportController(http.Controller):
 
@@ -14,21 +21,43 @@ class FinancialReportController(http.Controller):
         """
         options = json.loads(options)
         report_obj = request.env[model].new({})
-        
-        # Get report content
-        content = report_obj.get_xlsx(options)
-        
+        return self._make_file_response(
+            report_obj, report_obj._get_xlsx_file(options), 'xlsx', token,
+        )
+
+    @http.route('/tekprowess_accounting_reports/export/<any(csv, parquet):output_format>', type='http', auth='user')
+    def download_data(self, model, options, output_format, token='dummy', **kwargs):
+        """
+        Download the raw lines of a financial report as CSV or Parquet, the
+        format being the one of the route
+        """
+        options = json.loads(options)
+        report_obj = request.env[model].new({})
+        if output_format == 'csv':
+            export_file = report_obj._get_csv_file(options)
+        else:
+            export_file = report_obj._get_parquet_file(options)
+        return self._make_file_response(report_obj, export_file, output_format, token)
+
+    def _make_file_response(self, report_obj, export_file, output_format, token):
+        """Stream an exported temporary file, closed (and deleted) once sent"""
+        export_file.seek(0, 2)
+        content_length = export_file.tell()
+        export_file.seek(0)
+
         # Determine filename
         report_name = report_obj._get_report_name().lower().replace(' ', '_')
-        filename = f"{report_name}.xlsx"
-        
+        filename = f"{report_name}.{output_format}"
+
         response = request.make_response(
-            content,
+            wrap_file(request.httprequest.environ, export_file),
             headers=[
-                ('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
-                ('Content-Disposition', content_disposition(filename))
+                ('Content-Type', EXPORT_CONTENT_TYPES[output_format]),
+                ('Content-Disposition', content_disposition(filename)),
+                ('Content-Length', content_length),
             ]
         )
+        response.direct_passthrough = True
         response.set_cookie('fileToken', token)
         return response
 
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 
+from . import account_balance_monthly
+from . import ledger_change
+from . import account_account
+from . import res_currency_rate
+from . import account_move_line
 from . import financial_report
 from .import profit_loss_report
 from . import balance_sheet_report
@@ -10,3 +15,6 @@ from . import partner_ledger_report
 from . import aged_partner_report
 from . import tax_report
 from . import account_journal
+from . import report_job
+from . import account_partial_reconcile
+from . import aged_balance_snapshot
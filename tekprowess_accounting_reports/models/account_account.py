@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class AccountAccount(models.Model):
+    _inherit = 'account.account'
+
+    # Account codes, names and types are displayed and grouped on by every
+    # report: any change outdates the cached results of all companies
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['tekprowess.ledger.change']._mark([None])
+        return super().create(vals_list)
+
+    def _write(self, vals):
+        self.env['tekprowess.ledger.change']._mark([None])
+        return super()._write(vals)
+
+    def unlink(self):
+        self.env['tekprowess.ledger.change']._mark([None])
+        return super().unlink()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import create_index, drop_index
+from collections import defaultdict
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Move line fields whose change moves the line to another cube cell or changes its amounts
+CUBE_FIELDS = {
+    'company_id', 'account_id', 'partner_id', 'journal_id', 'date', 'parent_state', 'debit', 'credit',
+}
+
+PENDING_KEY = 'tekprowess_accounting_reports.balance_cube'
+
+# Columns identifying a cube cell, partner_id being stored as 0 when empty in the keys
+CUBE_KEY = SQL("company_id, account_id, COALESCE(partner_id, 0), journal_id, month, posted")
+
+
+class AccountBalanceMonthly(models.Model):
+    """Debit and credit of the draft and posted move lines summed per month.
+
+    Every transaction touching move lines (creation, amount or account
+    change, posting, reset to draft, cancellation, deletion) inserts the
+    changes of the cells it touched as new rows, so that the reports can
+    read whole months from here instead of scanning every move line. A cell
+    is the sum of its rows; the rows are only inserted, never updated, so
+    concurrent postings on the same account and month do not contend. A
+    cron merges the rows of each cell. Like the move lines, the cube
+    is filtered on companies only; reports read the move lines instead for
+    users restricted by other record rules (see ``_is_usable``).
+    """
+    _name = 'tekprowess.account.balance.monthly'
+    _description = 'Monthly Account Balance'
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', string='Company', required=True, readonly=True)
+    account_id = fields.Many2one('account.account', string='Account', required=True, readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Partner', readonly=True)
+    journal_id = fields.Many2one('account.journal', string='Journal', required=True, readonly=True)
+    month = fields.Date(string='Month', required=True, readonly=True)
+    posted = fields.Boolean(string='Posted', readonly=True)
+    debit = fields.Float(string='Debit', readonly=True)
+    credit = fields.Float(string='Credit', readonly=True)
+
+    def init(self):
+        # Cells are made of several delta rows now
+        drop_index(self.env.cr, 'tekprowess_account_balance_monthly_cell_uniq', self._table)
+        create_index(
+            self.env.cr, 'tekprowess_account_balance_monthly_cell_index', self._table,
+            ['company_id', 'account_id', 'month'],
+        )
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def _get_line_amounts(self, line_ids):
+        """Debit and credit of the given move lines summed per cell holding them
+
+        :return: {cell key: [debit, credit]}
+        """
+        if not line_ids:
+            return {}
+        self.env.cr.execute(SQL("""
+            SELECT company_id, account_id, COALESCE(partner_id, 0), journal_id,
+                   date_trunc('month', date)::date, parent_state = 'posted', SUM(debit), SUM(credit)
+              FROM account_move_line
+             WHERE id IN %s AND parent_state IN ('draft', 'posted')
+          GROUP BY company_id, account_id, COALESCE(partner_id, 0), journal_id,
+                   date_trunc('month', date)::date, parent_state = 'posted'
+        """, tuple(line_ids)))
+        return {tuple(row[:6]): [row[6], row[7]] for row in self.env.cr.fetchall()}
+
+    def _mark_lines(self, line_ids, before=True):
+        """Register move lines about to change (``before``) or just created.
+
+        The amounts of the lines are taken out of the cells holding them
+        before their first change in the transaction, and added to the cells
+        holding them once the transaction is flushed.
+        """
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(PENDING_KEY)
+        if pending is None:
+            pending = precommit.data[PENDING_KEY] = {'deltas': defaultdict(lambda: [0.0, 0.0]), 'line_ids': set()}
+            precommit.add(self._sync_pending)
+        # Lines already registered were created in the transaction or have
+        # their initial amounts taken out already
+        line_ids = [line_id for line_id in line_ids if line_id not in pending['line_ids']]
+        if before:
+            for key, (debit, credit) in self._get_line_amounts(line_ids).items():
+                pending['deltas'][key][0] -= debit
+                pending['deltas'][key][1] -= credit
+        pending['line_ids'].update(line_ids)
+
+    def _sync_pending(self):
+        """Apply the changes of the cells touched by the current transaction"""
+        pending = self.env.cr.precommit.data.pop(PENDING_KEY, None)
+        if not pending:
+            return
+        # Lines changed by this flush register themselves in a new pending set
+        self.env['account.move.line'].flush_model(CUBE_FIELDS)
+        deltas = pending['deltas']
+        for key, (debit, credit) in self._get_line_amounts(pending['line_ids']).items():
+            deltas[key][0] += debit
+            deltas[key][1] += credit
+        deltas = {key: amounts for key, amounts in deltas.items() if any(amounts)}
+        if deltas:
+            self._apply_deltas(deltas)
+
+    def _apply_deltas(self, deltas):
+        """Add the given {cell key: [debit, credit]} amounts to the cells, as
+        new rows: no existing row is locked, whatever the cells."""
+        self.env.cr.execute(SQL("""
+            INSERT INTO tekprowess_account_balance_monthly
+                   (company_id, account_id, partner_id, journal_id, month, posted, debit, credit)
+            VALUES %s
+        """, SQL(", ").join(
+            SQL("(%s, %s, NULLIF(%s, 0), %s, %s::date, %s, %s, %s)", *key, debit, credit)
+            for key, (debit, credit) in deltas.items()
+        )))
+        self.invalidate_model()
+
+    @api.model
+    def _cron_compact(self):
+        """Merge the rows of each cell made of several ones into one, and
+        drop the cells summing to nothing. The rows inserted meanwhile by
+        other transactions are not seen, hence kept as they are."""
+        self.env.cr.execute(SQL("""
+            WITH cells (company_id, account_id, partner_id, journal_id, month, posted) AS (
+                SELECT %(key)s
+                  FROM tekprowess_account_balance_monthly
+              GROUP BY %(key)s
+                HAVING COUNT(*) > 1
+            ), merged AS (
+                DELETE FROM tekprowess_account_balance_monthly cube
+                 USING cells
+                 WHERE cube.company_id = cells.company_id
+                   AND cube.account_id = cells.account_id
+                   AND COALESCE(cube.partner_id, 0) = cells.partner_id
+                   AND cube.journal_id = cells.journal_id
+                   AND cube.month = cells.month
+                   AND cube.posted = cells.posted
+             RETURNING cube.company_id, cube.account_id, cube.partner_id, cube.journal_id,
+                       cube.month, cube.posted, cube.debit, cube.credit
+            )
+            INSERT INTO tekprowess_account_balance_monthly
+                   (company_id, account_id, partner_id, journal_id, month, posted, debit, credit)
+            SELECT company_id, account_id, partner_id, journal_id, month, posted, SUM(debit), SUM(credit)
+              FROM merged
+          GROUP BY company_id, account_id, partner_id, journal_id, month, posted
+            HAVING ROUND(SUM(debit)::numeric, 6) != 0 OR ROUND(SUM(credit)::numeric, 6) != 0
+        """, key=CUBE_KEY))
+        _logger.info("Monthly account balances: %s cells compacted", self.env.cr.rowcount)
+        self.invalidate_model()
+
+    @api.model
+    def _is_usable(self):
+        """Whether the cube may stand for the move lines the current user
+        reads (raises if they may not read move lines at all). The cube is
+        only filtered on companies: when a record rule restricts the move
+        lines on anything else, they must be read instead.
+        """
+        self.env['account.move.line'].check_access('read')
+        domain = self.env['ir.rule']._compute_domain('account.move.line', 'read') or []
+        return all(not isinstance(leaf, (list, tuple)) or leaf[0] == 'company_id' for leaf in domain)
+
+    @api.model
+    def _rebuild(self, company_ids=None):
+        """Recompute the whole cube, or the cells of ``company_ids``, from the
+        move lines. Run at installation; can be called from a shell to repair
+        the cube after move lines were changed in SQL."""
+        self.env['account.move.line'].flush_model(CUBE_FIELDS)
+        company_filter = SQL("company_id IN %s", tuple(company_ids)) if company_ids else SQL("TRUE")
+        self.env.cr.execute(SQL(
+            "DELETE FROM tekprowess_account_balance_monthly WHERE %s", company_filter,
+        ))
+        self.env.cr.execute(SQL("""
+            INSERT INTO tekprowess_account_balance_monthly
+                   (company_id, account_id, partner_id, journal_id, month, posted, debit, credit)
+            SELECT company_id, account_id, partner_id, journal_id, date_trunc('month', date)::date,
+                   parent_state = 'posted', SUM(debit), SUM(credit)
+              FROM account_move_line
+             WHERE parent_state IN ('draft', 'posted') AND %s
+          GROUP BY company_id, account_id, partner_id, journal_id,
+                   date_trunc('month', date)::date, parent_state = 'posted'
+        """, company_filter))
+        _logger.info("Monthly account balances: %s cells rebuilt", self.env.cr.rowcount)
+        self.invalidate_model()
+
+    # -------------------------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------------------------
+
+    def _query_account_balances(self, accounts, options, date_from=None,
+                                month_from=None, month_to=None, excluded_month=None):
+        """Initial and period debit / credit per account read from the cube.
+
+        Only the months from ``month_from`` (included) to ``month_to``
+        (excluded) are read, ``excluded_month`` left aside; months before
+        ``date_from`` make the initial balance.
+
+        :return: [(account_id, initial_debit, initial_credit, period_debit, period_credit)]
+        """
+        self._sync_pending()
+        conditions = [
+            SQL("company_id = %s", self.env.company.id),
+            SQL("account_id IN %s", tuple(accounts.ids)),
+        ]
+        if not options.get('all_entries'):
+            conditions.append(SQL("posted"))
+        if options.get('journals'):
+            conditions.append(SQL("journal_id IN %s", tuple(options['journals'])))
+        if month_from:
+            conditions.append(SQL("month >= %s", month_from))
+        if month_to:
+            conditions.append(SQL("month < %s", month_to))
+        if excluded_month:
+            conditions.append(SQL("month != %s", excluded_month))
+        is_initial = SQL("month < %s", date_from) if date_from else SQL("FALSE")
+        self.env.cr.execute(SQL("""
+            SELECT account_id,
+                   SUM(CASE WHEN %(initial)s THEN debit ELSE 0 END),
+                   SUM(CASE WHEN %(initial)s THEN credit ELSE 0 END),
+                   SUM(CASE WHEN %(initial)s THEN 0 ELSE debit END),
+                   SUM(CASE WHEN %(initial)s THEN 0 ELSE credit END)
+              FROM tekprowess_account_balance_monthly
+             WHERE %(where)s
+          GROUP BY account_id
+        """, initial=is_initial, where=SQL(" AND ").join(conditions)))
+        return self.env.cr.fetchall()
+
+    def _query_account_balances_multi(self, accounts, options, month_ranges):
+        """Debit / credit per account over several ranges of months read
+        from the cube with one grouped query.
+
+        Every range is a (month_from, month_to) pair of optional bounds,
+        month_from included and month_to excluded, or None to read nothing
+        for that range.
+
+        :return: [(account_id, debit_1, credit_1, debit_2, credit_2, ...)]
+        """
+        self._sync_pending()
+        conditions = [
+            SQL("company_id = %s", self.env.company.id),
+            SQL("account_id IN %s", tuple(accounts.ids)),
+        ]
+        if not options.get('all_entries'):
+            conditions.append(SQL("posted"))
+        if options.get('journals'):
+            conditions.append(SQL("journal_id IN %s", tuple(options['journals'])))
+
+        in_ranges = []
+        aggregates = []
+        for month_range in month_ranges:
+            if month_range:
+                month_from, month_to = month_range
+                in_range = SQL("%s AND %s",
+                               SQL("month >= %s", month_from) if month_from else SQL("TRUE"),
+                               SQL("month < %s", month_to) if month_to else SQL("TRUE"))
+                in_ranges.append(SQL("(%s)", in_range))
+            else:
+                in_range = SQL("FALSE")
+            aggregates += [
+                SQL("SUM(debit) FILTER (WHERE %s)", in_range),
+                SQL("SUM(credit) FILTER (WHERE %s)", in_range),
+            ]
+        conditions.append(SQL("(%s)", SQL(" OR ").join(in_ranges)))
+        self.env.cr.execute(SQL("""
+            SELECT account_id, %(aggregates)s
+              FROM tekprowess_account_balance_monthly
+             WHERE %(where)s
+          GROUP BY account_id
+        """, aggregates=SQL(", ").join(aggregates), where=SQL(" AND ").join(conditions)))
+        return self.env.cr.fetchall()
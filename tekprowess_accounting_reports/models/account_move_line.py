@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+from .account_balance_monthly import CUBE_FIELDS
+
+
+class AccountMoveLine(models.Model):
+    _inherit = 'account.move.line'
+
+    def _mark_ledger_change(self):
+        """Outdate the report results of the companies of the lines once the
+        current transaction is committed."""
+        if self:
+            self.env['tekprowess.ledger.change']._mark(self.sudo().company_id.ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['tekprowess.account.balance.monthly']._mark_lines(lines.ids, before=False)
+        lines._mark_ledger_change()
+        return lines
+
+    def _write(self, vals):
+        # _write also receives the related fields flushed from the move, i.e.
+        # its state when it is posted, reset to draft or cancelled
+        if self.ids and CUBE_FIELDS.intersection(vals):
+            self.env['tekprowess.account.balance.monthly']._mark_lines(self.ids)
+        # Any field may be displayed (labels, reconciliation, ...)
+        self._mark_ledger_change()
+        if vals.get('company_id'):
+            self.env['tekprowess.ledger.change']._mark([vals['company_id']])
+        return super()._write(vals)
+
+    def unlink(self):
+        self.env['tekprowess.account.balance.monthly']._mark_lines(self.ids)
+        self._mark_ledger_change()
+        return super().unlink()
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+from odoo.tools.sql import create_index
+
+
+class AccountPartialReconcile(models.Model):
+    _inherit = 'account.partial.reconcile'
+
+    def init(self):
+        super().init()
+        # Reconciliations replayed by the aged report as of a past date
+        create_index(
+            self.env.cr, 'account_partial_reconcile_company_max_date_index', self._table,
+            ['company_id', 'max_date'],
+        )
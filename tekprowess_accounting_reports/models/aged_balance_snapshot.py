@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from dateutil.relativedelta import relativedelta
+
+from .aged_partner_report import AGING_PERIODS
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class AgedBalanceSnapshot(models.Model):
+    """Aged receivable / payable balances per partner and bucket at past
+    month-ends, to follow the aging over time."""
+    _name = 'tekprowess.aged.balance.snapshot'
+    _description = 'Aged Balance Snapshot'
+    _order = 'date desc, report_type, partner_id, bucket_index'
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', string='Company', required=True, readonly=True, index=True)
+    date = fields.Date(string='Date', required=True, readonly=True)
+    report_type = fields.Selection([
+        ('receivable', 'Receivable'),
+        ('payable', 'Payable'),
+    ], string='Type', required=True, readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Partner', readonly=True)
+    bucket_index = fields.Integer(string='Bucket Sequence', readonly=True)
+    bucket = fields.Char(string='Bucket', readonly=True)
+    amount = fields.Float(string='Amount', readonly=True)
+
+    @api.model
+    def _get_month_ends(self, months):
+        """The last ``months`` month-ends before today, most recent first"""
+        first_of_month = fields.Date.context_today(self).replace(day=1)
+        return [first_of_month - relativedelta(months=index, days=1) for index in range(months)]
+
+    @api.model
+    def _generate(self, dates, periods=AGING_PERIODS):
+        """Compute the snapshots of the current company at each of ``dates``,
+        receivable and payable, replacing the existing ones.
+
+        All the dates are aged at once: one query per report type, inserting
+        its result directly.
+        """
+        company_id = self.env.company.id
+        self.env.cr.execute(SQL(
+            "DELETE FROM tekprowess_aged_balance_snapshot WHERE company_id = %s AND date IN %s",
+            company_id, tuple(dates),
+        ))
+        report = self.env['tekprowess.aged.partner.report']
+        labels = report._get_aging_labels(periods)
+        days_due = report._get_days_due()
+        bucket_index = SQL("CASE WHEN %s <= 0 THEN 0 %s ELSE %s END", days_due, SQL(" ").join(
+            SQL("WHEN %s <= %s THEN %s", days_due, period, index)
+            for index, period in enumerate(periods, start=1)
+        ), len(periods) + 1)
+
+        for report_type in ('receivable', 'payable'):
+            options = {'report_type': report_type}
+            query = report._get_aged_query(options, dates)
+            query.groupby = SQL("aged.cutoff, account_move_line.partner_id, %s", bucket_index)
+            self.env.cr.execute(SQL("""
+                INSERT INTO tekprowess_aged_balance_snapshot
+                       (company_id, date, report_type, partner_id, bucket_index, bucket, amount)
+                SELECT company_id, date, report_type, partner_id, bucket_index,
+                       (%(labels)s::varchar[])[bucket_index + 1], amount
+                  FROM (%(select)s) AS aged_buckets (company_id, date, report_type, partner_id, bucket_index, amount)
+                 WHERE amount != 0
+            """,
+                labels=labels,
+                select=query.select(
+                    SQL("%s", company_id),
+                    SQL("aged.cutoff"),
+                    SQL("%s", report_type),
+                    SQL("account_move_line.partner_id"),
+                    bucket_index,
+                    SQL("SUM(aged.amount * %s)", report._get_sign(options)),
+                ),
+            ))
+            _logger.info(
+                "Aged balance snapshots: %s %s rows at %s dates for company %s",
+                self.env.cr.rowcount, report_type, len(dates), company_id,
+            )
+        self.invalidate_model()
+
+    @api.model
+    def _cron_generate(self, months=24):
+        """Snapshot the last month-end of every company, or the last
+        ``months`` month-ends for the companies without any snapshot yet."""
+        for company in self.env['res.company'].search([]):
+            snapshots = self.with_company(company)
+            has_history = snapshots.search_count([('company_id', '=', company.id)], limit=1)
+            snapshots._generate(snapshots._get_month_ends(1 if has_history else months))
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from datetime import timedelta
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+# Default upper bounds (days overdue) of the aging buckets, the last bucket
+# gathering everything older
+AGING_PERIODS = (30, 60, 90, 120)
 
 
 class AgedPartnerReport(models.TransientModel):
@@ -19,162 +24,165 @@ class AgedPartnerReport(models.TransientModel):
             return "Aged Receivable"
         return "Aged Payable"
 
+    def _get_aging_periods(self, options):
+        """Upper bounds of the aging buckets, from the options (list or comma
+        separated string) or the default ones"""
+        periods = options.get('aging_periods') or AGING_PERIODS
+        if isinstance(periods, str):
+            periods = periods.split(',')
+        try:
+            periods = [int(period) for period in periods]
+        except (TypeError, ValueError):
+            raise UserError(_("The aging periods must be a list of numbers of days, e.g. 30,60,90,120."))
+        if any(period <= 0 for period in periods) or periods != sorted(set(periods)):
+            raise UserError(_("The aging periods must be positive and increasing, e.g. 30,60,90,120."))
+        return periods
+
     def _get_lines(self, options):
         lines = []
-        
-        # Determine account type and invoice types
-        if options.get('report_type', 'receivable') == 'receivable':
-            account_type = 'asset_receivable'
-            invoice_types = ['out_invoice', 'out_refund']
-        else:
-            account_type = 'liability_payable'
-            invoice_types = ['in_invoice', 'in_refund']
-        
-        # Get partners with outstanding balances
-        partners = self._get_partners_with_balance(account_type, options)
-        
-        total_buckets = {
-            'total': 0.0,
-            'current': 0.0,
-            '1_30': 0.0,
-            '31_60': 0.0,
-            '61_90': 0.0,
-            '91_120': 0.0,
-            'older': 0.0,
-        }
-        
-        as_of_date = fields.Date.from_string(options.get('date_to'))
-        
-        for partner in partners:
-            # Get unpaid/partially paid invoices
-            invoices = self.env['account.move'].search([
-                ('partner_id', '=', partner.id),
-                ('state', '=', 'posted'),
-                ('payment_state', 'in', ['not_paid', 'partial']),
-                ('move_type', 'in', invoice_types),
-                ('invoice_date', '<=', options.get('date_to')),
-            ])
-            
-            if not invoices:
-                continue
-            
-            # Age buckets
-            buckets = {
-                'current': 0.0,
-                '1_30': 0.0,
-                '31_60': 0.0,
-                '61_90': 0.0,
-                '91_120': 0.0,
-                'older': 0.0,
-            }
-            
-            for invoice in invoices:
-                amount_due = invoice.amount_residual
-                
-                # Handle refunds
-                if invoice.move_type in ['out_refund', 'in_refund']:
-                    amount_due = -amount_due
-                
-                if amount_due == 0:
-                    continue
-                
-                # Calculate days overdue from due date
-                due_date = invoice.invoice_date_due or invoice.invoice_date
-                if not due_date:
-                    continue
-                
-                days_due = (as_of_date - due_date).days
-                
-                # Categorize into buckets
-                if days_due <= 0:
-                    buckets['current'] += amount_due
-                elif days_due <= 30:
-                    buckets['1_30'] += amount_due
-                elif days_due <= 60:
-                    buckets['31_60'] += amount_due
-                elif days_due <= 90:
-                    buckets['61_90'] += amount_due
-                elif days_due <= 120:
-                    buckets['91_120'] += amount_due
-                else:
-                    buckets['older'] += amount_due
-            
-            partner_total = sum(buckets.values())
-            if partner_total == 0:
+        periods = self._get_aging_periods(options)
+        rows = self._query_aged_balances(options, periods)
+
+        # Total, not due, then one bucket per period and the older one
+        total_buckets = [0.0] * (len(periods) + 3)
+
+        for partner_id, partner_name, *buckets in rows:
+            if not any(buckets):
                 continue
-            
-            # Add partner line
+
             lines.append({
-                'id': f'partner_{partner.id}',
-                'name': partner.name,
+                'id': f'partner_{partner_id}' if partner_id else 'partner_unknown',
+                'name': partner_name or _('Unknown Partner'),
                 'level': 1,
-                'columns': [
-                    {'name': self._format_value(partner_total), 'no_format': partner_total},
-                    {'name': self._format_value(buckets['current']), 'no_format': buckets['current']},
-                    {'name': self._format_value(buckets['1_30']), 'no_format': buckets['1_30']},
-                    {'name': self._format_value(buckets['31_60']), 'no_format': buckets['31_60']},
-                    {'name': self._format_value(buckets['61_90']), 'no_format': buckets['61_90']},
-                    {'name': self._format_value(buckets['91_120']), 'no_format': buckets['91_120']},
-                    {'name': self._format_value(buckets['older']), 'no_format': buckets['older']},
-                ],
-                'caret_options': 'res.partner',
+                'columns': [self._make_amount_column(amount) for amount in buckets],
+                'caret_options': 'res.partner' if partner_id else None,
                 'unfoldable': True,
                 'unfolded': False,
             })
-            
+
             # Accumulate totals
-            total_buckets['total'] += partner_total
-            for key in ['current', '1_30', '31_60', '61_90', '91_120', 'older']:
-                total_buckets[key] += buckets[key]
-        
+            for index, amount in enumerate(buckets):
+                total_buckets[index] += amount
+
         # Add total line
         if lines:
             lines.append({
                 'name': _('Total'),
                 'level': 0,
                 'class': 'total o_account_reports_domain_total',
-                'columns': [
-                    {'name': self._format_value(total_buckets['total']), 'no_format': total_buckets['total']},
-                    {'name': self._format_value(total_buckets['current']), 'no_format': total_buckets['current']},
-                    {'name': self._format_value(total_buckets['1_30']), 'no_format': total_buckets['1_30']},
-                    {'name': self._format_value(total_buckets['31_60']), 'no_format': total_buckets['31_60']},
-                    {'name': self._format_value(total_buckets['61_90']), 'no_format': total_buckets['61_90']},
-                    {'name': self._format_value(total_buckets['91_120']), 'no_format': total_buckets['91_120']},
-                    {'name': self._format_value(total_buckets['older']), 'no_format': total_buckets['older']},
-                ],
+                'columns': [self._make_amount_column(amount) for amount in total_buckets],
             })
-        
+
         return lines
 
-    def _get_partners_with_balance(self, account_type, options):
-        """Get partners with outstanding balance"""
-        # Determine invoice types
-        if account_type == 'asset_receivable':
-            invoice_types = ['out_invoice', 'out_refund']
-        else:
-            invoice_types = ['in_invoice', 'in_refund']
-        
-        # Find invoices with residual amount
-        invoices = self.env['account.move'].search([
-            ('state', '=', 'posted'),
-            ('payment_state', 'in', ['not_paid', 'partial']),
-            ('move_type', 'in', invoice_types),
-            ('invoice_date', '<=', options.get('date_to')),
-            ('amount_residual', '!=', 0),
-        ])
-        
-        partner_ids = invoices.mapped('partner_id').filtered(lambda p: p)
-        return partner_ids.sorted('name')
+    def _get_aged_domain(self, options):
+        """Posted receivable / payable move lines of the report"""
+        account_type = 'asset_receivable' if options.get('report_type', 'receivable') == 'receivable' \
+            else 'liability_payable'
+        domain = [
+            ('company_id', '=', self.env.company.id),
+            ('account_id.account_type', '=', account_type),
+            ('parent_state', '=', 'posted'),
+        ]
+        if options.get('journals'):
+            domain.append(('journal_id', 'in', options['journals']))
+        return domain
+
+    def _get_aged_query(self, options, cutoffs):
+        """Query over the move lines open at each of the ``cutoffs`` dates,
+        joined to ``aged (cutoff, line_id, amount)``.
+
+        The residual of a line at a past date is its current residual plus
+        the partial reconciliations dated after that date, replayed in bulk:
+        a line appears once with its current residual (when still open) and
+        once per later partial, the amounts adding up to its residual at the
+        cutoff when summed.
+        """
+        amounts = SQL("""(
+            WITH cutoffs (cutoff) AS (VALUES %(cutoffs)s)
+            SELECT cutoffs.cutoff, aml.id AS line_id, aml.amount_residual AS amount
+              FROM cutoffs
+              JOIN account_move_line aml ON aml.date <= cutoffs.cutoff
+             WHERE aml.company_id = %(company_id)s AND aml.amount_residual != 0
+         UNION ALL
+            SELECT cutoffs.cutoff, partial.debit_move_id, partial.amount
+              FROM cutoffs
+              JOIN account_partial_reconcile partial ON partial.max_date > cutoffs.cutoff
+             WHERE partial.company_id = %(company_id)s
+         UNION ALL
+            SELECT cutoffs.cutoff, partial.credit_move_id, -partial.amount
+              FROM cutoffs
+              JOIN account_partial_reconcile partial ON partial.max_date > cutoffs.cutoff
+             WHERE partial.company_id = %(company_id)s
+        )""",
+            cutoffs=SQL(", ").join(SQL("(%s::date)", cutoff) for cutoff in cutoffs),
+            company_id=self.env.company.id,
+        )
+        query = self.env['account.move.line']._search(self._get_aged_domain(options))
+        query.add_join('JOIN', 'aged', amounts, SQL(
+            "aged.line_id = account_move_line.id AND account_move_line.date <= aged.cutoff"
+        ))
+        return query
+
+    def _get_days_due(self):
+        """Days between the cutoff and the due date of the line"""
+        return SQL("(aged.cutoff - COALESCE(account_move_line.date_maturity, account_move_line.date))")
+
+    def _get_sign(self, options):
+        """Sign making what the partner owes (receivable) or is owed (payable) positive"""
+        return 1 if options.get('report_type', 'receivable') == 'receivable' else -1
+
+    def _query_aged_balances(self, options, periods):
+        """Age the residual amount, as of the report date, of each open move
+        line by its due date and sum the buckets per partner, in a single
+        query.
+
+        :return: [(partner_id, partner_name, total, not_due, *period_buckets, older)]
+            ordered by partner name
+        """
+        as_of_date = options.get('date_to') or fields.Date.context_today(self)
+        query = self._get_aged_query(options, [as_of_date])
+        days_due = self._get_days_due()
+        residual = SQL("aged.amount * %s", self._get_sign(options))
+        buckets = [SQL("SUM(%s) FILTER (WHERE %s <= 0)", residual, days_due)]
+        lower = 0
+        for period in periods:
+            buckets.append(SQL(
+                "SUM(%s) FILTER (WHERE %s > %s AND %s <= %s)", residual, days_due, lower, days_due, period,
+            ))
+            lower = period
+        buckets.append(SQL("SUM(%s) FILTER (WHERE %s > %s)", residual, days_due, lower))
+
+        partner_name = SQL("(SELECT name FROM res_partner WHERE id = account_move_line.partner_id)")
+        query.groupby = SQL("account_move_line.partner_id")
+        query.order = SQL("%s, account_move_line.partner_id", partner_name)
+        self.env.cr.execute(query.select(
+            SQL("account_move_line.partner_id"),
+            partner_name,
+            SQL("SUM(%s)", residual),
+            *buckets,
+        ))
+        return [
+            (partner_id, name, *(amount or 0.0 for amount in amounts))
+            for partner_id, name, *amounts in self.env.cr.fetchall()
+        ]
+
+    def _get_aging_labels(self, periods):
+        """Labels of the aging buckets: not due, one per period, older"""
+        labels = [_('Not Due')]
+        lower = 0
+        for period in periods:
+            labels.append(_('%(start)s-%(end)s Days', start=lower + 1, end=period))
+            lower = period
+        labels.append(_('%s+ Days', lower))
+        return labels
 
     def _get_columns(self, options):
         """Define columns for aged partner report"""
+        periods = self._get_aging_periods(options)
         return [
             {'name': _('Partner'), 'class': 'text-left'},
             {'name': _('Total Due'), 'class': 'number'},
-            {'name': _('Not Due'), 'class': 'number'},
-            {'name': _('1-30 Days'), 'class': 'number'},
-            {'name': _('31-60 Days'), 'class': 'number'},
-            {'name': _('61-90 Days'), 'class': 'number'},
-            {'name': _('91-120 Days'), 'class': 'number'},
-            {'name': _('120+ Days'), 'class': 'number'},
+        ] + [
+            {'name': label, 'class': 'number'} for label in self._get_aging_labels(periods)
         ]
@@ -13,26 +13,41 @@ class BalanceSheetReport(models.TransientModel):
 
     def _get_lines(self, options):
         lines = []
+
+        # Cumulative balances of every balance sheet account, computed at once
+        accounts = self.env['account.account'].search([
+            ('account_type', 'in', [
+                'asset_receivable', 'asset_cash', 'asset_current', 'asset_prepayments',
+                'asset_non_current', 'asset_fixed', 'liability_current', 'liability_payable',
+                'liability_non_current', 'equity', 'equity_unaffected',
+            ]),
+            ('company_ids', 'in', [self.env.company.id]),
+        ])
+        # Balances as of the end of the period and of every comparison period
+        periods = self._get_report_periods(options)
+        balances = self._compute_account_balances_multi(
+            accounts, [(None, period['date_to']) for period in periods], options
+        )
         
         # ==================
         # ASSETS
         # ==================
-        lines.append(self._make_header(_('ASSETS')))
+        lines.append(self._make_header(_('ASSETS'), options))
         
         # Current Assets
         current_asset_types = ['asset_receivable', 'asset_cash', 'asset_current', 'asset_prepayments']
         current_assets_total = self._add_asset_section(
-            lines, _('Current Assets'), current_asset_types, options
+            lines, _('Current Assets'), current_asset_types, options, accounts, balances
         )
         
         # Non-Current Assets
         non_current_asset_types = ['asset_non_current', 'asset_fixed']
         non_current_assets_total = self._add_asset_section(
-            lines, _('Non-Current Assets'), non_current_asset_types, options
+            lines, _('Non-Current Assets'), non_current_asset_types, options, accounts, balances
         )
         
         # Total Assets
-        total_assets = current_assets_total + non_current_assets_total
+        total_assets = self._add_amounts(current_assets_total, non_current_assets_total)
         lines.append(self._make_total_line(
             _('TOTAL ASSETS'), total_assets, level=0, class_name='total o_account_reports_domain_total'
         ))
@@ -42,22 +57,22 @@ class BalanceSheetReport(models.TransientModel):
         # ==================
         # LIABILITIES
         # ==================
-        lines.append(self._make_header(_('LIABILITIES')))
+        lines.append(self._make_header(_('LIABILITIES'), options))
         
         # Current Liabilities
         current_liab_types = ['liability_current', 'liability_payable']
         current_liab_total = self._add_liability_section(
-            lines, _('Current Liabilities'), current_liab_types, options
+            lines, _('Current Liabilities'), current_liab_types, options, accounts, balances
         )
         
         # Non-Current Liabilities
         non_current_liab_types = ['liability_non_current']
         non_current_liab_total = self._add_liability_section(
-            lines, _('Non-Current Liabilities'), non_current_liab_types, options
+            lines, _('Non-Current Liabilities'), non_current_liab_types, options, accounts, balances
         )
         
         # Total Liabilities
-        total_liabilities = current_liab_total + non_current_liab_total
+        total_liabilities = self._add_amounts(current_liab_total, non_current_liab_total)
         lines.append(self._make_total_line(
             _('TOTAL LIABILITIES'), total_liabilities, level=0, class_name='total o_account_reports_level0'
         ))
@@ -67,9 +82,9 @@ class BalanceSheetReport(models.TransientModel):
         # ==================
         # EQUITY
         # ==================
-        lines.append(self._make_header(_('EQUITY')))
+        lines.append(self._make_header(_('EQUITY'), options))
         
-        equity_total = self._add_equity_section(lines, options)
+        equity_total = self._add_equity_section(lines, options, accounts, balances)
         
         lines.append(self._make_total_line(
             _('TOTAL EQUITY'), equity_total, level=0, class_name='total o_account_reports_level0'
@@ -78,7 +93,7 @@ class BalanceSheetReport(models.TransientModel):
         lines.append({'name': ''})  # Blank line
         
         # Total Liabilities + Equity
-        total_liab_equity = total_liabilities + equity_total
+        total_liab_equity = self._add_amounts(total_liabilities, equity_total)
         lines.append(self._make_total_line(
             _('TOTAL LIABILITIES + EQUITY'), 
             total_liab_equity, 
@@ -88,7 +103,7 @@ class BalanceSheetReport(models.TransientModel):
         
         return lines
 
-    def _add_asset_section(self, lines, title, account_types, options):
+    def _add_asset_section(self, lines, title, account_types, options, accounts, balances):
         """Add asset section"""
         lines.append({
             'name': title,
@@ -97,32 +112,21 @@ class BalanceSheetReport(models.TransientModel):
             'columns': self._get_blank_columns(options),
         })
         
-        accounts = self.env['account.account'].search([
-            ('account_type', 'in', account_types),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        total = 0.0
+        total = [0.0] * len(self._get_report_periods(options))
         
-        for account in accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                date_from=None,  # Balance sheet is cumulative
-                date_to=options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            balance = balance_data['balance']
+        for account in accounts.filtered(lambda account: account.account_type in account_types):
+            amounts = [period['balance'] for period in balances[account.id]]
             
-            if balance == 0 and not options.get('unfold_all'):
+            if not any(amounts) and not options.get('unfold_all'):
                 continue
             
-            total += balance
+            total = self._add_amounts(total, amounts)
             
             lines.append({
                 'id': f'account_{account.id}',
                 'name': f"{account.code} {account.name}",
                 'level': 3,
-                'columns': [{'name': self._format_value(balance)}],
+                'columns': self._make_balance_columns(amounts),
                 'caret_options': 'account',
             })
         
@@ -131,12 +135,12 @@ class BalanceSheetReport(models.TransientModel):
             'name': f"{_('Total')} {title}",
             'level': 2,
             'class': 'total',
-            'columns': [{'name': self._format_value(total)}],
+            'columns': self._make_balance_columns(total),
         })
         
         return total
 
-    def _add_liability_section(self, lines, title, account_types, options):
+    def _add_liability_section(self, lines, title, account_types, options, accounts, balances):
         """Add liability section"""
         lines.append({
             'name': title,
@@ -145,33 +149,22 @@ class BalanceSheetReport(models.TransientModel):
             'columns': self._get_blank_columns(options),
         })
         
-        accounts = self.env['account.account'].search([
-            ('account_type', 'in', account_types),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        total = 0.0
+        total = [0.0] * len(self._get_report_periods(options))
         
-        for account in accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                date_from=None,  # Balance sheet is cumulative
-                date_to=options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
+        for account in accounts.filtered(lambda account: account.account_type in account_types):
             # Liabilities are shown as positive (credit balance)
-            balance = -balance_data['balance']
+            amounts = [-period['balance'] for period in balances[account.id]]
             
-            if balance == 0 and not options.get('unfold_all'):
+            if not any(amounts) and not options.get('unfold_all'):
                 continue
             
-            total += balance
+            total = self._add_amounts(total, amounts)
             
             lines.append({
                 'id': f'account_{account.id}',
                 'name': f"{account.code} {account.name}",
                 'level': 3,
-                'columns': [{'name': self._format_value(balance)}],
+                'columns': self._make_balance_columns(amounts),
                 'caret_options': 'account',
             })
         
@@ -180,115 +173,95 @@ class BalanceSheetReport(models.TransientModel):
             'name': f"{_('Total')} {title}",
             'level': 2,
             'class': 'total',
-            'columns': [{'name': self._format_value(total)}],
+            'columns': self._make_balance_columns(total),
         })
         
         return total
 
-    def _add_equity_section(self, lines, options):
+    def _add_equity_section(self, lines, options, accounts, balances):
         """Add equity section"""
-        accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['equity', 'equity_unaffected']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
+        total = [0.0] * len(self._get_report_periods(options))
         
-        total = 0.0
-        
-        for account in accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                date_from=None,
-                date_to=options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
+        for account in accounts.filtered(lambda account: account.account_type in ('equity', 'equity_unaffected')):
             # Equity is shown as positive (credit balance)
-            balance = -balance_data['balance']
+            amounts = [-period['balance'] for period in balances[account.id]]
             
-            if balance == 0 and not options.get('unfold_all'):
+            if not any(amounts) and not options.get('unfold_all'):
                 continue
             
-            total += balance
+            total = self._add_amounts(total, amounts)
             
             lines.append({
                 'id': f'account_{account.id}',
                 'name': f"{account.code} {account.name}",
                 'level': 2,
-                'columns': [{'name': self._format_value(balance)}],
+                'columns': self._make_balance_columns(amounts),
                 'caret_options': 'account',
             })
         
         # Add current year earnings
         current_year_earnings = self._compute_current_year_earnings(options)
-        if current_year_earnings != 0 or options.get('unfold_all'):
+        if any(current_year_earnings) or options.get('unfold_all'):
             lines.append({
                 'name': _('Current Year Earnings'),
                 'level': 2,
-                'columns': [{'name': self._format_value(current_year_earnings)}],
+                'columns': self._make_balance_columns(current_year_earnings),
             })
-            total += current_year_earnings
+            total = self._add_amounts(total, current_year_earnings)
         
         return total
 
     def _compute_current_year_earnings(self, options):
-        """Compute current year unallocated earnings"""
-        # Get profit/loss for the period
-        income_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['income', 'income_other']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        expense_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['expense', 'expense_depreciation', 'expense_direct_cost']),
+        """Compute the unallocated earnings of the fiscal year of the period
+        and of every comparison period"""
+        # Get profit/loss for the periods
+        accounts = self.env['account.account'].search([
+            ('account_type', 'in', ['income', 'income_other',
+                                     'expense', 'expense_depreciation', 'expense_direct_cost']),
             ('company_ids', 'in', [self.env.company.id]),
         ])
+        ranges = []
+        for period in self._get_report_periods(options):
+            fiscalyear_start = self.env.company.compute_fiscalyear_dates(period['date_to'])['date_from']
+            ranges.append((fiscalyear_start, period['date_to']))
+        balances = self._compute_account_balances_multi(accounts, ranges, options)
         
-        income_total = 0.0
-        for account in income_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                date_from=self.env.company.compute_fiscalyear_dates(
-                    fields.Date.from_string(options['date_to'])
-                )['date_from'],
-                date_to=options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            income_total -= balance_data['balance']  # Income is credit
-        
-        expense_total = 0.0
-        for account in expense_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                date_from=self.env.company.compute_fiscalyear_dates(
-                    fields.Date.from_string(options['date_to'])
-                )['date_from'],
-                date_to=options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            expense_total += balance_data['balance']  # Expense is debit
-        
-        return income_total - expense_total
+        # Income is credit, expense is debit: the earnings are the opposite of the total balance
+        return [
+            -sum(balances[account.id][index]['balance'] for account in accounts)
+            for index in range(len(ranges))
+        ]
 
-    def _make_header(self, name):
+    def _add_amounts(self, amounts, other_amounts):
+        """Sum two lists of amounts, period by period"""
+        return [amount + other_amount for amount, other_amount in zip(amounts, other_amounts)]
+
+    def _make_balance_columns(self, amounts):
+        """Columns of the balance as of the end of the period and of every
+        comparison period"""
+        return [self._make_amount_column(amount) for amount in amounts]
+
+    def _make_header(self, name, options):
         """Create a header line"""
         return {
             'name': name,
             'level': 0,
             'class': 'o_account_reports_level0',
-            'columns': [{'name': ''}],
+            'columns': self._get_blank_columns(options),
         }
 
-    def _make_total_line(self, name, amount, level=1, class_name='total'):
+    def _make_total_line(self, name, amounts, level=1, class_name='total'):
         """Create a total line"""
         return {
             'name': name,
             'level': level,
             'class': class_name,
-            'columns': [{'name': self._format_value(amount)}],
+            'columns': self._make_balance_columns(amounts),
         }
 
     def _get_blank_columns(self, options):
         """Get blank columns"""
-        return [{'name': ''}]
+        return [{'name': ''}] * len(self._get_report_periods(options))
 
     def _get_columns(self, options):
         """Override columns for balance sheet"""
@@ -296,4 +269,7 @@ class BalanceSheetReport(models.TransientModel):
         return [
             {'name': 'Account'},
             {'name': f"As of {date_str}"},
+        ] + [
+            {'name': f"As of {period['date_to']}"}
+            for period in self._get_comparison_periods(options)
         ]
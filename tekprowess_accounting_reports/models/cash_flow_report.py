@@ -1,7 +1,39 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from collections import defaultdict
+from odoo.exceptions import UserError
+from datetime import timedelta
+import json
+
+# Sections of the statement fed by the accounts of each type. A type may feed
+# several sections: depreciation is part of the net income and added back as
+# a non-cash item.
+CASH_FLOW_SECTIONS = ('cash', 'net_income', 'non_cash', 'working_capital', 'investing', 'financing')
+
+CASH_FLOW_MAPPING = {
+    'asset_cash': ['cash'],
+    'liability_credit_card': ['cash'],
+    'income': ['net_income'],
+    'income_other': ['net_income'],
+    'expense': ['net_income'],
+    'expense_direct_cost': ['net_income'],
+    'expense_depreciation': ['net_income', 'non_cash'],
+    'asset_receivable': ['working_capital'],
+    'liability_payable': ['working_capital'],
+    'asset_fixed': ['investing'],
+    'asset_non_current': ['investing'],
+    'liability_non_current': ['financing'],
+    'equity': ['financing'],
+}
+
+
+def _masked_sum(vector, mask):
+    """Sum of the items of ``vector`` selected by the boolean ``mask``"""
+    return sum(value for value, selected in zip(vector, mask) if selected)
+
+
+def _and_mask(mask, other_mask):
+    return [selected and other_selected for selected, other_selected in zip(mask, other_mask)]
 
 
 class CashFlowReport(models.TransientModel):
@@ -12,71 +44,125 @@ class CashFlowReport(models.TransientModel):
     def _get_report_name(self):
         return "Cash Flow Statement"
 
+    def _get_cash_flow_mapping(self, options):
+        """Sections fed by each account type, from the options, the
+        ``tekprowess_accounting_reports.cash_flow_mapping`` parameter (JSON)
+        or the default ones
+
+        :return: {account_type: [section, ...]}
+        """
+        mapping = options.get('cash_flow_mapping') or self.env['ir.config_parameter'].sudo().get_param(
+            'tekprowess_accounting_reports.cash_flow_mapping') or CASH_FLOW_MAPPING
+        if isinstance(mapping, str):
+            try:
+                mapping = json.loads(mapping)
+            except ValueError:
+                raise UserError(_("The cash flow mapping must be a JSON object of account types and sections."))
+        account_types = dict(self.env['account.account']._fields['account_type'].selection)
+        if not isinstance(mapping, dict) or any(
+            account_type not in account_types
+            or not isinstance(sections, list)
+            or any(section not in CASH_FLOW_SECTIONS for section in sections)
+            for account_type, sections in mapping.items()
+        ):
+            raise UserError(_(
+                "The cash flow mapping must map account types to lists of sections among %s.",
+                ', '.join(CASH_FLOW_SECTIONS),
+            ))
+        return mapping
+
+    def _get_balance_matrix(self, account_types, options):
+        """Opening, period and closing balance of every account of the given
+        types, from one balance computation.
+
+        :return: (rows, matrix) where ``rows`` are the account rows (see
+            ``_get_account_rows``) and ``matrix`` holds one vector per
+            'opening' / 'period' / 'closing' balance, aligned on ``rows``
+        """
+        date_from = fields.Date.to_date(options.get('date_from'))
+        ranges = [(date_from, options.get('date_to'))]
+        if date_from:
+            ranges.append((None, date_from - timedelta(days=1)))
+        rows = self._get_account_rows(account_types, ranges, options, order='code')
+
+        period = [row['balances'][0]['balance'] for row in rows]
+        opening = [row['balances'][1]['balance'] if date_from else 0.0 for row in rows]
+        closing = [initial + movement for initial, movement in zip(opening, period)]
+        return rows, {'opening': opening, 'period': period, 'closing': closing}
+
     def _get_lines(self, options):
         lines = []
-        
-        # Get cash accounts
-        cash_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['asset_cash', 'liability_credit_card']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        if not cash_accounts:
+
+        # One balance matrix for every account used by the statement; each
+        # section is then a masked sum over its columns
+        mapping = self._get_cash_flow_mapping(options)
+        rows, matrix = self._get_balance_matrix(list(mapping), options)
+        types = [row['account_type'] for row in rows]
+        masks = {
+            section: [section in mapping[account_type] for account_type in types]
+            for section in CASH_FLOW_SECTIONS
+        }
+
+        if not any(masks['cash']):
             return [{
                 'name': _('No cash accounts found'),
                 'columns': [{'name': ''}],
             }]
-        
+
         # Beginning Cash Balance
-        beginning_balance = self._get_beginning_cash_balance(cash_accounts, options)
+        beginning_balance = _masked_sum(matrix['opening'], masks['cash'])
         lines.append({
             'name': _('Beginning Cash Balance'),
             'level': 0,
             'class': 'o_account_reports_level0',
-            'columns': [{'name': self._format_value(beginning_balance)}],
+            'columns': [self._make_amount_column(beginning_balance)],
         })
-        
+
         lines.append({'name': ''})  # Blank line
-        
+
         # ==================
         # OPERATING ACTIVITIES
         # ==================
         lines.append(self._make_header(_('Cash Flow from Operating Activities')))
-        
-        operating_cash = self._add_operating_activities(lines, options)
-        
+
+        operating_cash = self._add_operating_activities(lines, types, matrix, masks)
+
         lines.append(self._make_total_line(
             _('Net Cash from Operating Activities'), operating_cash, level=1
         ))
-        
+
         lines.append({'name': ''})  # Blank line
-        
+
         # ==================
         # INVESTING ACTIVITIES
         # ==================
         lines.append(self._make_header(_('Cash Flow from Investing Activities')))
-        
-        investing_cash = self._add_investing_activities(lines, options)
-        
+
+        investing_cash = self._add_account_activities(
+            lines, rows, matrix, masks['investing'], _('No investing activities')
+        )
+
         lines.append(self._make_total_line(
             _('Net Cash from Investing Activities'), investing_cash, level=1
         ))
-        
+
         lines.append({'name': ''})  # Blank line
-        
+
         # ==================
         # FINANCING ACTIVITIES
         # ==================
         lines.append(self._make_header(_('Cash Flow from Financing Activities')))
-        
-        financing_cash = self._add_financing_activities(lines, options)
-        
+
+        financing_cash = self._add_account_activities(
+            lines, rows, matrix, masks['financing'], _('No financing activities')
+        )
+
         lines.append(self._make_total_line(
             _('Net Cash from Financing Activities'), financing_cash, level=1
         ))
-        
+
         lines.append({'name': ''})  # Blank line
-        
+
         # ==================
         # NET CHANGE & ENDING BALANCE
         # ==================
@@ -84,238 +170,102 @@ class CashFlowReport(models.TransientModel):
         lines.append(self._make_total_line(
             _('Net Change in Cash'), net_change, level=0, class_name='total'
         ))
-        
-        ending_balance = beginning_balance + net_change
+
+        # Cash moved against accounts no section is mapped to
+        ending_balance = _masked_sum(matrix['closing'], masks['cash'])
+        unclassified = ending_balance - beginning_balance - net_change
+        if not self.env.company.currency_id.is_zero(unclassified):
+            lines.append(self._make_total_line(
+                _('Unclassified Cash Movements'), unclassified, level=1
+            ))
+
         lines.append(self._make_total_line(
-            _('Ending Cash Balance'), 
-            ending_balance, 
-            level=0, 
+            _('Ending Cash Balance'),
+            ending_balance,
+            level=0,
             class_name='total o_account_reports_domain_total'
         ))
-        
-        return lines
 
-    def _get_beginning_cash_balance(self, cash_accounts, options):
-        """Get cash balance at start of period"""
-        total = 0.0
-        for account in cash_accounts:
-            balance = self._compute_initial_balance(
-                account, options.get('date_from')
-            )
-            total += balance
-        return total
+        return lines
 
-    def _add_operating_activities(self, lines, options):
+    def _add_operating_activities(self, lines, types, matrix, masks):
         """Add operating activities section"""
         total = 0.0
-        
-        # Net Income (from P&L)
-        net_income = self._get_net_income(options)
+        period = matrix['period']
+
+        # Net Income (from P&L): income is credit, expense is debit
+        net_income = -_masked_sum(period, masks['net_income'])
         lines.append({
             'name': _('Net Income'),
             'level': 2,
-            'columns': [{'name': self._format_value(net_income)}],
+            'columns': [self._make_amount_column(net_income)],
         })
         total += net_income
-        
+
         # Adjustments for non-cash items
         lines.append({
             'name': _('Adjustments for Non-Cash Items:'),
             'level': 2,
             'columns': [{'name': ''}],
         })
-        
+
         # Depreciation
-        depreciation_accounts = self.env['account.account'].search([
-            ('account_type', '=', 'expense_depreciation'),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        depreciation_total = 0.0
-        for account in depreciation_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                options.get('date_from'),
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            depreciation_total += balance_data['balance']
-        
+        depreciation_total = _masked_sum(period, masks['non_cash'])
+
         if depreciation_total != 0:
             lines.append({
                 'name': _('  Depreciation and Amortization'),
                 'level': 3,
-                'columns': [{'name': self._format_value(depreciation_total)}],
+                'columns': [self._make_amount_column(depreciation_total)],
             })
             total += depreciation_total
-        
+
         # Changes in Working Capital
         lines.append({
             'name': _('Changes in Working Capital:'),
             'level': 2,
             'columns': [{'name': ''}],
         })
-        
-        # Accounts Receivable
-        receivable_change = self._get_working_capital_change(
-            ['asset_receivable'], options
-        )
-        if receivable_change != 0:
-            lines.append({
-                'name': _('  Accounts Receivable'),
-                'level': 3,
-                'columns': [{'name': self._format_value(-receivable_change)}],
-            })
-            total -= receivable_change
-        
-        # Accounts Payable
-        payable_change = self._get_working_capital_change(
-            ['liability_payable'], options
-        )
-        if payable_change != 0:
-            lines.append({
-                'name': _('  Accounts Payable'),
-                'level': 3,
-                'columns': [{'name': self._format_value(payable_change)}],
-            })
-            total += payable_change
-        
-        return total
 
-    def _add_investing_activities(self, lines, options):
-        """Add investing activities section"""
-        total = 0.0
-        
-        # Fixed Assets purchases/sales
-        fixed_asset_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['asset_fixed', 'asset_non_current']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        for account in fixed_asset_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                options.get('date_from'),
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            balance = balance_data['balance']
-            
-            if balance == 0:
-                continue
-            
-            lines.append({
-                'name': f"{account.code} {account.name}",
-                'level': 2,
-                'columns': [{'name': self._format_value(-balance)}],
-            })
-            total -= balance
-        
-        if total == 0:
-            lines.append({
-                'name': _('No investing activities'),
-                'level': 2,
-                'columns': [{'name': '-'}],
-            })
-        
+        # One line per account type: an increase of the balance uses cash
+        type_names = dict(self.env['account.account']._fields['account_type'].selection)
+        for account_type in dict.fromkeys(types):
+            type_mask = _and_mask(masks['working_capital'], [row_type == account_type for row_type in types])
+            change = -_masked_sum(period, type_mask)
+            if change != 0:
+                lines.append({
+                    'name': f"  {type_names.get(account_type, account_type)}",
+                    'level': 3,
+                    'columns': [self._make_amount_column(change)],
+                })
+                total += change
+
         return total
 
-    def _add_financing_activities(self, lines, options):
-        """Add financing activities section"""
+    def _add_account_activities(self, lines, rows, matrix, mask, empty_label):
+        """Add one line per account of ``mask`` moved during the period and
+        return the total cash flow"""
         total = 0.0
-        
-        # Loans and equity
-        financing_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['liability_non_current', 'equity']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        for account in financing_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                options.get('date_from'),
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            balance = balance_data['balance']
-            
-            if balance == 0:
+
+        for row, balance, selected in zip(rows, matrix['period'], mask):
+            if not selected or balance == 0:
                 continue
-            
+
             lines.append({
-                'name': f"{account.code} {account.name}",
+                'name': row['name'],
                 'level': 2,
-                'columns': [{'name': self._format_value(-balance)}],
+                'columns': [self._make_amount_column(-balance)],
             })
             total -= balance
-        
+
         if total == 0:
             lines.append({
-                'name': _('No financing activities'),
+                'name': empty_label,
                 'level': 2,
                 'columns': [{'name': '-'}],
             })
-        
-        return total
 
-    def _get_net_income(self, options):
-        """Calculate net income for the period"""
-        income_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['income', 'income_other']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        expense_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['expense', 'expense_depreciation', 'expense_direct_cost']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        income_total = 0.0
-        for account in income_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                options.get('date_from'),
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            income_total -= balance_data['balance']
-        
-        expense_total = 0.0
-        for account in expense_accounts:
-            balance_data = self._compute_account_balance(
-                account,
-                options.get('date_from'),
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            expense_total += balance_data['balance']
-        
-        return income_total - expense_total
-
-    def _get_working_capital_change(self, account_types, options):
-        """Get change in working capital accounts"""
-        accounts = self.env['account.account'].search([
-            ('account_type', 'in', account_types),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
-        beginning_balance = 0.0
-        ending_balance = 0.0
-        
-        for account in accounts:
-            beginning_balance += self._compute_initial_balance(
-                account, options.get('date_from')
-            )
-            
-            balance_data = self._compute_account_balance(
-                account,
-                date_from=None,
-                date_to=options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            ending_balance += balance_data['balance']
-        
-        return ending_balance - beginning_balance
+        return total
 
     def _make_header(self, name):
         """Create a header line"""
@@ -332,7 +282,7 @@ class CashFlowReport(models.TransientModel):
             'name': name,
             'level': level,
             'class': class_name,
-            'columns': [{'name': self._format_value(amount)}],
+            'columns': [self._make_amount_column(amount)],
         }
 
     def _get_columns(self, options):
@@ -1,11 +1,25 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from odoo.tools import date_utils
+from odoo.exceptions import UserError
+from odoo.tools import date_utils, SQL
+from odoo.osv import expression
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
 import io
 import base64
+import csv
+import tempfile
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo.addons.tekprowess_dashboard.models.perf_log import profiled
+
+from .report_cache import report_cache
+from .report_job import normalize_options, options_key
+
+# Number of report lines written at once by the CSV / Parquet exports
+EXPORT_CHUNK_SIZE = 10000
 
 
 class FinancialReportAbstract(models.AbstractModel):
@@ -26,22 +40,71 @@ class FinancialReportAbstract(models.AbstractModel):
             columns.append({'name': f"{options['date_from']} to {options['date_to']}"})
         
         # Add comparison columns if enabled
-        if options.get('comparison'):
+        comparison_periods = self._get_comparison_periods(options)
+        if len(comparison_periods) == 1:
             columns.append({'name': 'Previous Period'})
             columns.append({'name': 'Variation'})
             columns.append({'name': 'Variation %'})
+        else:
+            columns += [{'name': period['name']} for period in comparison_periods]
         
         return columns
 
     @api.model
-    def get_report_data(self, options):
-        """Get report data for client action"""
+    @profiled
+    def get_report_data(self, options, line_id=None):
+        """Get report data for client action
+
+        With ``line_id``, only return the lines to display under that line
+        once unfolded, for reports loading them lazily.
+
+        Results are cached per worker and served again for the same options
+        as long as the ledger of the company did not change.
+        """
+        key = self._get_report_cache_key(options, line_id)
+        version = self.env['tekprowess.ledger.change']._get_version(self._get_report_companies(options))
+        data = report_cache.get(key, version)
+        if data is not None:
+            return data
+
         report = self.create({})
-        return {
-            'lines': report._get_lines(options),
-            'columns': report._get_columns(options),
-            'report_name': report._get_report_name(),
-        }
+        if line_id:
+            data = {'lines': report._get_unfolded_lines(line_id, options)}
+        else:
+            data = {
+                'lines': report._get_lines(options),
+                'columns': report._get_columns(options),
+                'report_name': report._get_report_name(),
+            }
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        report_cache.set(
+            key, version, data,
+            ttl=int(ICP.get_param('tekprowess_accounting_reports.report_cache_ttl', 300)),
+            max_size=int(ICP.get_param('tekprowess_accounting_reports.report_cache_size', 128)),
+        )
+        return data
+
+    def _get_report_cache_key(self, options, line_id=None):
+        """Key of a report result: the options are hashed with everything
+        else the result depends on (companies, language, access rights)"""
+        return (
+            self.env.cr.dbname,
+            frozenset(self._get_report_companies(options).ids),
+            options_key(
+                self._name,
+                normalize_options(options),
+                line_id,
+                self.env.companies.ids,
+                self.env.lang,
+                sorted(self.env.user.groups_id.ids),
+            ),
+        )
+
+    @api.model
+    def get_cache_stats(self):
+        """Hit/miss counters of the report cache of the current worker."""
+        return report_cache.stats()
 
     @api.model
     def action_open_line(self, line_id, options):
@@ -99,6 +162,20 @@ class FinancialReportAbstract(models.AbstractModel):
         """Override in child classes to generate report lines"""
         return []
 
+    def _iter_lines(self, options):
+        """Generate the report lines; overridden by the reports able to
+        produce them one by one, which exports consume without holding
+        the whole report in memory"""
+        yield from self._get_lines(options)
+
+    def _get_unfolded_lines(self, line_id, options):
+        """Override in child classes loading the children of a line lazily"""
+        return []
+
+    def _get_export_options(self, options):
+        """Options of the PDF / Excel exports, which include every line"""
+        return dict(options, export=True)
+
     def _format_value(self, value, figure_type='monetary'):
         """Format values for display"""
         if figure_type == 'monetary':
@@ -108,6 +185,10 @@ class FinancialReportAbstract(models.AbstractModel):
         else:
             return str(value) if value else '-'
 
+    def _make_amount_column(self, amount):
+        """Amount column, keeping the raw value for the exports"""
+        return {'name': self._format_value(amount), 'no_format': amount}
+
     def _get_account_move_lines(self, options, accounts=None):
         """Get account move lines based on options"""
         domain = [('company_id', '=', self.env.company.id)]
@@ -134,50 +215,136 @@ class FinancialReportAbstract(models.AbstractModel):
         
         return self.env['account.move.line'].search(domain)
 
-    def _compute_account_balance(self, account, date_from=None, date_to=None, state='posted'):
-        """Compute balance for an account"""
-        domain = [
-            ('account_id', '=', account.id),
-            ('company_id', '=', self.env.company.id),
-        ]
-        
-        if date_from:
-            domain.append(('date', '>=', date_from))
+    def _get_balance_domain(self, options, accounts=None, date_to=None):
+        """Domain of the move lines making the balances of ``accounts``"""
+        domain = [('company_id', '=', self.env.company.id)]
+        if accounts is not None:
+            domain.append(('account_id', 'in', accounts.ids))
         if date_to:
             domain.append(('date', '<=', date_to))
-        
-        if state == 'posted':
-            domain.append(('parent_state', '=', 'posted'))
-        else:
+        if options.get('all_entries'):
             domain.append(('parent_state', '!=', 'cancel'))
-        
-        move_lines = self.env['account.move.line'].search(domain)
-        
-        balance = sum(move_lines.mapped('debit')) - sum(move_lines.mapped('credit'))
-        debit = sum(move_lines.mapped('debit'))
-        credit = sum(move_lines.mapped('credit'))
-        
-        return {
-            'balance': balance,
-            'debit': debit,
-            'credit': credit,
+        else:
+            domain.append(('parent_state', '=', 'posted'))
+        if options.get('journals'):
+            domain.append(('journal_id', 'in', options['journals']))
+        return domain
+
+    def _compute_account_balances(self, accounts, date_from=None, date_to=None, options=None, with_initial=True):
+        """Compute initial, period and ending balances of several accounts at once
+
+        The move lines dated before ``date_from`` make the initial balance and
+        the ones between ``date_from`` and ``date_to`` the period movement;
+        without ``date_from`` every line up to ``date_to`` is period movement.
+        Whole months are read from the monthly balances
+        (``tekprowess.account.balance.monthly``) and only the partial months
+        at the edges of the range from the move lines, each source with one
+        grouped query; users whose move lines are restricted by record rules
+        other than the company ones have everything read from the move
+        lines. Reports only needing the period movement pass
+        ``with_initial=False`` so that nothing before ``date_from`` is read.
+
+        :return: {account_id: {'initial'|'period'|'ending': {'debit', 'credit', 'balance'}}}
+        """
+        options = options or {}
+        balances = {
+            account.id: {
+                key: {'debit': 0.0, 'credit': 0.0, 'balance': 0.0}
+                for key in ('initial', 'period', 'ending')
+            }
+            for account in accounts
         }
+        if not accounts:
+            return balances
+
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        start = date_from if not with_initial else None
+
+        # Whole months of the range: from month_from (included) to month_to
+        # (excluded), except the month split by date_from
+        month_from = None
+        if start:
+            month_from = start if start.day == 1 else start.replace(day=1) + relativedelta(months=1)
+        month_to = None
+        if date_to:
+            next_day = date_to + timedelta(days=1)
+            month_to = next_day if next_day.day == 1 else date_to.replace(day=1)
+        split_month = date_from.replace(day=1) if date_from and date_from.day != 1 else None
+
+        domain = self._get_balance_domain(options, accounts, date_to)
+        if start:
+            domain.append(('date', '>=', start))
+
+        rows = []
+        if (month_from and month_to and month_from >= month_to) \
+                or not self.env['tekprowess.account.balance.monthly']._is_usable():
+            # Less than a month, or move lines restricted by record rules:
+            # everything is read from the move lines
+            rows += self._query_move_line_balances(domain, date_from)
+        else:
+            rows += self.env['tekprowess.account.balance.monthly']._query_account_balances(
+                accounts, options, date_from, month_from, month_to, split_month,
+            )
+            edges = []
+            if month_from and start < month_from:
+                edges.append([('date', '<', month_from)])
+            if month_to and month_to <= date_to:
+                edges.append([('date', '>=', month_to)])
+            if split_month:
+                edges.append([('date', '>=', split_month), ('date', '<', split_month + relativedelta(months=1))])
+            if edges:
+                rows += self._query_move_line_balances(domain + expression.OR(edges), date_from)
+
+        for account_id, initial_debit, initial_credit, period_debit, period_credit in rows:
+            account_balances = balances[account_id]
+            for key, debit, credit in (
+                ('initial', initial_debit, initial_credit),
+                ('period', period_debit, period_credit),
+            ):
+                account_balances[key]['debit'] += debit
+                account_balances[key]['credit'] += credit
+                account_balances[key]['balance'] += debit - credit
+        for account_balances in balances.values():
+            account_balances['ending'] = {
+                key: account_balances['initial'][key] + account_balances['period'][key]
+                for key in ('debit', 'credit', 'balance')
+            }
+        return balances
+
+    def _query_move_line_balances(self, domain, date_from=None):
+        """Initial (before ``date_from``) and period debit / credit per account
+        of the move lines matching ``domain``, from one grouped query.
+
+        :return: [(account_id, initial_debit, initial_credit, period_debit, period_credit)]
+        """
+        query = self.env['account.move.line']._search(domain)
+        query.groupby = SQL('account_move_line.account_id')
+        is_initial = SQL('account_move_line.date < %s', date_from) if date_from else SQL('FALSE')
+        self.env.cr.execute(query.select(
+            SQL('account_move_line.account_id'),
+            SQL('SUM(CASE WHEN %s THEN account_move_line.debit ELSE 0 END)', is_initial),
+            SQL('SUM(CASE WHEN %s THEN account_move_line.credit ELSE 0 END)', is_initial),
+            SQL('SUM(CASE WHEN %s THEN 0 ELSE account_move_line.debit END)', is_initial),
+            SQL('SUM(CASE WHEN %s THEN 0 ELSE account_move_line.credit END)', is_initial),
+        ))
+        return self.env.cr.fetchall()
+
+    def _compute_account_balance(self, account, date_from=None, date_to=None, state='posted'):
+        """Compute balance for an account"""
+        balances = self._compute_account_balances(
+            account, date_from, date_to, {'all_entries': state != 'posted'}
+        )
+        return balances[account.id]['period']
 
     def _compute_initial_balance(self, account, date_from):
         """Compute initial balance before date_from"""
         if not date_from:
             return 0.0
-        
-        domain = [
-            ('account_id', '=', account.id),
-            ('company_id', '=', self.env.company.id),
-            ('date', '<', date_from),
-            ('parent_state', '=', 'posted'),
-        ]
-        
-        move_lines = self.env['account.move.line'].search(domain)
-        return sum(move_lines.mapped('debit')) - sum(move_lines.mapped('credit'))
+        balances = self._compute_account_balances(account, date_from, date_from)
+        return balances[account.id]['initial']['balance']
 
+    @profiled
     def get_pdf(self, options):
         """Get report as PDF file content"""
         # Construct template name dynamically
@@ -187,7 +354,7 @@ class FinancialReportAbstract(models.AbstractModel):
         
         # Create report instance and calculate data
         report = self.create({})
-        lines = report._get_lines(options)
+        lines = report._get_lines(self._get_export_options(options))
         columns = report._get_columns(options)
         
         data = {
@@ -208,50 +375,160 @@ class FinancialReportAbstract(models.AbstractModel):
 
         # Render PDF
         # We use strict=False to avoid errors if qweb context is slightly different
-        pdf_content, _ = report_action._render_qweb_pdf(report_action.id, res_ids=report.ids, data=data)
+        pdf_content, _content_type = report_action._render_qweb_pdf(report_action.id, res_ids=report.ids, data=data)
         return pdf_content
 
+    @profiled
     def get_xlsx(self, options):
         """Get report as Excel file content"""
+        with self._get_xlsx_file(options) as xlsx_file:
+            return xlsx_file.read()
+
+    def _get_xlsx_file(self, options):
+        """Write the report as Excel into a temporary file.
+
+        The workbook is written in xlsxwriter's constant memory mode, row by
+        row as the lines are generated, so that the size of the report only
+        costs disk space. The caller must close the returned file, positioned
+        at its start, which deletes it.
+        """
         try:
-            from io import BytesIO
             import xlsxwriter
         except ImportError:
             raise UserError(_("The 'xlsxwriter' Python module is not installed. Please install it with: pip install xlsxwriter"))
-        
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        sheet = workbook.add_worksheet(self._get_report_name())
-        
-        # Formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#D3D3D3',
-            'border': 1
-        })
-        
-        # Write headers
-        columns = self._get_columns(options)
-        for col_idx, column in enumerate(columns):
-            sheet.write(0, col_idx, column['name'], header_format)
-        
-        # Write data
-        lines = self._get_lines(options)
-        row = 1
-        for line in lines:
-            # Column 0: Name (with indentation)
-            indent = line.get('level', 0)
-            name_format = workbook.add_format({'indent': indent})
-            sheet.write(row, 0, line.get('name', ''), name_format)
-
-            # Columns 1+: Data
-            for col_idx, col_data in enumerate(line.get('columns', [])):
-                sheet.write(row, col_idx + 1, col_data.get('name', ''))
-            row += 1
-        
-        workbook.close()
-        output.seek(0)
-        return output.read()
+
+        output = tempfile.TemporaryFile()
+        try:
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+            sheet = workbook.add_worksheet(self._get_report_name()[:31])
+
+            # Formats
+            header_format = workbook.add_format({
+                'bold': True,
+                'bg_color': '#D3D3D3',
+                'border': 1
+            })
+            number_format = workbook.add_format({'num_format': '#,##0.00'})
+            indent_formats = {}
+
+            # Write headers
+            columns = self._get_columns(options)
+            for col_idx, column in enumerate(columns):
+                sheet.write(0, col_idx, column['name'], header_format)
+
+            # Write data
+            row = 1
+            for line in self._iter_lines(self._get_export_options(options)):
+                # Column 0: Name (with indentation)
+                indent = line.get('level', 0)
+                if indent not in indent_formats:
+                    indent_formats[indent] = workbook.add_format({'indent': indent})
+                sheet.write(row, 0, line.get('name', ''), indent_formats[indent])
+
+                # Columns 1+: Data, as numbers when the raw amount is known
+                for col_idx, col_data in enumerate(line.get('columns', [])):
+                    if isinstance(col_data.get('no_format'), (int, float)):
+                        sheet.write_number(row, col_idx + 1, col_data['no_format'], number_format)
+                    else:
+                        sheet.write(row, col_idx + 1, col_data.get('name', ''))
+                row += 1
+
+            workbook.close()
+            output.seek(0)
+        except Exception:
+            output.close()
+            raise
+        return output
+
+    def _get_export_fields(self, options):
+        """Columns of the CSV / Parquet exports: the position of each line in
+        the report, then its name and the report columns.
+
+        :return: [(name, type)], type being 'char', 'integer' or 'float'
+        """
+        return [('line_id', 'char'), ('parent_id', 'char'), ('level', 'integer')] + [
+            (column['name'], 'float' if 'number' in column.get('class', '').split() else 'char')
+            for column in self._get_columns(options)
+        ]
+
+    def _iter_export_rows(self, options, export_fields):
+        """Generate the lines as rows of raw values: the ``no_format`` amounts
+        for the numeric columns, the displayed text for the others."""
+        # The first report column holds the line name
+        numeric = [field_type == 'float' for _name, field_type in export_fields[4:]]
+        for line in self._iter_lines(self._get_export_options(options)):
+            row = [line.get('id') or '', line.get('parent_id') or '', line.get('level', 0), line.get('name', '')]
+            for col_idx, is_numeric in enumerate(numeric):
+                columns = line.get('columns', [])
+                col_data = columns[col_idx] if col_idx < len(columns) else {}
+                if is_numeric:
+                    value = col_data.get('no_format')
+                    row.append(value if isinstance(value, (int, float)) else None)
+                else:
+                    row.append(col_data.get('name', ''))
+            yield row
+
+    def _iter_export_chunks(self, options, export_fields):
+        """Group the export rows by chunks of EXPORT_CHUNK_SIZE"""
+        chunk = []
+        for row in self._iter_export_rows(options, export_fields):
+            chunk.append(row)
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @profiled
+    def _get_csv_file(self, options):
+        """Write the report lines as CSV into a temporary file, with the raw
+        amounts. The caller must close the returned file, positioned at its
+        start, which deletes it."""
+        export_fields = self._get_export_fields(options)
+        output = tempfile.TemporaryFile()
+        try:
+            text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow([name for name, _field_type in export_fields])
+            for chunk in self._iter_export_chunks(options, export_fields):
+                writer.writerows(chunk)
+            text.flush()
+            # Keep the binary file open once the text layer is dropped
+            text.detach()
+            output.seek(0)
+        except Exception:
+            output.close()
+            raise
+        return output
+
+    @profiled
+    def _get_parquet_file(self, options):
+        """Write the report lines as Parquet into a temporary file, one row
+        group per chunk of lines, with the amounts as float columns. The
+        caller must close the returned file, positioned at its start, which
+        deletes it."""
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise UserError(_("The 'pyarrow' Python module is not installed. Please install it with: pip install pyarrow"))
+
+        export_fields = self._get_export_fields(options)
+        types = {'char': pyarrow.string(), 'integer': pyarrow.int32(), 'float': pyarrow.float64()}
+        schema = pyarrow.schema([(name, types[field_type]) for name, field_type in export_fields])
+        output = tempfile.TemporaryFile()
+        try:
+            with pyarrow.parquet.ParquetWriter(output, schema, compression='snappy') as writer:
+                for chunk in self._iter_export_chunks(options, export_fields):
+                    writer.write_batch(pyarrow.RecordBatch.from_arrays([
+                        pyarrow.array([row[idx] for row in chunk], type=field.type)
+                        for idx, field in enumerate(schema)
+                    ], schema=schema))
+            output.seek(0)
+        except Exception:
+            output.close()
+            raise
+        return output
 
     def _get_options(self, previous_options=None):
         """Build default options"""
@@ -275,19 +552,300 @@ class FinancialReportAbstract(models.AbstractModel):
         return options
 
     def _get_comparison_data(self, options):
-        """Get data for comparison period"""
-        if not options.get('comparison'):
-            return None
-        
-        date_from = fields.Date.from_string(options['date_from'])
-        date_to = fields.Date.from_string(options['date_to'])
-        
-        # Calculate previous period
-        delta = date_to - date_from
-        prev_date_to = date_from - timedelta(days=1)
-        prev_date_from = prev_date_to - delta
-        
-        return {
-            'date_from': prev_date_from,
-            'date_to': prev_date_to,
+        """Get data for the first comparison period"""
+        periods = self._get_comparison_periods(options)
+        return periods[0] if periods else None
+
+    def _get_comparison_periods(self, options):
+        """Date ranges of the comparison columns, most recent first.
+
+        ``options['comparison_periods']`` (1 by default) columns of the
+        ``options['comparison_type']`` kind: the previous periods of the same
+        length (in months when the period is made of whole months), the same
+        period in the previous years, or the year-to-date of the current and
+        previous fiscal years.
+
+        :return: [{'date_from', 'date_to', 'name'}]
+        """
+        if not options.get('comparison') or not options.get('date_to'):
+            return []
+        date_to = fields.Date.to_date(options['date_to'])
+        date_from = fields.Date.to_date(options.get('date_from')) or \
+            self.env.company.compute_fiscalyear_dates(date_to)['date_from']
+        count = max(int(options.get('comparison_periods') or 1), 1)
+        comparison_type = options.get('comparison_type') or 'previous_period'
+
+        ranges = []
+        if comparison_type == 'same_last_year':
+            for year in range(1, count + 1):
+                ranges.append((date_from - relativedelta(years=year), date_to - relativedelta(years=year)))
+        elif comparison_type == 'ytd':
+            for year in range(count):
+                period_to = date_to - relativedelta(years=year)
+                ranges.append((self.env.company.compute_fiscalyear_dates(period_to)['date_from'], period_to))
+        else:
+            # Previous periods
+            next_day = date_to + timedelta(days=1)
+            months = (next_day.year - date_from.year) * 12 + next_day.month - date_from.month
+            if date_from.day == 1 and next_day.day == 1:
+                for index in range(1, count + 1):
+                    period_from = date_from - relativedelta(months=months * index)
+                    ranges.append((period_from, period_from + relativedelta(months=months, days=-1)))
+            else:
+                delta = date_to - date_from
+                period_to = date_from - timedelta(days=1)
+                for index in range(count):
+                    ranges.append((period_to - delta, period_to))
+                    period_to -= delta + timedelta(days=1)
+
+        return [{
+            'date_from': period_from,
+            'date_to': period_to,
+            'name': f"{period_from} to {period_to}",
+        } for period_from, period_to in ranges]
+
+    def _get_report_periods(self, options):
+        """The period of the report followed by its comparison periods"""
+        return [{
+            'date_from': fields.Date.to_date(options.get('date_from')),
+            'date_to': fields.Date.to_date(options.get('date_to')),
+            'name': f"{options.get('date_from')} to {options.get('date_to')}",
+        }] + self._get_comparison_periods(options)
+
+    def _compute_account_balances_multi(self, accounts, ranges, options=None):
+        """Compute the debit, credit and balance of several accounts over
+        several date ranges at once.
+
+        Every range is a (date_from, date_to) pair, either bound being
+        optional. Like :meth:`_compute_account_balances`, the whole months
+        are read from the monthly balances and the partial months from the
+        move lines, but with one conditional aggregate per range: two
+        queries in total whatever the number of ranges.
+
+        :return: {account_id: [{'debit', 'credit', 'balance'}, ...]}, one
+            entry per range
+        """
+        options = options or {}
+        balances = {
+            account.id: [{'debit': 0.0, 'credit': 0.0, 'balance': 0.0} for _range in ranges]
+            for account in accounts
         }
+        if not accounts or not ranges:
+            return balances
+
+        month_ranges = []
+        line_ranges = []
+        cube_usable = self.env['tekprowess.account.balance.monthly']._is_usable()
+        for date_from, date_to in ranges:
+            date_from = fields.Date.to_date(date_from)
+            date_to = fields.Date.to_date(date_to)
+            # Whole months of the range: from month_from (included) to month_to (excluded)
+            month_from = None
+            if date_from:
+                month_from = date_from if date_from.day == 1 else \
+                    date_from.replace(day=1) + relativedelta(months=1)
+            month_to = None
+            if date_to:
+                next_day = date_to + timedelta(days=1)
+                month_to = next_day if next_day.day == 1 else date_to.replace(day=1)
+
+            if (month_from and month_to and month_from >= month_to) or not cube_usable:
+                # Less than a month, or move lines restricted by record rules:
+                # everything is read from the move lines
+                month_ranges.append(None)
+                line_ranges.append([(date_from, date_to)])
+                continue
+            month_ranges.append((month_from, month_to))
+            edges = []
+            if month_from and date_from < month_from:
+                edges.append((date_from, month_from - timedelta(days=1)))
+            if month_to and month_to <= date_to:
+                edges.append((month_to, date_to))
+            line_ranges.append(edges)
+
+        rows = []
+        if any(month_ranges):
+            rows += self.env['tekprowess.account.balance.monthly']._query_account_balances_multi(
+                accounts, options, month_ranges,
+            )
+        if any(line_ranges):
+            rows += self._query_move_line_balances_multi(accounts, options, line_ranges)
+
+        for account_id, *amounts in rows:
+            for index, account_balance in enumerate(balances[account_id]):
+                debit, credit = amounts[2 * index] or 0.0, amounts[2 * index + 1] or 0.0
+                account_balance['debit'] += debit
+                account_balance['credit'] += credit
+                account_balance['balance'] += debit - credit
+        return balances
+
+    def _query_move_line_balances_multi(self, accounts, options, line_ranges):
+        """Debit / credit per account of the move lines within each set of
+        date ranges of ``line_ranges``, from one grouped query.
+
+        :return: [(account_id, debit_1, credit_1, debit_2, credit_2, ...)]
+        """
+        def _condition(date_ranges):
+            if not date_ranges:
+                return SQL("FALSE")
+            return SQL(" OR ").join(
+                SQL("(%s AND %s)",
+                    SQL("account_move_line.date >= %s", date_from) if date_from else SQL("TRUE"),
+                    SQL("account_move_line.date <= %s", date_to) if date_to else SQL("TRUE"))
+                for date_from, date_to in date_ranges
+            )
+
+        query = self.env['account.move.line']._search(self._get_balance_domain(options, accounts))
+        query.add_where(_condition([date_range for date_ranges in line_ranges for date_range in date_ranges]))
+        query.groupby = SQL('account_move_line.account_id')
+        aggregates = []
+        for date_ranges in line_ranges:
+            condition = _condition(date_ranges)
+            aggregates += [
+                SQL("SUM(account_move_line.debit) FILTER (WHERE %s)", condition),
+                SQL("SUM(account_move_line.credit) FILTER (WHERE %s)", condition),
+            ]
+        self.env.cr.execute(query.select(SQL('account_move_line.account_id'), *aggregates))
+        return self.env.cr.fetchall()
+
+    def _make_comparison_columns(self, amounts):
+        """Columns of an amount and its comparison amounts: one per comparison
+        period, followed by the variation with a single comparison period"""
+        columns = [self._make_amount_column(amount) for amount in amounts]
+        if len(amounts) == 2:
+            balance, comparison_balance = amounts
+            variation = balance - comparison_balance
+            variation_pct = (variation / comparison_balance * 100) if comparison_balance else 0
+            columns += [
+                self._make_amount_column(variation),
+                {'name': self._format_value(variation_pct, 'percentage'), 'no_format': variation_pct},
+            ]
+        return columns
+
+    def _get_report_companies(self, options):
+        """Companies whose figures make the report: the current company, or
+        with ``options['consolidated']`` the companies of
+        ``options['company_ids']`` (by default the selected companies) the
+        user has access to."""
+        if not options.get('consolidated'):
+            return self.env.company
+        companies = self.env['res.company'].browse(options.get('company_ids') or self.env.companies.ids)
+        return (companies & self.env.user.company_ids) or self.env.company
+
+    def _get_account_rows(self, account_types, ranges, options, order=None):
+        """Balances over ``ranges`` of the accounts of the given types, for
+        the current company or consolidated over the report companies.
+
+        :return: [{'id', 'name', 'code', 'account_type', 'caret_options', 'balances'}]
+            where 'balances' holds one {'debit', 'credit', 'balance'} per range
+        """
+        if options.get('consolidated'):
+            return self._get_consolidated_rows(account_types, ranges, options)
+        domain = [('company_ids', 'in', [self.env.company.id])]
+        if account_types:
+            domain.append(('account_type', 'in', account_types))
+        accounts = self.env['account.account'].search(domain, order=order)
+        balances = self._compute_account_balances_multi(accounts, ranges, options)
+        return [{
+            'id': f'account_{account.id}',
+            'name': f"{account.code} {account.name}",
+            'code': account.code,
+            'account_type': account.account_type,
+            'caret_options': 'account',
+            'balances': balances[account.id],
+        } for account in accounts]
+
+    def _get_consolidated_rows(self, account_types, ranges, options):
+        """Balances of the report companies summed per account code, in the
+        currency of the current company.
+
+        The balances of each company are computed on their own (see
+        :meth:`_map_companies`), then translated with one rate per company
+        and range, the rate of the end of the range, applied to the account
+        totals rather than to the move lines.
+        """
+        companies = self._get_report_companies(options)
+        company_rows = self._map_companies(
+            companies, '_get_company_account_rows', account_types, ranges, dict(options, consolidated=False),
+        )
+        rates = self._get_consolidation_rates(companies, ranges)
+
+        rows = {}
+        for company in companies:
+            company_rates = rates[company.id]
+            for code, name, account_type, balances in company_rows[company.id]:
+                row = rows.get(code)
+                if row is None:
+                    row = rows[code] = {
+                        'id': f'consolidated_{code}',
+                        'name': name,
+                        'code': code,
+                        'account_type': account_type,
+                        'caret_options': False,
+                        'balances': [{'debit': 0.0, 'credit': 0.0, 'balance': 0.0} for _range in ranges],
+                    }
+                for total, balance, rate in zip(row['balances'], balances, company_rates):
+                    for key in ('debit', 'credit', 'balance'):
+                        total[key] += balance[key] * rate
+        return [rows[code] for code in sorted(rows)]
+
+    def _get_company_account_rows(self, account_types, ranges, options):
+        """Account rows of the current company as plain values, which can be
+        passed from one cursor to another.
+
+        :return: [(code, line name, account_type, balances)]
+        """
+        return [
+            (row['code'], row['name'], row['account_type'], row['balances'])
+            for row in self._get_account_rows(account_types, ranges, options)
+        ]
+
+    def _get_consolidation_rates(self, companies, ranges):
+        """Rates translating the amounts of every company into the currency
+        of the current company, from one query per range.
+
+        :return: {company_id: [rate per range]}
+        """
+        currency = self.env.company.currency_id
+        currencies = companies.currency_id | currency
+        rates = {company.id: [] for company in companies}
+        for _date_from, date_to in ranges:
+            date = fields.Date.to_date(date_to) or fields.Date.context_today(self)
+            currency_rates = currencies._get_rates(self.env.company, date)
+            for company in companies:
+                rates[company.id].append(
+                    currency_rates[currency.id] / currency_rates[company.currency_id.id]
+                    if company.currency_id != currency else 1.0
+                )
+        return rates
+
+    def _map_companies(self, companies, method_name, *args):
+        """Call ``method_name`` for each company, with the company as current
+        company.
+
+        With the ``tekprowess_accounting_reports.consolidation_workers``
+        parameter above 1, the calls run concurrently in a pool of threads,
+        each on its own cursor: they only see committed data and return
+        plain values.
+
+        :return: {company_id: result}
+        """
+        workers = int(self.env['ir.config_parameter'].sudo().get_param(
+            'tekprowess_accounting_reports.consolidation_workers', 0))
+        if workers <= 1 or len(companies) <= 1:
+            return {
+                company.id: getattr(self.with_company(company), method_name)(*args)
+                for company in companies
+            }
+        with ThreadPoolExecutor(max_workers=min(workers, len(companies))) as executor:
+            futures = {
+                company.id: executor.submit(self._call_for_company, company.id, method_name, args)
+                for company in companies
+            }
+            return {company_id: future.result() for company_id, future in futures.items()}
+
+    def _call_for_company(self, company_id, method_name, args):
+        """Run ``method_name`` for a company on a new cursor (worker thread)"""
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, dict(self.env.context, allowed_company_ids=[company_id]))
+            return getattr(env[self._name], method_name)(*args)
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.tools import SQL
+
+# Number of move lines fetched per query, i.e. sent to the client per unfold
+PAGE_SIZE = 500
 
 
 class GeneralLedgerReport(models.TransientModel):
@@ -12,36 +16,41 @@ class GeneralLedgerReport(models.TransientModel):
         return "General Ledger"
 
     def _get_lines(self, options):
-        lines = []
-        
+        return list(self._iter_lines(options))
+
+    def _iter_lines(self, options):
+        """Generate the report lines account by account.
+
+        The move lines of an account are only generated when it is unfolded
+        (or for exports); the client fetches the others on unfold.
+        """
         accounts = self.env['account.account'].search([
             ('company_ids', 'in', [self.env.company.id])
         ], order='code')
-        
+        balances = self._compute_account_balances(
+            accounts, options.get('date_from'), options.get('date_to'), options
+        )
+        unfold_all = options.get('unfold_all') or options.get('export')
+
         for account in accounts:
-            # Initial balance
-            initial_balance = self._compute_initial_balance(
-                account, options.get('date_from')
-            )
-            
-            # Get move lines
-            move_lines = self._get_account_move_lines(
-                options, accounts=account
-            ).sorted('date')
-            
+            account_balances = balances[account.id]
+            initial_balance = account_balances['initial']['balance']
+
             # Skip accounts with no activity and no initial balance
-            if not move_lines and initial_balance == 0:
+            if not (account_balances['period']['debit'] or account_balances['period']['credit']) \
+                    and initial_balance == 0:
                 if not options.get('unfold_all'):
                     continue
-            
+
             # Account header
-            lines.append({
+            yield {
                 'id': f'account_{account.id}',
                 'name': f"{account.code} {account.name}",
                 'level': 0,
                 'class': 'o_account_reports_level0',
                 'unfoldable': True,
-                'unfolded': options.get('unfold_all', False),
+                'unfolded': bool(unfold_all),
+                'children_loaded': bool(unfold_all),
                 'columns': [
                     {'name': ''},  # Date
                     {'name': ''},  # Journal
@@ -49,73 +58,156 @@ class GeneralLedgerReport(models.TransientModel):
                     {'name': ''},  # Label
                     {'name': ''},  # Debit
                     {'name': ''},  # Credit
-                    {'name': self._format_value(initial_balance + sum(
-                        ml.debit - ml.credit for ml in move_lines
-                    ))},  # Balance
+                    self._make_amount_column(account_balances['ending']['balance']),  # Balance
                 ],
-            })
-            
+            }
+            if unfold_all:
+                yield from self._iter_account_lines(
+                    account, options, account_balances, full=bool(options.get('export')),
+                )
+
+    def _get_unfolded_lines(self, line_id, options):
+        """Lines of an account unfolded in the client: its first page of move
+        lines, or the next page when ``options`` holds the cursor of a
+        "load more" line."""
+        account = self.env['account.account'].browse(int(line_id.split('_')[1]))
+        balances = self._compute_account_balances(
+            account, options.get('date_from'), options.get('date_to'), options
+        )
+        return list(self._iter_account_lines(
+            account, options, balances[account.id], cursor=options.get('cursor'),
+        ))
+
+    def _iter_account_lines(self, account, options, account_balances, cursor=None, full=False):
+        """Generate the initial balance, move lines and total lines of an account.
+
+        Move lines are read ordered by (date, id) with keyset pagination, their
+        running balance computed by a window function and carried over from one
+        page to the next. Unless ``full`` is set, only the first page is
+        generated, followed by a "load more" line holding the cursor of the
+        next one.
+
+        :param cursor: (date, move line id, running balance) of the last line
+            already sent, None to start from the beginning of the period
+        """
+        parent_id = f'account_{account.id}'
+        initial_balance = account_balances['initial']['balance']
+
+        if cursor:
+            last_date, last_id, running_balance = cursor
+        else:
+            last_date, last_id, running_balance = None, None, initial_balance
             # Initial balance line
             if initial_balance != 0:
-                lines.append({
+                yield {
                     'name': _('Initial Balance'),
                     'level': 1,
                     'class': 'o_account_reports_initial_balance',
-                    'parent_id': f'account_{account.id}',
+                    'parent_id': parent_id,
                     'columns': [
                         {'name': ''},
                         {'name': ''},
                         {'name': ''},
                         {'name': _('Initial Balance')},
-                        {'name': self._format_value(initial_balance if initial_balance > 0 else 0)},
-                        {'name': self._format_value(-initial_balance if initial_balance < 0 else 0)},
-                        {'name': self._format_value(initial_balance)},
+                        self._make_amount_column(initial_balance if initial_balance > 0 else 0),
+                        self._make_amount_column(-initial_balance if initial_balance < 0 else 0),
+                        self._make_amount_column(initial_balance),
                     ],
-                })
-            
-            # Move lines
-            running_balance = initial_balance
-            for move_line in move_lines:
-                running_balance += move_line.debit - move_line.credit
-                
-                lines.append({
-                    'id': f'aml_{move_line.id}',
-                    'name': move_line.name or move_line.move_id.name or '',
+                }
+
+        # Move lines
+        while True:
+            # One extra line tells whether there is a next page
+            rows = self._fetch_move_line_page(account, options, last_date, last_id, PAGE_SIZE + 1)
+            more = len(rows) > PAGE_SIZE
+            rows = rows[:PAGE_SIZE]
+
+            journals = {j.id: j for j in self.env['account.journal'].browse({row[4] for row in rows})}
+            partners = {p.id: p for p in self.env['res.partner'].browse({row[5] for row in rows if row[5]})}
+            page_balance = running_balance
+            for aml_id, date, name, move_name, journal_id, partner_id, debit, credit, page_running in rows:
+                running_balance = page_balance + page_running
+                label = name or move_name or ''
+                yield {
+                    'id': f'aml_{aml_id}',
+                    'name': label,
                     'level': 1,
-                    'parent_id': f'account_{account.id}',
+                    'parent_id': parent_id,
                     'caret_options': 'account.move.line',
                     'columns': [
-                        {'name': move_line.date.strftime('%Y-%m-%d')},
-                        {'name': move_line.journal_id.code or ''},
-                        {'name': move_line.partner_id.name or ''},
-                        {'name': move_line.name or move_line.move_id.name or ''},
-                        {'name': self._format_value(move_line.debit)},
-                        {'name': self._format_value(move_line.credit)},
-                        {'name': self._format_value(running_balance)},
+                        {'name': date.strftime('%Y-%m-%d')},
+                        {'name': journals[journal_id].code or ''},
+                        {'name': (partners[partner_id].name or '') if partner_id else ''},
+                        {'name': label},
+                        self._make_amount_column(debit),
+                        self._make_amount_column(credit),
+                        self._make_amount_column(running_balance),
                     ],
-                })
-            
-            # Account total line
-            total_debit = sum(move_lines.mapped('debit'))
-            total_credit = sum(move_lines.mapped('credit'))
-            
-            lines.append({
-                'name': _('Total') + f" {account.code} {account.name}",
-                'level': 1,
-                'class': 'total',
-                'parent_id': f'account_{account.id}',
-                'columns': [
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': self._format_value(total_debit)},
-                    {'name': self._format_value(total_credit)},
-                    {'name': self._format_value(running_balance)},
-                ],
-            })
-        
-        return lines
+                }
+                last_date, last_id = date, aml_id
+
+            if not more:
+                break
+            if not full:
+                # Let the client ask for the next page
+                yield {
+                    'id': f'{parent_id}_more_{last_id}',
+                    'name': _('Load more...'),
+                    'level': 1,
+                    'class': 'o_account_reports_load_more',
+                    'parent_id': parent_id,
+                    'load_more': True,
+                    'cursor': [fields.Date.to_string(last_date), last_id, running_balance],
+                    'columns': [{'name': ''}] * 7,
+                }
+                return
+
+        # Account total line
+        total_debit = account_balances['period']['debit']
+        total_credit = account_balances['period']['credit']
+
+        yield {
+            'name': _('Total') + f" {account.code} {account.name}",
+            'level': 1,
+            'class': 'total',
+            'parent_id': parent_id,
+            'columns': [
+                {'name': ''},
+                {'name': ''},
+                {'name': ''},
+                {'name': ''},
+                self._make_amount_column(total_debit),
+                self._make_amount_column(total_credit),
+                self._make_amount_column(account_balances['ending']['balance']),
+            ],
+        }
+
+    def _fetch_move_line_page(self, account, options, last_date, last_id, page_size):
+        """Next ``page_size`` move lines of ``account`` after (last_date, last_id),
+        with their running balance within the page."""
+        domain = self._get_balance_domain(options, account, options.get('date_to'))
+        if options.get('date_from'):
+            domain.append(('date', '>=', options['date_from']))
+        query = self.env['account.move.line']._search(domain)
+        if last_id:
+            query.add_where(SQL(
+                "(account_move_line.date, account_move_line.id) > (%s, %s)", last_date, last_id,
+            ))
+        query.order = SQL("account_move_line.date, account_move_line.id")
+        query.limit = page_size
+        self.env.cr.execute(query.select(
+            SQL("account_move_line.id"),
+            SQL("account_move_line.date"),
+            SQL("account_move_line.name"),
+            SQL("account_move_line.move_name"),
+            SQL("account_move_line.journal_id"),
+            SQL("account_move_line.partner_id"),
+            SQL("account_move_line.debit"),
+            SQL("account_move_line.credit"),
+            SQL("SUM(account_move_line.debit - account_move_line.credit)"
+                " OVER (ORDER BY account_move_line.date, account_move_line.id)"),
+        ))
+        return self.env.cr.fetchall()
 
     def _get_columns(self, options):
         """Define columns for general ledger"""
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+PENDING_KEY = 'tekprowess_accounting_reports.ledger_change'
+
+
+class LedgerChange(models.Model):
+    """Log of the transactions changing what the reports are computed from.
+
+    Every transaction creating, writing or deleting move lines, accounts or
+    currency rates inserts one row per company it touched (no company for
+    the changes of every company), so that the version of a ledger, the sum
+    of the weights of its rows, moves with each commit whatever the order in
+    which concurrent transactions commit. The report cache serves a result
+    only while the version of its companies is the same. Rows are only
+    inserted and never contend; the autovacuum merges them without changing
+    the sums.
+    """
+    _name = 'tekprowess.ledger.change'
+    _description = 'Ledger Change'
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', string='Company', ondelete='cascade', readonly=True)
+    weight = fields.Integer(string='Changes', default=1, readonly=True)
+
+    def init(self):
+        self.env.cr.execute(SQL("""
+            CREATE INDEX IF NOT EXISTS tekprowess_ledger_change_company_index
+                ON tekprowess_ledger_change (company_id)
+        """))
+
+    @api.model
+    def _mark(self, company_ids):
+        """Bump the version of the ledgers of ``company_ids`` (None for every
+        company) when the current transaction commits."""
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get(PENDING_KEY)
+        if pending is None:
+            pending = precommit.data[PENDING_KEY] = set()
+
+            @precommit.add
+            def _log():
+                # Changes flushed by later precommit hooks start a new set
+                changes = precommit.data.pop(PENDING_KEY)
+                if changes:
+                    self.env.cr.execute(SQL(
+                        "INSERT INTO tekprowess_ledger_change (company_id, weight) VALUES %s",
+                        SQL(", ").join(SQL("(%s, 1)", company_id) for company_id in changes),
+                    ))
+        pending.update(company_ids)
+
+    @api.model
+    def _get_version(self, companies):
+        """Number of committed changes of the ledgers of ``companies``"""
+        self.env.cr.execute(SQL("""
+            SELECT COALESCE(SUM(weight), 0) FROM tekprowess_ledger_change
+             WHERE company_id IN %s OR company_id IS NULL
+        """, tuple(companies.ids)))
+        return self.env.cr.fetchone()[0]
+
+    @api.autovacuum
+    def _gc_changes(self):
+        """Merge the rows of each company into one"""
+        self.env.cr.execute(SQL("""
+            WITH merged AS (
+                DELETE FROM tekprowess_ledger_change
+                RETURNING company_id, weight
+            )
+            INSERT INTO tekprowess_ledger_change (company_id, weight)
+            SELECT company_id, SUM(weight) FROM merged GROUP BY company_id
+        """))
@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.tools import SQL
+from collections import defaultdict
+
+# Number of partners whose move lines are read by a single query
+PARTNER_BATCH_SIZE = 1000
 
 
 class PartnerLedgerReport(models.TransientModel):
@@ -17,175 +22,248 @@ class PartnerLedgerReport(models.TransientModel):
     def _get_report_name(self):
         return "Partner Ledger"
 
-    def _get_lines(self, options):
-        lines = []
-        
-        # Determine account types based on partner type
+    def _get_account_types(self, options):
+        """Account types of the partner type selected in the options"""
         if options.get('partner_type') == 'customer':
-            account_types = ['asset_receivable']
-        elif options.get('partner_type') == 'supplier':
-            account_types = ['liability_payable']
-        else:
-            account_types = ['asset_receivable', 'liability_payable']
-        
+            return ['asset_receivable']
+        if options.get('partner_type') == 'supplier':
+            return ['liability_payable']
+        return ['asset_receivable', 'liability_payable']
+
+    def _get_lines(self, options):
+        return list(self._iter_lines(options))
+
+    def _iter_lines(self, options):
+        """Generate the report lines partner by partner.
+
+        The partner totals and initial balances come from two grouped
+        queries. The move lines of a partner are only generated when it is
+        unfolded (or for exports), the client fetches the others on unfold;
+        they are read PARTNER_BATCH_SIZE partners at a time so that the
+        memory used does not grow with the number of partners.
+        """
+        account_types = self._get_account_types(options)
+        unfold_all = options.get('unfold_all') or options.get('export')
+
         # Get partners with transactions
-        partners = self._get_partners_with_transactions(account_types, options)
-        
-        for partner in partners:
-            # Partner header
-            partner_initial_balance = self._get_partner_initial_balance(
-                partner, account_types, options
-            )
-            
-            # Get partner move lines
-            move_lines = self._get_partner_move_lines(
-                partner, account_types, options
-            )
-            
-            if not move_lines and partner_initial_balance == 0:
-                if not options.get('unfold_all'):
-                    continue
-            
-            partner_final_balance = partner_initial_balance + sum(
-                ml.debit - ml.credit for ml in move_lines
-            )
-            
-            lines.append({
-                'id': f'partner_{partner.id}',
-                'name': partner.name,
-                'level': 0,
-                'class': 'o_account_reports_level0',
-                'unfoldable': True,
-                'unfolded': options.get('unfold_all', False),
-                'columns': [
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': ''},
-                    {'name': self._format_value(partner_final_balance)},
-                ],
-                'caret_options': 'res.partner',
-            })
-            
-            # Initial balance
-            if partner_initial_balance != 0:
-                lines.append({
-                    'name': _('Initial Balance'),
-                    'level': 1,
-                    'parent_id': f'partner_{partner.id}',
+        period_totals = self._get_partner_totals(account_types, options)
+        initial_balances = self._get_partner_initial_balances(None, account_types, options)
+        partners = self._get_partner_names(list(period_totals))
+
+        for batch_start in range(0, len(partners), PARTNER_BATCH_SIZE):
+            batch = partners[batch_start:batch_start + PARTNER_BATCH_SIZE]
+            move_lines = self._fetch_partner_move_lines(
+                [partner_id for partner_id, _name in batch], account_types, options,
+            ) if unfold_all else {}
+
+            for partner_id, partner_name in batch:
+                debit, credit = period_totals[partner_id]
+                partner_initial_balance = initial_balances.get(partner_id, 0.0)
+
+                yield {
+                    'id': f'partner_{partner_id}',
+                    'name': partner_name,
+                    'level': 0,
+                    'class': 'o_account_reports_level0',
+                    'unfoldable': True,
+                    'unfolded': bool(unfold_all),
+                    'children_loaded': bool(unfold_all),
                     'columns': [
                         {'name': ''},
                         {'name': ''},
                         {'name': ''},
                         {'name': ''},
-                        {'name': self._format_value(partner_initial_balance if partner_initial_balance > 0 else 0)},
-                        {'name': self._format_value(-partner_initial_balance if partner_initial_balance < 0 else 0)},
-                        {'name': self._format_value(partner_initial_balance)},
-                    ],
-                })
-            
-            # Move lines
-            running_balance = partner_initial_balance
-            for move_line in move_lines.sorted('date'):
-                running_balance += move_line.debit - move_line.credit
-                
-                lines.append({
-                    'id': f'aml_{move_line.id}',
-                    'name': move_line.move_id.name or '',
-                    'level': 1,
-                    'parent_id': f'partner_{partner.id}',
-                    'caret_options': 'account.move.line',
-                    'columns': [
-                        {'name': move_line.date.strftime('%Y-%m-%d')},
-                        {'name': move_line.account_id.code or ''},
-                        {'name': move_line.move_id.name or ''},
-                        {'name': move_line.name or ''},
-                        {'name': self._format_value(move_line.debit)},
-                        {'name': self._format_value(move_line.credit)},
-                        {'name': self._format_value(running_balance)},
+                        {'name': ''},
+                        {'name': ''},
+                        self._make_amount_column(partner_initial_balance + debit - credit),
                     ],
-                })
-            
-            # Partner total
-            total_debit = sum(move_lines.mapped('debit'))
-            total_credit = sum(move_lines.mapped('credit'))
-            
-            lines.append({
-                'name': _('Total') + f" {partner.name}",
+                    'caret_options': 'res.partner',
+                }
+                if unfold_all:
+                    yield from self._iter_partner_lines(
+                        partner_id, partner_name, partner_initial_balance,
+                        (debit, credit), move_lines.get(partner_id, []),
+                    )
+
+    def _get_unfolded_lines(self, line_id, options):
+        """Lines of a partner unfolded in the client"""
+        partner = self.env['res.partner'].browse(int(line_id.split('_')[1]))
+        account_types = self._get_account_types(options)
+        initial_balance = self._get_partner_initial_balances(
+            partner.ids, account_types, options
+        ).get(partner.id, 0.0)
+        move_lines = self._fetch_partner_move_lines(partner.ids, account_types, options).get(partner.id, [])
+        totals = (sum(row[5] for row in move_lines), sum(row[6] for row in move_lines))
+        return list(self._iter_partner_lines(
+            partner.id, partner.name, initial_balance, totals, move_lines,
+        ))
+
+    def _iter_partner_lines(self, partner_id, partner_name, partner_initial_balance, totals, move_lines):
+        """Generate the initial balance, move lines and total lines of a partner
+
+        :param totals: (debit, credit) of the partner over the period
+        :param move_lines: rows of :meth:`_fetch_partner_move_lines`
+        """
+        parent_id = f'partner_{partner_id}'
+
+        # Initial balance
+        if partner_initial_balance != 0:
+            yield {
+                'name': _('Initial Balance'),
                 'level': 1,
-                'class': 'total',
-                'parent_id': f'partner_{partner.id}',
+                'parent_id': parent_id,
                 'columns': [
                     {'name': ''},
                     {'name': ''},
                     {'name': ''},
                     {'name': ''},
-                    {'name': self._format_value(total_debit)},
-                    {'name': self._format_value(total_credit)},
-                    {'name': self._format_value(running_balance)},
+                    self._make_amount_column(partner_initial_balance if partner_initial_balance > 0 else 0),
+                    self._make_amount_column(-partner_initial_balance if partner_initial_balance < 0 else 0),
+                    self._make_amount_column(partner_initial_balance),
+                ],
+            }
+
+        # Move lines
+        running_balance = partner_initial_balance
+        for aml_id, date, account_code, move_name, name, debit, credit, cumulated_balance in move_lines:
+            running_balance = partner_initial_balance + cumulated_balance
+
+            yield {
+                'id': f'aml_{aml_id}',
+                'name': move_name or '',
+                'level': 1,
+                'parent_id': parent_id,
+                'caret_options': 'account.move.line',
+                'columns': [
+                    {'name': date.strftime('%Y-%m-%d')},
+                    {'name': account_code or ''},
+                    {'name': move_name or ''},
+                    {'name': name or ''},
+                    self._make_amount_column(debit),
+                    self._make_amount_column(credit),
+                    self._make_amount_column(running_balance),
                 ],
-            })
-        
-        return lines
+            }
+
+        # Partner total
+        total_debit, total_credit = totals
+
+        yield {
+            'name': _('Total') + f" {partner_name}",
+            'level': 1,
+            'class': 'total',
+            'parent_id': parent_id,
+            'columns': [
+                {'name': ''},
+                {'name': ''},
+                {'name': ''},
+                {'name': ''},
+                self._make_amount_column(total_debit),
+                self._make_amount_column(total_credit),
+                self._make_amount_column(partner_initial_balance + total_debit - total_credit),
+            ],
+        }
+
+    def _get_partner_names(self, partner_ids):
+        """[(partner_id, name)] of the given partners, ordered by name, read
+        without loading the partners in the cache"""
+        if not partner_ids:
+            return []
+        query = self.env['res.partner'].with_context(active_test=False)._search(
+            [('id', 'in', partner_ids)], order='name, id',
+        )
+        self.env.cr.execute(query.select(SQL("res_partner.id"), SQL("res_partner.name")))
+        return self.env.cr.fetchall()
+
+    def _fetch_partner_move_lines(self, partner_ids, account_types, options):
+        """Move lines of the period of the given partners, in one query
+        ordered by partner, date and id, with the balance cumulated per
+        partner by a window function.
+
+        :return: {partner_id: [(id, date, account code, move name, label, debit, credit, cumulated balance)]}
+        """
+        domain = self._get_period_domain(account_types, options) + [('partner_id', 'in', partner_ids)]
+        query = self.env['account.move.line']._search(domain)
+        query.order = SQL("account_move_line.partner_id, account_move_line.date, account_move_line.id")
+        self.env.cr.execute(query.select(
+            SQL("account_move_line.partner_id"),
+            SQL("account_move_line.id"),
+            SQL("account_move_line.date"),
+            SQL("account_move_line.account_id"),
+            SQL("account_move_line.move_name"),
+            SQL("account_move_line.name"),
+            SQL("account_move_line.debit"),
+            SQL("account_move_line.credit"),
+            SQL("SUM(account_move_line.debit - account_move_line.credit) OVER ("
+                "PARTITION BY account_move_line.partner_id"
+                " ORDER BY account_move_line.date, account_move_line.id)"),
+        ))
+        rows = self.env.cr.fetchall()
+
+        accounts = self.env['account.account'].browse({row[3] for row in rows})
+        account_codes = {account.id: account.code for account in accounts}
+        move_lines = defaultdict(list)
+        for partner_id, aml_id, date, account_id, move_name, name, debit, credit, cumulated in rows:
+            move_lines[partner_id].append(
+                (aml_id, date, account_codes[account_id], move_name, name, debit, credit, cumulated)
+            )
+        return move_lines
 
-    def _get_partners_with_transactions(self, account_types, options):
-        """Get partners with transactions in the period"""
+    def _get_period_domain(self, account_types, options):
+        """Domain of the partner move lines in the period"""
         domain = [
             ('company_id', '=', self.env.company.id),
             ('account_id.account_type', 'in', account_types),
         ]
-        
+
         if options.get('date_from'):
             domain.append(('date', '>=', options['date_from']))
         if options.get('date_to'):
             domain.append(('date', '<=', options['date_to']))
-        
+
         if options.get('all_entries'):
             domain.append(('parent_state', '!=', 'cancel'))
         else:
             domain.append(('parent_state', '=', 'posted'))
-        
-        move_lines = self.env['account.move.line'].search(domain)
-        partner_ids = move_lines.mapped('partner_id').filtered(lambda p: p)
-        
-        return partner_ids.sorted('name')
-
-    def _get_partner_initial_balance(self, partner, account_types, options):
-        """Get initial balance for a partner"""
-        if not options.get('date_from'):
-            return 0.0
-        
-        domain = [
-            ('partner_id', '=', partner.id),
+        return domain
+
+    def _get_partner_totals(self, account_types, options):
+        """Debit and credit of the period per partner with transactions
+
+        :return: {partner_id: (debit, credit)}
+        """
+        domain = self._get_period_domain(account_types, options) + [('partner_id', '!=', False)]
+        groups = self.env['account.move.line']._read_group(
+            domain, ['partner_id'], ['debit:sum', 'credit:sum'],
+        )
+        return {partner.id: (debit, credit) for partner, debit, credit in groups}
+
+    def _get_partner_initial_balances(self, partner_ids, account_types, options):
+        """Initial balance per partner, from a single grouped query
+
+        :param partner_ids: partners to compute, None for all of them
+        :return: {partner_id: balance}
+        """
+        if not options.get('date_from') or partner_ids == []:
+            return {}
+        domain = self._get_initial_domain(account_types, options)
+        if partner_ids is not None:
+            domain += [('partner_id', 'in', partner_ids)]
+        else:
+            domain += [('partner_id', '!=', False)]
+        groups = self.env['account.move.line']._read_group(
+            domain, ['partner_id'], ['balance:sum'],
+        )
+        return {partner.id: balance for partner, balance in groups}
+
+    def _get_initial_domain(self, account_types, options):
+        """Domain of the partner move lines before the period"""
+        return [
             ('company_id', '=', self.env.company.id),
             ('account_id.account_type', 'in', account_types),
             ('date', '<', options['date_from']),
             ('parent_state', '=', 'posted'),
         ]
-        
-        move_lines = self.env['account.move.line'].search(domain)
-        return sum(move_lines.mapped('debit')) - sum(move_lines.mapped('credit'))
-
-    def _get_partner_move_lines(self, partner, account_types, options):
-        """Get move lines for a partner in the period"""
-        domain = [
-            ('partner_id', '=', partner.id),
-            ('company_id', '=', self.env.company.id),
-            ('account_id.account_type', 'in', account_types),
-        ]
-        
-        if options.get('date_from'):
-            domain.append(('date', '>=', options['date_from']))
-        if options.get('date_to'):
-            domain.append(('date', '<=', options['date_to']))
-        
-        if options.get('all_entries'):
-            domain.append(('parent_state', '!=', 'cancel'))
-        else:
-            domain.append(('parent_state', '=', 'posted'))
-        
-        return self.env['account.move.line'].search(domain)
 
     def _get_columns(self, options):
         """Define columns for partner ledger"""
@@ -14,27 +14,31 @@ class ProfitLossReport(models.TransientModel):
 
     def _get_lines(self, options):
         lines = []
-        
+
+        # Balances of every P&L account over the period and its comparison
+        # periods, computed at once (for every company when consolidated)
+        periods = self._get_report_periods(options)
+        rows = self._get_account_rows(
+            ['income', 'income_other', 'expense_direct_cost', 'expense', 'expense_depreciation'],
+            [(period['date_from'], period['date_to']) for period in periods], options,
+        )
+
+        def _accounts_of_type(*account_types):
+            return [row for row in rows if row['account_type'] in account_types]
+
         # Revenue Section
-        revenue_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['income', 'income_other']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
         revenue_total = self._add_section(
-            lines, _('Revenue'), revenue_accounts, options, negative=True
+            lines, _('Revenue'), _accounts_of_type('income', 'income_other'), options,
+            negative=True
         )
         
         # Cost of Revenue (COGS)
-        cogs_accounts = self.env['account.account'].search([
-            ('account_type', '=', 'expense_direct_cost'),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
         cogs_total = self._add_section(
-            lines, _('Cost of Revenue'), cogs_accounts, options
+            lines, _('Cost of Revenue'), _accounts_of_type('expense_direct_cost'), options
         )
         
         # Gross Profit
-        gross_profit = revenue_total - cogs_total
+        gross_profit = [revenue - cogs for revenue, cogs in zip(revenue_total, cogs_total)]
         lines.append(self._make_total_line(
             _('Gross Profit'), gross_profit, level=0, bold=True
         ))
@@ -42,16 +46,12 @@ class ProfitLossReport(models.TransientModel):
         lines.append({'name': ''})  # Blank line
         
         # Operating Expenses
-        expense_accounts = self.env['account.account'].search([
-            ('account_type', '=', 'expense'),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
         expense_total = self._add_section(
-            lines, _('Operating Expenses'), expense_accounts, options
+            lines, _('Operating Expenses'), _accounts_of_type('expense'), options
         )
         
         # Operating Income
-        operating_income = gross_profit - expense_total
+        operating_income = [profit - expense for profit, expense in zip(gross_profit, expense_total)]
         lines.append(self._make_total_line(
             _('Operating Income'), operating_income, level=0, bold=True
         ))
@@ -59,22 +59,12 @@ class ProfitLossReport(models.TransientModel):
         lines.append({'name': ''})  # Blank line
         
         # Depreciation
-        depreciation_accounts = self.env['account.account'].search([
-            ('account_type', '=', 'expense_depreciation'),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
         depreciation_total = self._add_section(
-            lines, _('Depreciation'), depreciation_accounts, options
+            lines, _('Depreciation'), _accounts_of_type('expense_depreciation'), options
         )
         
-        # Other Income/Expenses
-        other_accounts = self.env['account.account'].search([
-            ('account_type', 'in', ['income_other', 'expense_direct_cost']),
-            ('company_ids', 'in', [self.env.company.id]),
-        ])
-        
         # Net Income Before Tax
-        net_before_tax = operating_income - depreciation_total
+        net_before_tax = [income - depreciation for income, depreciation in zip(operating_income, depreciation_total)]
         lines.append(self._make_total_line(
             _('Net Income Before Tax'), net_before_tax, level=0, bold=True
         ))
@@ -87,8 +77,8 @@ class ProfitLossReport(models.TransientModel):
         
         return lines
 
-    def _add_section(self, lines, title, accounts, options, negative=False):
-        """Add a section with accounts and return total"""
+    def _add_section(self, lines, title, rows, options, negative=False):
+        """Add a section with accounts and return its total of every period"""
         lines.append({
             'name': title,
             'level': 0,
@@ -96,95 +86,46 @@ class ProfitLossReport(models.TransientModel):
             'columns': self._get_blank_columns(options),
         })
         
-        total = 0.0
-        comparison_total = 0.0
+        sign = -1 if negative else 1
+        total = [0.0] * len(self._get_report_periods(options))
         
-        for account in accounts:
-            balance_data = self._compute_account_balance(
-                account, 
-                options.get('date_from'), 
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            balance = balance_data['balance'] * (-1 if negative else 1)
+        for row in rows:
+            # Balance of the period followed by the comparison periods
+            amounts = [period['balance'] * sign for period in row['balances']]
             
             # Skip zero balances unless unfold_all
-            if balance == 0 and not options.get('unfold_all'):
+            if not any(amounts) and not options.get('unfold_all'):
                 continue
             
-            total += balance
-            
-            # Comparison if enabled
-            comparison_balance = 0.0
-            if options.get('comparison'):
-                comp_data = self._get_comparison_data(options)
-                comp_balance_data = self._compute_account_balance(
-                    account,
-                    comp_data['date_from'],
-                    comp_data['date_to'],
-                    state='all' if options.get('all_entries') else 'posted'
-                )
-                comparison_balance = comp_balance_data['balance'] * (-1 if negative else 1)
-                comparison_total += comparison_balance
-            
-            columns = self._format_account_columns(balance, comparison_balance, options)
+            total = [subtotal + amount for subtotal, amount in zip(total, amounts)]
             
             lines.append({
-                'id': f'account_{account.id}',
-                'name': f"{account.code} {account.name}",
+                'id': row['id'],
+                'name': row['name'],
                 'level': 2,
-                'columns': columns,
-                'caret_options': 'account',
+                'columns': self._make_comparison_columns(amounts),
+                'caret_options': row['caret_options'],
             })
         
         # Section total
-        comp_cols = []
-        if options.get('comparison'):
-            variation = total - comparison_total
-            variation_pct = (variation / comparison_total * 100) if comparison_total else 0
-            comp_cols = [
-                {'name': self._format_value(comparison_total)},
-                {'name': self._format_value(variation)},
-                {'name': self._format_value(variation_pct, 'percentage')},
-            ]
-        
         lines.append({
             'name': f"{_('Total')} {title}",
             'level': 1,
             'class': 'total',
-            'columns': [{'name': self._format_value(total)}] + comp_cols,
+            'columns': self._make_comparison_columns(total),
         })
         
         return total
 
-    def _format_account_columns(self, balance, comparison_balance, options):
-        """Format columns for account line"""
-        columns = [{'name': self._format_value(balance)}]
-        
-        if options.get('comparison'):
-            variation = balance - comparison_balance
-            variation_pct = (variation / comparison_balance * 100) if comparison_balance else 0
-            
-            columns.extend([
-                {'name': self._format_value(comparison_balance)},
-                {'name': self._format_value(variation)},
-                {'name': self._format_value(variation_pct, 'percentage')},
-            ])
-        
-        return columns
-
-    def _make_total_line(self, name, amount, level=1, bold=False, class_name='total'):
+    def _make_total_line(self, name, amounts, level=1, bold=False, class_name='total'):
         """Create a total line"""
         return {
             'name': name,
             'level': level,
             'class': class_name,
-            'columns': [{'name': self._format_value(amount)}],
+            'columns': self._make_comparison_columns(amounts),
         }
 
     def _get_blank_columns(self, options):
         """Get blank columns matching the structure"""
-        count = 1
-        if options.get('comparison'):
-            count = 4  # Current + Comparison + Variation + Variation %
-        return [{'name': ''}] * count
+        return [{'name': ''}] * (len(self._get_columns(options)) - 1)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class ReportCache:
+    """Process-wide LRU cache for the ``get_report_data`` results.
+
+    Each entry is stored with the ledger version of its companies at the
+    time it was computed (see ``tekprowess.ledger.change``) and is only
+    served while the version is the same, i.e. as long as no transaction
+    changing their move lines, accounts or currency rates was committed
+    since. The TTL bounds the staleness of what the version does not cover.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()   # key -> (expires_at, version, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, version, value, ttl, max_size):
+        if ttl <= 0 or max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+
+report_cache = ReportCache()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from datetime import timedelta
+import hashlib
+import json
+import time
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+JOB_NOTIFICATION = 'tekprowess_accounting_reports/report_job'
+
+# Running jobs older than this are considered lost (worker killed, server restart)
+JOB_TIMEOUT = timedelta(hours=2)
+
+# Number of jobs rendered per cron run before it triggers itself again
+JOB_BATCH_SIZE = 10
+
+EXPORT_MIMETYPES = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def normalize_options(options):
+    """Report options as JSON compatible values (dates as strings), with
+    sorted keys so that equal options give the same serialization."""
+    return json.loads(json.dumps(options or {}, sort_keys=True, default=str))
+
+
+def options_key(*parts):
+    """Hash identifying a report computed from the given (JSON compatible) parts"""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ReportJob(models.Model):
+    """Financial report export rendered in the background.
+
+    Jobs are queued by :meth:`submit` and rendered by a cron under the
+    user and company that queued them; the result is stored as an
+    attachment and the users waiting for it are notified over the bus.
+    """
+    _name = 'tekprowess.report.job'
+    _description = 'Financial Report Export Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Report', required=True, readonly=True)
+    report_model = fields.Char(string='Report Model', required=True, readonly=True)
+    options = fields.Json(string='Options', readonly=True)
+    output_format = fields.Selection([
+        ('pdf', 'PDF'),
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    ], string='Format', required=True, readonly=True)
+    key = fields.Char(string='Key', required=True, index=True, readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, index=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Requested By', required=True, readonly=True, ondelete='cascade')
+    subscriber_ids = fields.Many2many('res.users', string='Notified Users', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', required=True, readonly=True, ondelete='cascade')
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True, ondelete='set null')
+    date_started = fields.Datetime(string='Started On', readonly=True)
+    date_done = fields.Datetime(string='Finished On', readonly=True)
+    duration = fields.Float(string='Duration (s)', digits=(16, 1), readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    # -------------------------------------------------------------------------
+    # Queueing
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def submit(self, report_model, options, output_format):
+        """Queue the export of a report, or join the identical export already
+        pending or running for the current user and company. Exports are
+        rendered as the user who queued them, so they are never shared with
+        users of other access rights.
+
+        :return: id of the job
+        """
+        if output_format not in EXPORT_MIMETYPES:
+            raise UserError(_("Unsupported export format: %s", output_format))
+        report = self.env[report_model]
+        if not isinstance(report, self.env.registry['tekprowess.financial.report.abstract']):
+            raise UserError(_("%s is not a financial report.", report_model))
+        report.check_access('create')
+
+        options = normalize_options(options)
+        key = options_key(report_model, options, output_format, self.env.company.id, self.env.uid)
+        Job = self.sudo()
+        job = Job.search([
+            ('key', '=', key),
+            '|',
+            ('state', '=', 'pending'),
+            '&', ('state', '=', 'running'), ('date_started', '>', fields.Datetime.now() - JOB_TIMEOUT),
+        ], limit=1)
+        if job:
+            job.subscriber_ids = [fields.Command.link(self.env.uid)]
+            return job.id
+
+        job = Job.create({
+            'name': report._get_report_name(),
+            'report_model': report_model,
+            'options': options,
+            'output_format': output_format,
+            'key': key,
+            'user_id': self.env.uid,
+            'subscriber_ids': [fields.Command.link(self.env.uid)],
+            'company_id': self.env.company.id,
+        })
+        Job.env.ref('tekprowess_accounting_reports.ir_cron_report_job')._trigger()
+        return job.id
+
+    # -------------------------------------------------------------------------
+    # Rendering
+    # -------------------------------------------------------------------------
+
+    @api.model
+    def _run_jobs(self, limit=JOB_BATCH_SIZE):
+        """Render the pending jobs, committing after each of them (cron)"""
+        stale = self.search([
+            ('state', '=', 'running'),
+            ('date_started', '<=', fields.Datetime.now() - JOB_TIMEOUT),
+        ])
+        if stale:
+            stale.write({'state': 'failed', 'error': _("The export was interrupted.")})
+            stale._notify()
+            self.env.cr.commit()
+
+        jobs = self.search([('state', '=', 'pending')], order='id', limit=limit + 1)
+        for job in jobs[:limit]:
+            job._run()
+        if len(jobs) > limit:
+            self.env.ref('tekprowess_accounting_reports.ir_cron_report_job')._trigger()
+
+    def _run(self):
+        self.ensure_one()
+        self.write({'state': 'running', 'date_started': fields.Datetime.now()})
+        self.env.cr.commit()
+
+        start = time.perf_counter()
+        try:
+            content = self._render()
+            attachment = self.env['ir.attachment'].create({
+                'name': '%s.%s' % (self.name.lower().replace(' ', '_'), self.output_format),
+                'raw': content,
+                'mimetype': EXPORT_MIMETYPES[self.output_format],
+                'res_model': self._name,
+                'res_id': self.id,
+            })
+            self.write({
+                'state': 'done',
+                'attachment_id': attachment.id,
+                'date_done': fields.Datetime.now(),
+                'duration': time.perf_counter() - start,
+            })
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.warning("Report export job %s failed", self.id, exc_info=True)
+            self.write({
+                'state': 'failed',
+                'error': str(e),
+                'date_done': fields.Datetime.now(),
+                'duration': time.perf_counter() - start,
+            })
+        self._notify()
+        self.env.cr.commit()
+
+    def _render(self):
+        """Content of the export, computed as the user who queued it"""
+        report = self.env[self.report_model].with_user(self.user_id).with_company(self.company_id).with_context(
+            allowed_company_ids=self.company_id.ids,
+        )
+        if self.output_format == 'pdf':
+            return report.get_pdf(self.options)
+        export_file = {
+            'xlsx': report._get_xlsx_file,
+            'csv': report._get_csv_file,
+            'parquet': report._get_parquet_file,
+        }[self.output_format](self.options)
+        with export_file:
+            return export_file.read()
+
+    def _notify(self):
+        for job in self:
+            payload = {
+                'id': job.id,
+                'name': job.name,
+                'output_format': job.output_format,
+                'state': job.state,
+                'url': '/web/content/%s?download=true' % job.attachment_id.id if job.attachment_id else False,
+                'error': job.error,
+            }
+            for user in job.subscriber_ids:
+                user._bus_send(JOB_NOTIFICATION, payload)
+
+    @api.autovacuum
+    def _gc_jobs(self):
+        """Drop the jobs finished for more than a week, with their file"""
+        jobs = self.search([
+            ('state', 'in', ('done', 'failed')),
+            ('date_done', '<', fields.Datetime.now() - timedelta(days=7)),
+        ])
+        jobs.attachment_id.unlink()
+        jobs.unlink()
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    # Rates convert the consolidated and foreign currency amounts: a change
+    # outdates the cached results of the company of the rate, or of every
+    # company for the shared rates
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rates = super().create(vals_list)
+        rates._mark_ledger_change()
+        return rates
+
+    def _write(self, vals):
+        self._mark_ledger_change()
+        if vals.get('company_id'):
+            self.env['tekprowess.ledger.change']._mark([vals['company_id']])
+        return super()._write(vals)
+
+    def unlink(self):
+        self._mark_ledger_change()
+        return super().unlink()
+
+    def _mark_ledger_change(self):
+        if self:
+            self.env['tekprowess.ledger.change']._mark({rate.company_id.id or None for rate in self.sudo()})
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.tools import SQL
 from collections import defaultdict
+from dateutil.relativedelta import relativedelta
 
 
 class TaxReport(models.TransientModel):
@@ -26,88 +28,132 @@ class TaxReport(models.TransientModel):
                 'columns': [{'name': ''}],
             }]
         
+        # Base and tax amounts of every tax, per month if requested
+        months = self._get_tax_months(options)
+        matrix = self._compute_tax_matrix(taxes, options, monthly=bool(months))
+        
         # Group taxes by type
         sales_taxes = taxes.filtered(lambda t: t.type_tax_use == 'sale')
         purchase_taxes = taxes.filtered(lambda t: t.type_tax_use == 'purchase')
         
         # Sales Tax Section
         if sales_taxes:
-            lines.append(self._make_header(_('Sales Tax')))
-            sales_total_base, sales_total_tax = self._add_tax_section(
-                lines, sales_taxes, options, 'sale'
-            )
+            lines.append(self._make_header(_('Sales Tax'), months))
+            sales_totals = self._add_tax_section(lines, sales_taxes, options, matrix, months)
             
             lines.append(self._make_total_line(
                 _('Total Sales Tax'),
-                sales_total_base,
-                sales_total_tax,
+                sales_totals,
                 level=1
             ))
             lines.append({'name': ''})  # Blank line
         
         # Purchase Tax Section
         if purchase_taxes:
-            lines.append(self._make_header(_('Purchase Tax')))
-            purchase_total_base, purchase_total_tax = self._add_tax_section(
-                lines, purchase_taxes, options, 'purchase'
-            )
+            lines.append(self._make_header(_('Purchase Tax'), months))
+            purchase_totals = self._add_tax_section(lines, purchase_taxes, options, matrix, months)
             
             lines.append(self._make_total_line(
                 _('Total Purchase Tax'),
-                purchase_total_base,
-                purchase_total_tax,
+                purchase_totals,
                 level=1
             ))
             lines.append({'name': ''})  # Blank line
         
         # Net Tax Position
         if sales_taxes and purchase_taxes:
-            net_tax = sales_total_tax - purchase_total_tax
             lines.append(self._make_total_line(
                 _('Net Tax Position (Payable/Refundable)'),
-                0,  # No base for net position
-                net_tax,
+                [
+                    # No base for net position
+                    (0, sales_tax - purchase_tax)
+                    for (_sales_base, sales_tax), (_purchase_base, purchase_tax)
+                    in zip(sales_totals, purchase_totals)
+                ],
                 level=0,
                 class_name='total o_account_reports_domain_total'
             ))
         
         return lines
 
-    def _add_tax_section(self, lines, taxes, options, tax_type):
-        """Add tax section and return totals"""
-        total_base = 0.0
-        total_tax = 0.0
+    def _add_tax_section(self, lines, taxes, options, matrix, months):
+        """Add tax section and return totals
+
+        :return: [(base, tax)] per month, then for the whole period
+        """
+        totals = [(0.0, 0.0)] * (len(months) + 1)
         
         for tax in taxes:
-            # Get tax data from account.move.line
-            base_amount, tax_amount = self._compute_tax_amounts(tax, options)
+            amounts = [self._get_tax_cell(tax, matrix, month) for month in months]
+            amounts.append(self._get_tax_cell(tax, matrix))
+            base_amount, tax_amount = amounts[-1]
             
             if base_amount == 0 and tax_amount == 0:
                 if not options.get('unfold_all'):
                     continue
             
-            total_base += base_amount
-            total_tax += tax_amount
+            totals = [
+                (total_base + base, total_tax + tax_value)
+                for (total_base, total_tax), (base, tax_value) in zip(totals, amounts)
+            ]
             
+            columns = []
+            for base, tax_value in amounts:
+                columns += [self._make_amount_column(base), self._make_amount_column(tax_value)]
             lines.append({
                 'id': f'tax_{tax.id}',
                 'name': f"{tax.name} ({tax.amount}%)",
                 'level': 2,
-                'columns': [
-                    {'name': self._format_value(base_amount), 'no_format': base_amount},
-                    {'name': self._format_value(tax_amount), 'no_format': tax_amount},
-                ],
+                'columns': columns,
                 'caret_options': 'account.tax',
             })
         
-        return total_base, total_tax
+        return totals
 
-    def _compute_tax_amounts(self, tax, options):
-        """Compute base and tax amounts for a tax"""
-        domain = [
-            ('company_id', '=', self.env.company.id),
-            ('tax_line_id', '=', tax.id),
-        ]
+    def _get_tax_cell(self, tax, matrix, month=None):
+        """Base and tax amounts of ``tax`` in ``month`` (None for the whole
+        period), as displayed"""
+        cells = matrix.get(tax.id, {})
+        if month is None:
+            base_amount = sum(base for base, _tax in cells.values())
+            tax_amount = sum(tax_value for _base, tax_value in cells.values())
+        else:
+            base_amount, tax_amount = cells.get(month, (0.0, 0.0))
+        
+        # For sales tax, use absolute values; for purchase, consider sign
+        if tax.type_tax_use == 'sale':
+            base_amount = abs(base_amount)
+            tax_amount = abs(tax_amount)
+        else:
+            base_amount = -base_amount if base_amount < 0 else base_amount
+            tax_amount = -tax_amount if tax_amount < 0 else tax_amount
+        
+        return base_amount, tax_amount
+
+    def _get_tax_months(self, options):
+        """First day of each month of the period when the report is split
+        by month, an empty list otherwise"""
+        if not (options.get('tax_monthly') and options.get('date_from') and options.get('date_to')):
+            return []
+        month = fields.Date.to_date(options['date_from']).replace(day=1)
+        date_to = fields.Date.to_date(options['date_to'])
+        months = []
+        while month <= date_to:
+            months.append(month)
+            month += relativedelta(months=1)
+        return months
+
+    def _compute_tax_matrix(self, taxes, options, monthly=False):
+        """Base and tax amounts (balances) of all ``taxes`` from one grouped
+        query.
+
+        Tax lines count for their ``tax_line_id``, the other lines for each
+        of their ``tax_ids``, the relation table being joined once.
+
+        :return: {tax_id: {month: (base, tax)}}, month being None unless
+            ``monthly`` is set
+        """
+        domain = [('company_id', '=', self.env.company.id)]
         
         # Date filtering
         if options.get('date_from'):
@@ -121,71 +167,71 @@ class TaxReport(models.TransientModel):
         else:
             domain.append(('parent_state', '=', 'posted'))
         
-        # Get tax lines
-        tax_lines = self.env['account.move.line'].search(domain)
-        
-        # Tax amount is the balance of tax lines
-        tax_amount = sum(tax_lines.mapped('balance'))
-        
-        # Get base amount from invoice lines with this tax
-        base_domain = [
-            ('company_id', '=', self.env.company.id),
-            ('tax_ids', 'in', [tax.id]),
-            ('tax_line_id', '=', False),  # Exclude tax lines
-        ]
-        
-        if options.get('date_from'):
-            base_domain.append(('date', '>=', options['date_from']))
-        if options.get('date_to'):
-            base_domain.append(('date', '<=', options['date_to']))
-        
-        if options.get('all_entries'):
-            base_domain.append(('parent_state', '!=', 'cancel'))
-        else:
-            base_domain.append(('parent_state', '=', 'posted'))
-        
-        base_lines = self.env['account.move.line'].search(base_domain)
-        base_amount = sum(base_lines.mapped('balance'))
-        
-        # For sales tax, use absolute values; for purchase, consider sign
-        if tax.type_tax_use == 'sale':
-            base_amount = abs(base_amount)
-            tax_amount = abs(tax_amount)
-        else:
-            base_amount = -base_amount if base_amount < 0 else base_amount
-            tax_amount = -tax_amount if tax_amount < 0 else tax_amount
-        
-        return base_amount, tax_amount
+        field = self.env['account.move.line']._fields['tax_ids']
+        query = self.env['account.move.line']._search(domain)
+        # Tax lines are excluded from the base of the taxes they are subject to
+        query.add_join('LEFT JOIN', 'tax_rel', field.relation, SQL(
+            "%s = account_move_line.id AND account_move_line.tax_line_id IS NULL",
+            SQL.identifier('tax_rel', field.column1),
+        ))
+        tax_id = SQL("COALESCE(account_move_line.tax_line_id, %s)", SQL.identifier('tax_rel', field.column2))
+        query.add_where(SQL("%s IN %s", tax_id, tuple(taxes.ids)))
+        month = SQL("date_trunc('month', account_move_line.date)::date") if monthly else SQL("NULL::date")
+        query.groupby = SQL("%s, %s", tax_id, month)
+        self.env.cr.execute(query.select(
+            tax_id,
+            month,
+            SQL("SUM(account_move_line.balance) FILTER (WHERE account_move_line.tax_line_id IS NULL)"),
+            SQL("SUM(account_move_line.balance) FILTER (WHERE account_move_line.tax_line_id IS NOT NULL)"),
+        ))
+        
+        matrix = defaultdict(dict)
+        for tax_id, month, base_amount, tax_amount in self.env.cr.fetchall():
+            matrix[tax_id][month] = (base_amount or 0.0, tax_amount or 0.0)
+        return matrix
+
+    def _compute_tax_amounts(self, tax, options):
+        """Compute base and tax amounts for a tax"""
+        return self._get_tax_cell(tax, self._compute_tax_matrix(tax, options))
 
-    def _make_header(self, name):
+    def _make_header(self, name, months=()):
         """Create a header line"""
         return {
             'name': name,
             'level': 1,
             'class': 'o_account_reports_level1',
-            'columns': [
-                {'name': ''},
-                {'name': ''},
-            ],
+            'columns': [{'name': ''}] * (2 * (len(months) + 1)),
         }
 
-    def _make_total_line(self, name, base_amount, tax_amount, level=1, class_name='total'):
-        """Create a total line"""
+    def _make_total_line(self, name, amounts, level=1, class_name='total'):
+        """Create a total line
+
+        :param amounts: [(base, tax)] per month, then for the whole period
+        """
+        columns = []
+        for base_amount, tax_amount in amounts:
+            columns.append(
+                self._make_amount_column(base_amount) if base_amount != 0 else {'name': ''}
+            )
+            columns.append(self._make_amount_column(tax_amount))
         return {
             'name': name,
             'level': level,
             'class': class_name,
-            'columns': [
-                {'name': self._format_value(base_amount) if base_amount != 0 else ''},
-                {'name': self._format_value(tax_amount)},
-            ],
+            'columns': columns,
         }
 
     def _get_columns(self, options):
         """Define columns for tax report"""
+        columns = [{'name': _('Tax'), 'class': 'text-left'}]
+        for month in self._get_tax_months(options):
+            month_str = month.strftime('%b %Y')
+            columns += [
+                {'name': _('Tax Base') + f' ({month_str})', 'class': 'number'},
+                {'name': _('Tax Amount') + f' ({month_str})', 'class': 'number'},
+            ]
         period_str = f"{options.get('date_from', '')} to {options.get('date_to', '')}"
-        return [
-            {'name': _('Tax'), 'class': 'text-left'},
+        return columns + [
             {'name': _('Tax Base') + f' ({period_str})', 'class': 'number'},
             {'name': _('Tax Amount') + f' ({period_str})', 'class': 'number'},
         ]
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from datetime import timedelta
 
 
 class TrialBalanceReport(models.TransientModel):
@@ -14,10 +15,6 @@ class TrialBalanceReport(models.TransientModel):
     def _get_lines(self, options):
         lines = []
         
-        accounts = self.env['account.account'].search([
-            ('company_ids', 'in', [self.env.company.id])
-        ], order='code')
-        
         total_initial_debit = 0.0
         total_initial_credit = 0.0
         total_period_debit = 0.0
@@ -25,39 +22,49 @@ class TrialBalanceReport(models.TransientModel):
         total_end_debit = 0.0
         total_end_credit = 0.0
         
-        for account in accounts:
+        # Period movement, initial balance and ending balance of every
+        # comparison period of every account, all from one query per source
+        # (and per company when consolidated)
+        date_from = fields.Date.to_date(options.get('date_from'))
+        comparison_periods = self._get_comparison_periods(options)
+        ranges = [(date_from, options.get('date_to'))]
+        if date_from:
+            ranges.append((None, date_from - timedelta(days=1)))
+        comparison_index = len(ranges)
+        ranges += [(None, period['date_to']) for period in comparison_periods]
+        rows = self._get_account_rows(None, ranges, options, order='code')
+        total_comparisons = [0.0] * len(comparison_periods)
+
+        for row in rows:
+            account_balances = row['balances']
+
             # Initial Balance
-            initial_balance = self._compute_initial_balance(
-                account, options.get('date_from')
-            )
+            initial_balance = account_balances[1]['balance'] if date_from else 0.0
             initial_debit = initial_balance if initial_balance > 0 else 0.0
             initial_credit = -initial_balance if initial_balance < 0 else 0.0
             
             # Period Movement
-            period_data = self._compute_account_balance(
-                account,
-                options.get('date_from'),
-                options.get('date_to'),
-                state='all' if options.get('all_entries') else 'posted'
-            )
-            period_debit = period_data['debit']
-            period_credit = period_data['credit']
+            period_debit = account_balances[0]['debit']
+            period_credit = account_balances[0]['credit']
             
             # End Balance
-            end_balance = initial_balance + period_data['balance']
+            end_balance = initial_balance + account_balances[0]['balance']
             end_debit = end_balance if end_balance > 0 else 0.0
             end_credit = -end_balance if end_balance < 0 else 0.0
             
+            # End Balance of the comparison periods
+            comparisons = [period['balance'] for period in account_balances[comparison_index:]]
+            
             # Skip accounts with no activity
             if all(v == 0 for v in [initial_debit, initial_credit, 
                                      period_debit, period_credit,
-                                     end_debit, end_credit]):
+                                     end_debit, end_credit, *comparisons]):
                 if not options.get('unfold_all'):
                     continue
             
             lines.append({
-                'id': f'account_{account.id}',
-                'name': f"{account.code} {account.name}",
+                'id': row['id'],
+                'name': row['name'],
                 'level': 1,
                 'columns': [
                     {'name': self._format_value(initial_debit), 'no_format': initial_debit},
@@ -66,8 +73,8 @@ class TrialBalanceReport(models.TransientModel):
                     {'name': self._format_value(period_credit), 'no_format': period_credit},
                     {'name': self._format_value(end_debit), 'no_format': end_debit},
                     {'name': self._format_value(end_credit), 'no_format': end_credit},
-                ],
-                'caret_options': 'account',
+                ] + [self._make_amount_column(balance) for balance in comparisons],
+                'caret_options': row['caret_options'],
             })
             
             # Accumulate totals
@@ -77,6 +84,7 @@ class TrialBalanceReport(models.TransientModel):
             total_period_credit += period_credit
             total_end_debit += end_debit
             total_end_credit += end_credit
+            total_comparisons = [total + balance for total, balance in zip(total_comparisons, comparisons)]
         
         # Total line
         lines.append({
@@ -90,7 +98,7 @@ class TrialBalanceReport(models.TransientModel):
                 {'name': self._format_value(total_period_credit), 'no_format': total_period_credit},
                 {'name': self._format_value(total_end_debit), 'no_format': total_end_debit},
                 {'name': self._format_value(total_end_credit), 'no_format': total_end_credit},
-            ],
+            ] + [self._make_amount_column(balance) for balance in total_comparisons],
         })
         
         return lines
@@ -105,4 +113,7 @@ class TrialBalanceReport(models.TransientModel):
             {'name': _('Period Credit'), 'class': 'number'},
             {'name': _('End Debit'), 'class': 'number'},
             {'name': _('End Credit'), 'class': 'number'},
+        ] + [
+            {'name': _('Balance as of %s', period['date_to']), 'class': 'number'}
+            for period in self._get_comparison_periods(options)
         ]
@@ -4,6 +4,7 @@ import { registry } from "@web/core/registry";
 import { Layout } from "@web/search/layout";
 import { Component, onWillStart, useState } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
+import { _t } from "@web/core/l10n/translation";
 
 /**
  * Financial Reports Controller
@@ -13,6 +14,7 @@ export class FinancialReportController extends Component {
     setup() {
         this.orm = useService("orm");
         this.action = useService("action");
+        this.notification = useService("notification");
 
         this.state = useState({
             lines: [],
@@ -22,6 +24,8 @@ export class FinancialReportController extends Component {
             reportName: "",
         });
 
+        this.linesById = new Map();
+
         onWillStart(async () => {
             await this.loadReport();
         });
@@ -46,6 +50,7 @@ export class FinancialReportController extends Component {
             );
 
             this.state.lines = result.lines || [];
+            this.indexLines();
             this.state.columns = result.columns || [];
             this.state.reportName = result.report_name || "";
             this.state.options = options;
@@ -57,12 +62,82 @@ export class FinancialReportController extends Component {
     }
 
     /**
-     * Toggle unfold/fold for a line
+     * Toggle unfold/fold for a line, fetching its children the first time
+     * when the report loads them lazily
+     */
+    async toggleUnfold(lineId) {
+        const line = this.linesById.get(lineId);
+        if (!line || !line.unfoldable) {
+            return;
+        }
+        line.unfolded = !line.unfolded;
+        if (line.unfolded && line.children_loaded === false && !line.children_loading) {
+            line.children_loading = true;
+            const lines = await this.fetchLines(line.id, this.state.options);
+            line.children_loading = false;
+            if (!lines) {
+                // Folded back, so that unfolding it again retries
+                line.unfolded = false;
+                return;
+            }
+            line.children_loaded = true;
+            const index = this.state.lines.indexOf(line);
+            this.state.lines.splice(index + 1, 0, ...lines);
+            this.indexLines();
+        }
+    }
+
+    /**
+     * Replace a "load more" line by the next page of lines
      */
-    toggleUnfold(lineId) {
-        const line = this.state.lines.find(l => l.id === lineId);
-        if (line && line.unfoldable) {
-            line.unfolded = !line.unfolded;
+    async loadMore(line) {
+        if (line.loading) {
+            return;
+        }
+        line.loading = true;
+        const lines = await this.fetchLines(line.parent_id, { ...this.state.options, cursor: line.cursor });
+        line.loading = false;
+        if (!lines) {
+            // Keep the "load more" line to retry
+            return;
+        }
+        const index = this.state.lines.indexOf(line);
+        this.state.lines.splice(index, 1, ...lines);
+        this.indexLines();
+    }
+
+    /**
+     * Map the lines by id, so that finding the parent of each displayed line
+     * does not scan the whole list
+     */
+    indexLines() {
+        this.linesById = new Map();
+        for (const line of this.state.lines) {
+            if (line.id) {
+                this.linesById.set(line.id, line);
+            }
+        }
+    }
+
+    /**
+     * Fetch the lines displayed under an unfolded line, or null when they
+     * could not be loaded (the user is notified)
+     */
+    async fetchLines(lineId, options) {
+        try {
+            const result = await this.orm.call(
+                this.props.action.res_model,
+                'get_report_data',
+                [],
+                { options, line_id: lineId }
+            );
+            return result.lines || [];
+        } catch (error) {
+            this.notification.add(error.data?.message || error.message, {
+                title: _t("The lines could not be loaded"),
+                type: "danger",
+            });
+            return null;
         }
     }
 
@@ -102,6 +177,22 @@ export class FinancialReportController extends Component {
         }
     }
 
+    /**
+     * Queue the export of the report, rendered in the background; the
+     * user is notified when the file is ready. A refused export (access,
+     * unsupported format) reaches the standard error dialog.
+     */
+    async exportInBackground(outputFormat) {
+        await this.orm.call(
+            'tekprowess.report.job',
+            'submit',
+            [this.props.action.res_model, this.state.options, outputFormat]
+        );
+        this.notification.add(_t("The export is being prepared, you will be notified when it is ready."), {
+            type: "info",
+        });
+    }
+
     /**
      * Drill down into a line (open related records)
      */
@@ -160,7 +251,7 @@ export class FinancialReportController extends Component {
         }
 
         // Find parent line
-        const parentLine = this.state.lines.find(l => l.id === line.parent_id);
+        const parentLine = this.linesById.get(line.parent_id);
         if (!parentLine) {
             return true;
         }
@@ -0,0 +1,40 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { _t } from "@web/core/l10n/translation";
+
+/**
+ * Notify the user when a financial report export queued in the background
+ * is ready (or failed), with a button to download the file
+ */
+export const reportJobService = {
+    dependencies: ["bus_service", "notification"],
+
+    start(env, { bus_service, notification }) {
+        bus_service.subscribe("tekprowess_accounting_reports/report_job", (job) => {
+            if (job.state === "done") {
+                const close = notification.add(_t("%s export is ready.", job.name), {
+                    type: "success",
+                    sticky: true,
+                    buttons: [
+                        {
+                            name: _t("Download"),
+                            primary: true,
+                            onClick: () => {
+                                window.location.href = job.url;
+                                close();
+                            },
+                        },
+                    ],
+                });
+            } else {
+                notification.add(job.error || _t("The export failed."), {
+                    title: _t("%s export failed", job.name),
+                    type: "danger",
+                });
+            }
+        });
+    },
+};
+
+registry.category("services").add("tekprowess_report_job", reportJobService);
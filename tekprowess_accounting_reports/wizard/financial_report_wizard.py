@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+
+from odoo.addons.tekprowess_dashboard.models.perf_log import profiled
 
 
 class FinancialReportWizard(models.TransientModel):
@@ -27,7 +29,13 @@ class FinancialReportWizard(models.TransientModel):
     comparison_type = fields.Selection([
         ('previous_period', 'Previous Period'),
         ('same_last_year', 'Same Period Last Year'),
+        ('ytd', 'Year to Date'),
     ], string='Compare With', default='previous_period')
+    comparison_periods = fields.Integer(
+        'Number of Periods', default=1,
+        help="Number of comparison columns: previous periods, same period of the previous years, "
+             "or year to date of the current and previous years.",
+    )
 
     all_entries = fields.Boolean('Include Unposted Entries', default=False)
     unfold_all = fields.Boolean('Unfold All', default=False)
@@ -41,6 +49,32 @@ class FinancialReportWizard(models.TransientModel):
         ('all', 'All Partners'),
     ], string='Partner Type', default='all')
 
+    # Aged receivable / payable specific
+    aging_periods = fields.Char(
+        'Aging Periods', default='30,60,90,120',
+        help="Upper bounds, in days overdue, of the aging columns; amounts overdue for longer are "
+             "gathered in a last column.",
+    )
+
+    # Tax report specific
+    tax_monthly = fields.Boolean(
+        'Monthly Columns',
+        help="Show the tax base and amount of each month of the period next to the period totals.",
+    )
+
+    # Trial balance / profit & loss specific
+    consolidated = fields.Boolean(
+        'Consolidate Companies',
+        help="Sum the figures of all the selected companies per account code, translated into the "
+             "currency of the current company.",
+    )
+
+    @api.constrains('comparison_periods')
+    def _check_comparison_periods(self):
+        for wizard in self:
+            if wizard.comparison and not 1 <= wizard.comparison_periods <= 36:
+                raise ValidationError(_("The number of comparison periods must be between 1 and 36."))
+
     @api.onchange('report_type')
     def _onchange_report_type(self):
         """Set default date range based on report type"""
@@ -71,6 +105,7 @@ class FinancialReportWizard(models.TransientModel):
         
         return res
 
+    @profiled
     def generate_report(self):
         """Generate and display the selected report"""
         self.ensure_one()
@@ -102,25 +137,37 @@ class FinancialReportWizard(models.TransientModel):
             }
         }
 
+    @profiled
     def export_pdf(self):
-        """Export report to PDF"""
-        self.ensure_one()
-        
-        options = self._build_options()
-        report_model = self._get_report_model()
-        
-        report = self.env[report_model].create({})
-        return report.export_to_pdf(options)
+        """Export report to PDF in the background"""
+        return self._export_in_background('pdf')
 
+    @profiled
     def export_xlsx(self):
-        """Export report to Excel"""
+        """Export report to Excel in the background"""
+        return self._export_in_background('xlsx')
+
+    def _export_in_background(self, output_format):
+        """Queue the export of the report; the user is notified when the
+        file is ready to download"""
         self.ensure_one()
         
         options = self._build_options()
         report_model = self._get_report_model()
         
-        report = self.env[report_model].create({})
-        return report.export_to_xlsx(options)
+        if not report_model:
+            raise UserError(_('Invalid report type selected'))
+        
+        self.env['tekprowess.report.job'].submit(report_model, options, output_format)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'type': 'info',
+                'message': _("The export is being prepared, you will be notified when it is ready."),
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
 
     def _build_options(self):
         """Build options dictionary from wizard fields"""
@@ -129,6 +176,7 @@ class FinancialReportWizard(models.TransientModel):
             'date_to': self.date_to,
             'comparison': self.comparison,
             'comparison_type': self.comparison_type if self.comparison else False,
+            'comparison_periods': self.comparison_periods if self.comparison else 0,
             'all_entries': self.all_entries,
             'unfold_all': self.unfold_all,
             'journals': self.journal_ids.ids,
@@ -140,6 +188,12 @@ class FinancialReportWizard(models.TransientModel):
             options['partner_type'] = self.partner_type
         elif self.report_type in ['aged_receivable', 'aged_payable']:
             options['report_type'] = 'receivable' if self.report_type == 'aged_receivable' else 'payable'
+            options['aging_periods'] = self.aging_periods
+        elif self.report_type == 'tax_report':
+            options['tax_monthly'] = self.tax_monthly
+        if self.report_type in ['trial_balance', 'profit_loss'] and self.consolidated:
+            options['consolidated'] = True
+            options['company_ids'] = self.env.companies.ids
         
         return options
 
@@ -20,11 +20,15 @@
     'version': '18.0.1.0.0',
     'depends': [
         'base',
+        'bus',
     ],
     'data': [
         'security/ir.model.access.csv',
         'views/dashboard_views.xml',
+        'views/perf_log_views.xml',
         'data/create_menus.xml',
+        'data/dashboard_snapshot_data.xml',
+        'data/perf_log_data.xml',
     ],
     'assets': {
         'web.assets_backend': [
@@ -1 +1,5 @@
 from . import dashboard
+from . import dashboard_snapshot
+from . import models
+from . import perf_log
+from . import ir_websocket
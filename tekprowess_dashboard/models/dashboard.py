@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, api, fields
-from datetime import date, timedelta
+from odoo.exceptions import AccessError
+from odoo.tools import SQL
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from collections import defaultdict
 import json
 
+from .dashboard_cache import dashboard_cache
+from .dashboard_snapshot import DASHBOARD_SOURCES
+from .perf_log import profiled
+
 
 import logging
 
@@ -105,62 +111,258 @@ class TekprowessManufacturingDashboard(models.TransientModel):
             })
         return months
 
+    def _get_shared_data(self):
+        """Values shared by every dashboard section (month buckets, currency,
+        companies), prefetched once per request by get_dashboard_bundle."""
+        shared = self.env.context.get('dashboard_shared')
+        if shared is None:
+            shared = {
+                'months': self._get_month_labels(6),
+                'currency_symbol': self.env.company.currency_id.symbol or '$',
+                'multi_company': len(self.env.companies) > 1,
+            }
+        return shared
+
+    # -------------------------------------------------------------------------
+    # Aggregation layer
+    # -------------------------------------------------------------------------
+
+    def _group_key(self, value):
+        """Normalize a _read_group group value into a hashable plain key."""
+        if isinstance(value, models.BaseModel):
+            return value.id
+        if isinstance(value, datetime):
+            return value.date()
+        return value
+
+    def _aggregate(self, model_name, domain, groupby, aggregates=('__count',)):
+        """Run a single grouped query and index the aggregates by group key.
+
+        Keys are the normalized group values (a tuple unless grouping on exactly
+        one field), values are the tuple of requested aggregates.
+        """
+        Model = self.env[model_name]
+        nb_groups = len(groupby)
+        result = {}
+        for row in Model._read_group(domain, groupby, aggregates):
+            key = tuple(self._group_key(v) for v in row[:nb_groups])
+            result[key[0] if nb_groups == 1 else key] = tuple(v or 0 for v in row[nb_groups:])
+        return result
+
+    def _aggregate_by_month(self, model_name, date_field, domain, months, groupby=(), aggregates=('__count',)):
+        """Aggregate records per month bucket of ``date_field`` in one query.
+
+        Returns ``{extra_group_key: [aggregates per month]}`` aligned with
+        ``months`` (as built by :meth:`_get_month_labels`); months without any
+        record are filled with zeros.  Without extra ``groupby`` the result is
+        keyed by ``None``.
+        """
+        is_date = self.env[model_name]._fields[date_field].type == 'date'
+        start, end = months[0]['start'], months[-1]['end']
+        if is_date:
+            start, end = start.date(), end.date()
+        domain = list(domain) + [(date_field, '>=', start), (date_field, '<=', end)]
+        groupby = list(groupby)
+        rows = self._aggregate(model_name, domain, groupby + ['%s:month' % date_field], aggregates)
+
+        month_keys = [m['start'].date() for m in months]
+        empty = tuple(0 for _agg in aggregates)
+        result = defaultdict(lambda: [empty] * len(months))
+        for key, values in rows.items():
+            key = key if isinstance(key, tuple) else (key,)
+            group, month = key[:-1], key[-1]
+            if month not in month_keys:
+                continue
+            group = (group if len(group) > 1 else group[0]) if group else None
+            result[group][month_keys.index(month)] = values
+        return result
+
+    def _get_top_partners(self, model_name, domain, amount_field, limit=5):
+        """Partners with the highest sum of ``amount_field``, ranked in SQL."""
+        rows = self.env[model_name]._read_group(
+            domain, ['partner_id'], ['%s:sum' % amount_field],
+            order='%s:sum desc' % amount_field, limit=limit,
+        )
+        return [(partner.name or 'Unknown', amount or 0.0) for partner, amount in rows]
+
+    def _get_workcenter_utilization(self, domain, limit=5):
+        """Work order totals, busy time and load of every work center from a
+        single grouped query, busiest work centers first.
+
+        ``load`` is the expected time of the open work orders as a percentage
+        of one day of the work center capacity: working hours of its calendar
+        weighted by its efficiency rate.
+        """
+        totals = defaultdict(lambda: {'total': 0, 'done': 0, 'busy': 0.0, 'queued': 0.0})
+        for workcenter, state, count, duration, expected in self.env['mrp.workorder']._read_group(
+            domain, ['workcenter_id', 'state'], ['__count', 'duration:sum', 'duration_expected:sum'],
+        ):
+            wc_totals = totals[workcenter.id]
+            wc_totals['total'] += count
+            wc_totals['busy'] += duration or 0.0
+            if state == 'done':
+                wc_totals['done'] += count
+            elif state != 'cancel':
+                wc_totals['queued'] += expected or 0.0
+
+        workcenters = self.env['mrp.workcenter'].browse(list(totals))
+        # capacity / efficiency_rate are added by tekprowess_manufacturing
+        has_capacity = 'capacity' in workcenters._fields
+        workcenters.fetch(['name', 'resource_calendar_id', 'time_efficiency']
+                          + (['capacity', 'efficiency_rate'] if has_capacity else []))
+
+        result = []
+        for wc in workcenters:
+            wc_totals = totals[wc.id]
+            efficiency = (wc.efficiency_rate if has_capacity else wc.time_efficiency) or 100.0
+            minutes_per_day = (wc.resource_calendar_id.hours_per_day or 8.0) * 60 * efficiency / 100
+            result.append({
+                'id': wc.id,
+                'name': wc.name,
+                'total': wc_totals['total'],
+                'done': wc_totals['done'],
+                'pct': round(wc_totals['done'] / wc_totals['total'] * 100) if wc_totals['total'] else 0,
+                'busy_minutes': round(wc_totals['busy']),
+                'capacity': round(wc.capacity * efficiency / 100, 2) if has_capacity else 0.0,
+                'load': round(wc_totals['queued'] / minutes_per_day * 100) if minutes_per_day else 0,
+            })
+        result.sort(key=lambda row: (row['load'], row['total']), reverse=True)
+        return result[:limit]
+
+    @api.model
+    def _get_dashboard_data(self, dashboard):
+        """Serve a dashboard from the worker cache, then from the KPI snapshot
+        of the access profile of the user when it is fresh enough, and
+        compute it live otherwise.
+
+        Both are keyed by the version of the sources of the dashboard, so a
+        committed change is never hidden by a payload computed before it,
+        whichever worker cached it."""
+        Snapshot = self.env['tekprowess.dashboard.snapshot']
+        profile_key = Snapshot._get_profile_key(dashboard)
+        version = self.env['tekprowess.dashboard.change']._get_version(self.env.companies, dashboard)
+        key = (self.env.cr.dbname, dashboard, tuple(self.env.companies.ids), profile_key, version)
+        data = dashboard_cache.get(key)
+        if data is not None:
+            return data
+
+        company = self.env.company if len(self.env.companies) == 1 else None
+        if company:
+            data = Snapshot._get_fresh_data(company, dashboard, profile_key, version)
+        if data is None:
+            data = getattr(self, '_compute_%s_data' % dashboard)()
+            if company:
+                Snapshot._store(company, dashboard, profile_key, data, version)
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        dashboard_cache.set(
+            key, data,
+            ttl=int(ICP.get_param('tekprowess_dashboard.cache_ttl', 60)),
+            max_size=int(ICP.get_param('tekprowess_dashboard.cache_size', 512)),
+        )
+        return data
+
+    @api.model
+    @profiled
+    def get_dashboard_bundle(self, sections=None):
+        """Compute several dashboard sections in a single RPC.
+
+        The values shared by all sections are prefetched once and hoisted to
+        the top of the payload instead of being repeated in every section;
+        sections whose app is not installed or that the user may not read
+        are left out.
+        """
+        sections = [s for s in (sections or DASHBOARD_SOURCES) if s in DASHBOARD_SOURCES]
+        shared = self._get_shared_data()
+        bundle = self.with_context(dashboard_shared=shared)
+        result = {
+            'currency_symbol': shared['currency_symbol'],
+            'chart_labels': [m['label'] for m in shared['months']],
+            'sections': {},
+        }
+        for section in sections:
+            try:
+                data = bundle._get_dashboard_data(section)
+            except AccessError:
+                _logger.debug("Dashboard: %s section not readable by user %s", section, self.env.uid)
+                continue
+            if data:
+                result['sections'][section] = {
+                    key: value for key, value in data.items()
+                    if key not in ('currency_symbol', 'chart_labels')
+                }
+        return result
+
+    @api.model
+    def get_cache_stats(self):
+        """Hit/miss counters of the dashboard cache of the current worker."""
+        return dashboard_cache.stats()
+
     # -------------------------------------------------------------------------
     # Manufacturing KPIs
     # -------------------------------------------------------------------------
 
     @api.model
+    @profiled
     def get_manufacturing_data(self):
+        return self._get_dashboard_data('manufacturing')
+
+    @api.model
+    def _compute_manufacturing_data(self):
         if 'mrp.production' not in self.env:
             return {}
         MO = self.env['mrp.production']
-
-        draft_count     = MO.search_count([('state', '=', 'draft')])
-        confirmed_count = MO.search_count([('state', '=', 'confirmed')])
-        progress_count  = MO.search_count([('state', 'in', ['progress', 'to_close'])])
-        done_count      = MO.search_count([('state', '=', 'done')])
-        cancel_count    = MO.search_count([('state', '=', 'cancel')])
+        company_domain = [('company_id', 'in', self.env.companies.ids)]
+
+        state_counts    = self._aggregate('mrp.production', company_domain, ['state'])
+        draft_count     = state_counts.get('draft', (0,))[0]
+        confirmed_count = state_counts.get('confirmed', (0,))[0]
+        progress_count  = state_counts.get('progress', (0,))[0] + state_counts.get('to_close', (0,))[0]
+        done_count      = state_counts.get('done', (0,))[0]
+        cancel_count    = state_counts.get('cancel', (0,))[0]
         total_count     = draft_count + confirmed_count + progress_count + done_count + cancel_count
 
         today = date.today()
-        overdue_count = MO.search_count([
+        overdue_count = MO.search_count(company_domain + [
             ('state', 'not in', ['done', 'cancel']),
             ('date_finished', '<', fields.Datetime.now()),
             ('date_finished', '!=', False),
         ])
-        today_count = MO.search_count([
+        today_count = MO.search_count(company_domain + [
             ('date_start', '>=', fields.Datetime.to_datetime(str(today) + ' 00:00:00')),
             ('date_start', '<=', fields.Datetime.to_datetime(str(today) + ' 23:59:59')),
         ])
 
-        # This month done
-        month_start = today.replace(day=1)
-        month_done = MO.search_count([
-            ('state', '=', 'done'),
-            ('date_finished', '>=', fields.Datetime.to_datetime(str(month_start) + ' 00:00:00')),
-        ])
-
         # Monthly chart data
-        months = self._get_month_labels(6)
+        months = self._get_shared_data()['months']
         chart_labels    = [m['label'] for m in months]
-        chart_confirmed = []
-        chart_done_list = []
-        for m in months:
-            chart_confirmed.append(MO.search_count([
-                ('state', 'in', ['confirmed', 'progress', 'to_close']),
-                ('date_start', '>=', m['start']),
-                ('date_start', '<=', m['end']),
-            ]))
-            chart_done_list.append(MO.search_count([
-                ('state', '=', 'done'),
-                ('date_finished', '>=', m['start']),
-                ('date_finished', '<=', m['end']),
-            ]))
+        chart_confirmed = [values[0] for values in self._aggregate_by_month(
+            'mrp.production', 'date_start',
+            company_domain + [('state', 'in', ['confirmed', 'progress', 'to_close'])], months,
+        )[None]]
+        chart_done_list = [values[0] for values in self._aggregate_by_month(
+            'mrp.production', 'date_finished', company_domain + [('state', '=', 'done')], months,
+        )[None]]
+
+        # This month done (last bucket of the monthly chart)
+        month_done = chart_done_list[-1]
 
         # Recent manufacturing orders (last 10)
-        recent_orders = MO.search([], order='id desc', limit=10)
+        recent_orders = MO.search_fetch(
+            company_domain,
+            ['name', 'product_id', 'product_qty', 'product_uom_id', 'state', 'date_start'],
+            order='id desc', limit=10,
+        )
+        recent_orders.product_uom_id.fetch(['name'])
+        first_workcenter = {}
+        for wo in self.env['mrp.workorder'].search_fetch(
+            [('production_id', 'in', recent_orders.ids)], ['production_id', 'workcenter_id'],
+        ):
+            first_workcenter.setdefault(wo.production_id.id, wo.workcenter_id)
+        state_labels = dict(MO._fields['state'].selection)
         recent = []
         for o in recent_orders:
+            workcenter = first_workcenter.get(o.id)
             recent.append({
                 'id': o.id,
                 'name': o.name,
@@ -168,24 +370,13 @@ class TekprowessManufacturingDashboard(models.TransientModel):
                 'qty': o.product_qty,
                 'uom': o.product_uom_id.name or '',
                 'state': o.state,
-                'state_label': dict(o._fields['state'].selection).get(o.state, o.state),
+                'state_label': state_labels.get(o.state, o.state),
                 'date': o.date_start.strftime('%d %b %Y') if o.date_start else '',
-                'workcenter': o.workorder_ids[0].workcenter_id.name if o.workorder_ids else '',
+                'workcenter': workcenter.name if workcenter else '',
             })
 
-        # Workcenter utilization (top 5 by workorder count)
-        WorkOrder = self.env['mrp.workorder']
-        workcenters_data = []
-        for wc in self.env['mrp.workcenter'].search([], limit=5):
-            wc_count = WorkOrder.search_count([('workcenter_id', '=', wc.id)])
-            wc_done  = WorkOrder.search_count([('workcenter_id', '=', wc.id), ('state', '=', 'done')])
-            if wc_count:
-                workcenters_data.append({
-                    'name': wc.name,
-                    'total': wc_count,
-                    'done': wc_done,
-                    'pct': round(wc_done / wc_count * 100) if wc_count else 0,
-                })
+        # Workcenter utilization (top 5 by load)
+        workcenters_data = self._get_workcenter_utilization(company_domain, limit=5)
 
         return {
             'draft': draft_count,
@@ -202,72 +393,82 @@ class TekprowessManufacturingDashboard(models.TransientModel):
             'chart_done': chart_done_list,
             'recent_orders': recent,
             'workcenters': workcenters_data,
+            'kpi_snapshot': self._get_kpi_snapshot(),
         }
 
+    def _get_kpi_snapshot(self):
+        """Transactions visible to the current one, sent with the counters so
+        that the clients only apply the live deltas of the other ones."""
+        self.env.cr.execute(SQL("SELECT txid_current_snapshot()::text"))
+        xmin, xmax, xip = self.env.cr.fetchone()[0].split(':')
+        return {'xmin': int(xmin), 'xmax': int(xmax), 'xip': [int(txid) for txid in xip.split(',') if txid]}
+
     # -------------------------------------------------------------------------
     # Sales KPIs
     # -------------------------------------------------------------------------
 
     @api.model
+    @profiled
     def get_sales_data(self):
+        return self._get_dashboard_data('sales')
+
+    @api.model
+    def _compute_sales_data(self):
         if 'sale.order' not in self.env:
             return {}
         SO = self.env['sale.order']
-
-        quotation_count = SO.search_count([('state', '=', 'draft')])
-        sent_count      = SO.search_count([('state', '=', 'sent')])
-        sale_count      = SO.search_count([('state', '=', 'sale')])
-        done_count      = SO.search_count([('state', '=', 'done')])
-        cancel_count    = SO.search_count([('state', '=', 'cancel')])
+        company_domain = [('company_id', 'in', self.env.companies.ids)]
+
+        state_totals    = self._aggregate('sale.order', company_domain, ['state'], ['__count', 'amount_total:sum'])
+        quotation_count = state_totals.get('draft', (0, 0))[0]
+        sent_count      = state_totals.get('sent', (0, 0))[0]
+        sale_count      = state_totals.get('sale', (0, 0))[0]
+        done_count      = state_totals.get('done', (0, 0))[0]
+        cancel_count    = state_totals.get('cancel', (0, 0))[0]
         total_count     = quotation_count + sent_count + sale_count + done_count + cancel_count
 
-        confirmed_orders = SO.search([('state', 'in', ['sale', 'done'])])
-        confirmed_amount = sum(confirmed_orders.mapped('amount_total'))
+        confirmed_count  = sale_count + done_count
+        confirmed_amount = state_totals.get('sale', (0, 0))[1] + state_totals.get('done', (0, 0))[1]
 
-        to_invoice_count = SO.search_count([
+        to_invoice_count = SO.search_count(company_domain + [
             ('state', 'in', ['sale', 'done']),
             ('invoice_status', '=', 'to invoice'),
         ])
-        overdue_count = SO.search_count([
+        overdue_count = SO.search_count(company_domain + [
             ('state', 'in', ['draft', 'sent', 'sale']),
             ('commitment_date', '<', fields.Datetime.now()),
             ('commitment_date', '!=', False),
         ])
 
-        today      = date.today()
-        month_start = today.replace(day=1)
-        month_orders = SO.search([
-            ('state', 'in', ['sale', 'done']),
-            ('date_order', '>=', fields.Datetime.to_datetime(str(month_start) + ' 00:00:00')),
-        ])
-        month_amount = sum(month_orders.mapped('amount_total'))
-        month_count  = len(month_orders)
-
         # Average order value
-        avg_order_val = round(confirmed_amount / len(confirmed_orders), 2) if confirmed_orders else 0.0
+        avg_order_val = round(confirmed_amount / confirmed_count, 2) if confirmed_count else 0.0
 
         # Top 5 customers by order total
-        customer_totals = defaultdict(float)
-        for o in confirmed_orders:
-            customer_totals[o.partner_id.name or 'Unknown'] += o.amount_total
-        top_customers = sorted(customer_totals.items(), key=lambda x: -x[1])[:5]
+        top_customers = self._get_top_partners(
+            'sale.order', company_domain + [('state', 'in', ['sale', 'done'])], 'amount_total',
+        )
 
         # Monthly chart data
-        months = self._get_month_labels(6)
+        months = self._get_shared_data()['months']
         chart_labels = [m['label'] for m in months]
-        chart_orders = []
-        chart_amount = []
-        for m in months:
-            mo = SO.search([
-                ('state', 'in', ['sale', 'done']),
-                ('date_order', '>=', m['start']),
-                ('date_order', '<=', m['end']),
-            ])
-            chart_orders.append(len(mo))
-            chart_amount.append(round(sum(mo.mapped('amount_total')), 2))
+        monthly = self._aggregate_by_month(
+            'sale.order', 'date_order', company_domain + [('state', 'in', ['sale', 'done'])], months,
+            aggregates=['__count', 'amount_total:sum'],
+        )[None]
+        chart_orders = [count for count, _amount in monthly]
+        chart_amount = [round(amount, 2) for _count, amount in monthly]
+
+        # This month (last bucket of the monthly chart)
+        month_count, month_amount = monthly[-1]
 
         # Recent orders (last 10)
-        recent_so = SO.search([], order='id desc', limit=10)
+        recent_so = SO.search_fetch(
+            company_domain,
+            ['name', 'partner_id', 'amount_total', 'state', 'date_order', 'invoice_status'],
+            order='id desc', limit=10,
+        )
+        recent_so.partner_id.fetch(['name'])
+        state_labels = dict(SO._fields['state'].selection)
         recent = []
         for o in recent_so:
             recent.append({
@@ -276,12 +477,12 @@ class TekprowessManufacturingDashboard(models.TransientModel):
                 'partner': o.partner_id.name or '',
                 'amount': round(o.amount_total, 2),
                 'state': o.state,
-                'state_label': dict(o._fields['state'].selection).get(o.state, o.state),
+                'state_label': state_labels.get(o.state, o.state),
                 'date': o.date_order.strftime('%d %b %Y') if o.date_order else '',
                 'invoice_status': o.invoice_status,
             })
 
-        currency_symbol = self.env.company.currency_id.symbol or '$'
+        currency_symbol = self._get_shared_data()['currency_symbol']
 
         return {
             'quotation': quotation_count,
@@ -309,64 +510,67 @@ class TekprowessManufacturingDashboard(models.TransientModel):
     # -------------------------------------------------------------------------
 
     @api.model
+    @profiled
     def get_purchase_data(self):
+        return self._get_dashboard_data('purchase')
+
+    @api.model
+    def _compute_purchase_data(self):
         if 'purchase.order' not in self.env:
             return {}
         PO = self.env['purchase.order']
-
-        draft_count    = PO.search_count([('state', '=', 'draft')])
-        sent_count     = PO.search_count([('state', '=', 'sent')])
-        purchase_count = PO.search_count([('state', '=', 'purchase')])
-        done_count     = PO.search_count([('state', '=', 'done')])
-        cancel_count   = PO.search_count([('state', '=', 'cancel')])
+        company_domain = [('company_id', 'in', self.env.companies.ids)]
+
+        state_totals   = self._aggregate('purchase.order', company_domain, ['state'], ['__count', 'amount_total:sum'])
+        draft_count    = state_totals.get('draft', (0, 0))[0]
+        sent_count     = state_totals.get('sent', (0, 0))[0]
+        purchase_count = state_totals.get('purchase', (0, 0))[0]
+        done_count     = state_totals.get('done', (0, 0))[0]
+        cancel_count   = state_totals.get('cancel', (0, 0))[0]
         total_count    = draft_count + sent_count + purchase_count + done_count + cancel_count
 
-        confirmed_orders = PO.search([('state', 'in', ['purchase', 'done'])])
-        confirmed_amount = sum(confirmed_orders.mapped('amount_total'))
+        confirmed_count  = purchase_count + done_count
+        confirmed_amount = state_totals.get('purchase', (0, 0))[1] + state_totals.get('done', (0, 0))[1]
 
-        to_bill_count = PO.search_count([
+        to_bill_count = PO.search_count(company_domain + [
             ('state', 'in', ['purchase', 'done']),
             ('invoice_status', '=', 'to invoice'),
         ])
-        today       = date.today()
-        month_start = today.replace(day=1)
-        overdue_count = PO.search_count([
+        overdue_count = PO.search_count(company_domain + [
             ('state', 'in', ['draft', 'sent', 'purchase']),
             ('date_planned', '<', fields.Datetime.now()),
             ('date_planned', '!=', False),
         ])
-        month_orders = PO.search([
-            ('state', 'in', ['purchase', 'done']),
-            ('date_order', '>=', fields.Datetime.to_datetime(str(month_start) + ' 00:00:00')),
-        ])
-        month_amount = sum(month_orders.mapped('amount_total'))
-        month_count  = len(month_orders)
 
         # Average order value
-        avg_order_val = round(confirmed_amount / len(confirmed_orders), 2) if confirmed_orders else 0.0
+        avg_order_val = round(confirmed_amount / confirmed_count, 2) if confirmed_count else 0.0
 
         # Top 5 vendors by purchase total
-        vendor_totals = defaultdict(float)
-        for o in confirmed_orders:
-            vendor_totals[o.partner_id.name or 'Unknown'] += o.amount_total
-        top_vendors = sorted(vendor_totals.items(), key=lambda x: -x[1])[:5]
+        top_vendors = self._get_top_partners(
+            'purchase.order', company_domain + [('state', 'in', ['purchase', 'done'])], 'amount_total',
+        )
 
         # Monthly chart data
-        months = self._get_month_labels(6)
+        months = self._get_shared_data()['months']
         chart_labels = [m['label'] for m in months]
-        chart_orders = []
-        chart_amount = []
-        for m in months:
-            po = PO.search([
-                ('state', 'in', ['purchase', 'done']),
-                ('date_order', '>=', m['start']),
-                ('date_order', '<=', m['end']),
-            ])
-            chart_orders.append(len(po))
-            chart_amount.append(round(sum(po.mapped('amount_total')), 2))
+        monthly = self._aggregate_by_month(
+            'purchase.order', 'date_order', company_domain + [('state', 'in', ['purchase', 'done'])], months,
+            aggregates=['__count', 'amount_total:sum'],
+        )[None]
+        chart_orders = [count for count, _amount in monthly]
+        chart_amount = [round(amount, 2) for _count, amount in monthly]
+
+        # This month (last bucket of the monthly chart)
+        month_count, month_amount = monthly[-1]
 
         # Recent orders (last 10)
-        recent_po = PO.search([], order='id desc', limit=10)
+        recent_po = PO.search_fetch(
+            company_domain,
+            ['name', 'partner_id', 'amount_total', 'state', 'date_order', 'invoice_status'],
+            order='id desc', limit=10,
+        )
+        recent_po.partner_id.fetch(['name'])
+        state_labels = dict(PO._fields['state'].selection)
         recent = []
         for o in recent_po:
             recent.append({
@@ -375,12 +579,12 @@ class TekprowessManufacturingDashboard(models.TransientModel):
                 'partner': o.partner_id.name or '',
                 'amount': round(o.amount_total, 2),
                 'state': o.state,
-                'state_label': dict(o._fields['state'].selection).get(o.state, o.state),
+                'state_label': state_labels.get(o.state, o.state),
                 'date': o.date_order.strftime('%d %b %Y') if o.date_order else '',
                 'invoice_status': o.invoice_status,
             })
 
-        currency_symbol = self.env.company.currency_id.symbol or '$'
+        currency_symbol = self._get_shared_data()['currency_symbol']
 
         return {
             'draft': draft_count,
@@ -408,92 +612,91 @@ class TekprowessManufacturingDashboard(models.TransientModel):
     # -------------------------------------------------------------------------
 
     @api.model
+    @profiled
     def get_accounting_data(self):
+        return self._get_dashboard_data('accounting')
+
+    @api.model
+    def _compute_accounting_data(self):
         if 'account.move' not in self.env:
             return {}
         Move = self.env['account.move']
         today = date.today()
-        currency_symbol = self.env.company.currency_id.symbol or '$'
+        currency_symbol = self._get_shared_data()['currency_symbol']
+        company_domain = [('company_id', 'in', self.env.companies.ids)]
+
+        # ── Invoice / bill state totals (one grouped query) ───────────────
+        inv_domain = company_domain + [('move_type', '=', 'out_invoice'), ('state', '!=', 'cancel')]
+        settled_states = ('paid', 'in_payment')
+        totals = self._aggregate(
+            'account.move',
+            company_domain + [('move_type', 'in', ['out_invoice', 'in_invoice']), ('state', '!=', 'cancel')],
+            ['move_type', 'state', 'payment_state'],
+            ['__count', 'amount_residual:sum'],
+        )
+        overdue = self._aggregate(
+            'account.move',
+            company_domain + [
+                ('move_type', 'in', ['out_invoice', 'in_invoice']),
+                ('state', '=', 'posted'),
+                ('payment_state', 'not in', list(settled_states)),
+                ('invoice_date_due', '<', today),
+            ],
+            ['move_type'],
+        )
 
-        # ── Customer Invoices ──────────────────────────────────────────────
-        inv_domain = [('move_type', '=', 'out_invoice'), ('state', '!=', 'cancel')]
-        inv_total      = Move.search_count(inv_domain)
-        inv_draft      = Move.search_count(inv_domain + [('state', '=', 'draft')])
-        inv_posted     = Move.search_count(inv_domain + [('state', '=', 'posted')])
-        inv_paid       = Move.search_count(inv_domain + [('state', '=', 'posted'), ('payment_state', '=', 'paid')])
-        inv_overdue    = Move.search_count(inv_domain + [
-            ('state', '=', 'posted'),
-            ('payment_state', 'not in', ['paid', 'in_payment']),
-            ('invoice_date_due', '<', today),
-        ])
-        inv_to_pay     = Move.search_count(inv_domain + [
-            ('state', '=', 'posted'),
-            ('payment_state', 'not in', ['paid', 'in_payment']),
-        ])
+        def _totals(move_type, state=None, payment_states=None, exclude_payment_states=None):
+            count = residual = 0
+            for (mtype, mstate, pstate), (nb, amount) in totals.items():
+                if mtype != move_type or (state and mstate != state):
+                    continue
+                if payment_states and pstate not in payment_states:
+                    continue
+                if exclude_payment_states and pstate in exclude_payment_states:
+                    continue
+                count += nb
+                residual += amount
+            return count, residual
 
+        # ── Customer Invoices ──────────────────────────────────────────────
+        inv_total      = _totals('out_invoice')[0]
+        inv_draft      = _totals('out_invoice', 'draft')[0]
+        inv_posted     = _totals('out_invoice', 'posted')[0]
+        inv_paid       = _totals('out_invoice', 'posted', payment_states=('paid',))[0]
+        inv_overdue    = overdue.get('out_invoice', (0,))[0]
         # Total receivable (unpaid posted invoices)
-        posted_inv = Move.search(inv_domain + [
-            ('state', '=', 'posted'),
-            ('payment_state', 'not in', ['paid', 'in_payment']),
-        ])
-        total_receivable = sum(posted_inv.mapped('amount_residual'))
+        inv_to_pay, total_receivable = _totals('out_invoice', 'posted', exclude_payment_states=settled_states)
 
         # ── Vendor Bills ───────────────────────────────────────────────────
-        bill_domain = [('move_type', '=', 'in_invoice'), ('state', '!=', 'cancel')]
-        bill_total   = Move.search_count(bill_domain)
-        bill_draft   = Move.search_count(bill_domain + [('state', '=', 'draft')])
-        bill_posted  = Move.search_count(bill_domain + [('state', '=', 'posted')])
-        bill_paid    = Move.search_count(bill_domain + [('state', '=', 'posted'), ('payment_state', '=', 'paid')])
-        bill_overdue = Move.search_count(bill_domain + [
-            ('state', '=', 'posted'),
-            ('payment_state', 'not in', ['paid', 'in_payment']),
-            ('invoice_date_due', '<', today),
-        ])
-
-        posted_bills = Move.search(bill_domain + [
-            ('state', '=', 'posted'),
-            ('payment_state', 'not in', ['paid', 'in_payment']),
-        ])
-        total_payable = sum(posted_bills.mapped('amount_residual'))
-
-        # ── This month invoiced ────────────────────────────────────────────
-        month_start = today.replace(day=1)
-        month_end   = (month_start + relativedelta(months=1)) - timedelta(days=1)
-        month_inv   = Move.search(inv_domain + [
-            ('state', '=', 'posted'),
-            ('invoice_date', '>=', str(month_start)),
-            ('invoice_date', '<=', str(month_end)),
-        ])
-        month_invoiced = sum(month_inv.mapped('amount_total'))
-        month_inv_count = len(month_inv)
+        bill_total   = _totals('in_invoice')[0]
+        bill_draft   = _totals('in_invoice', 'draft')[0]
+        bill_posted  = _totals('in_invoice', 'posted')[0]
+        bill_paid    = _totals('in_invoice', 'posted', payment_states=('paid',))[0]
+        bill_overdue = overdue.get('in_invoice', (0,))[0]
+        total_payable = _totals('in_invoice', 'posted', exclude_payment_states=settled_states)[1]
 
         # ── 6-month chart ──────────────────────────────────────────────────
-        months = self._get_month_labels(6)
+        months = self._get_shared_data()['months']
         chart_labels = [m['label'] for m in months]
-        chart_inv_amount = []
-        chart_bill_amount = []
-        chart_inv_count = []
+        monthly = self._aggregate_by_month(
+            'account.move', 'invoice_date',
+            company_domain + [('move_type', 'in', ['out_invoice', 'in_invoice']), ('state', '=', 'posted')],
+            months, groupby=['move_type'], aggregates=['__count', 'amount_total:sum'],
+        )
+        chart_inv_amount  = [round(amount, 2) for _nb, amount in monthly['out_invoice']]
+        chart_bill_amount = [round(amount, 2) for _nb, amount in monthly['in_invoice']]
+        chart_inv_count   = [nb for nb, _amount in monthly['out_invoice']]
 
-        for m in months:
-            inv_m = Move.search(inv_domain + [
-                ('state', '=', 'posted'),
-                ('invoice_date', '>=', m['start'].date()),
-                ('invoice_date', '<=', m['end'].date()),
-            ])
-            bill_m = Move.search(bill_domain + [
-                ('state', '=', 'posted'),
-                ('invoice_date', '>=', m['start'].date()),
-                ('invoice_date', '<=', m['end'].date()),
-            ])
-            chart_inv_amount.append(round(sum(inv_m.mapped('amount_total')), 2))
-            chart_bill_amount.append(round(sum(bill_m.mapped('amount_total')), 2))
-            chart_inv_count.append(len(inv_m))
+        # ── This month invoiced (last bucket of the chart) ─────────────────
+        month_inv_count, month_invoiced = monthly['out_invoice'][-1]
 
         # ── Recent customer invoices ───────────────────────────────────────
-        recent_moves = Move.search(
+        recent_moves = Move.search_fetch(
             inv_domain + [('state', 'in', ['draft', 'posted'])],
+            ['name', 'partner_id', 'amount_total', 'invoice_date', 'invoice_date_due', 'state', 'payment_state'],
             order='invoice_date desc, id desc', limit=10
         )
+        recent_moves.partner_id.fetch(['name'])
         recent = []
         state_labels = {'draft': 'Draft', 'posted': 'Posted', 'cancel': 'Cancelled'}
         pay_labels = {
@@ -521,27 +724,10 @@ class TekprowessManufacturingDashboard(models.TransientModel):
             })
 
         # ── Top 5 customers by receivable ─────────────────────────────────
-        customer_totals = defaultdict(float)
-        for m in posted_inv:
-            customer_totals[m.partner_id.name or 'Unknown'] += m.amount_residual
-        top_customers = sorted(customer_totals.items(), key=lambda x: x[1], reverse=True)[:5]
-
-        # ── Odoo Native Journal Graphs ────────────────────────────────────
-        journals = self.env['account.journal'].search([('type', 'in', ('sale', 'purchase', 'bank', 'cash'))])
-        journal_graphs = []
-        for j in journals:
-            if j.kanban_dashboard_graph:
-                try:
-                    graph_data = json.loads(j.kanban_dashboard_graph)
-                    name = f"{j.name} ({j.company_id.name or 'Unknown'})" if len(self.env.companies) > 1 else j.name
-                    journal_graphs.append({
-                        'id': j.id,
-                        'name': name,
-                        'type': j.type,
-                        'graph_data': graph_data
-                    })
-                except Exception:
-                    pass
+        top_customers = self._get_top_partners('account.move', inv_domain + [
+            ('state', '=', 'posted'),
+            ('payment_state', 'not in', list(settled_states)),
+        ], 'amount_residual')
 
         return {
             # Invoice state counts
@@ -571,61 +757,47 @@ class TekprowessManufacturingDashboard(models.TransientModel):
             # Lists
             'recent_invoices': recent,
             'top_customers': [{'name': k, 'amount': round(v, 2)} for k, v in top_customers],
-            'journal_graphs': journal_graphs,
             'currency_symbol': currency_symbol,
         }
 
     @api.model
+    @profiled
     def get_inventory_data(self):
         """ Fetch data for Inventory overview dashboard (Receipts, Deliveries, etc.) """
+        return self._get_dashboard_data('inventory')
+
+    @api.model
+    def _compute_inventory_data(self):
         if 'stock.picking.type' not in self.env:
             return {}
-        picking_types = self.env['stock.picking.type'].search([])
-        inventory_graphs = []
-        
         # Calculate overall inventory valuation (if stock.valuation.layer exists, else 0)
         total_valuation = 0
         if 'stock.valuation.layer' in self.env:
-            layers = self.env['stock.valuation.layer'].search([('company_id', 'in', self.env.companies.ids)])
-            total_valuation = sum(layers.mapped('value'))
+            total_valuation = self._aggregate(
+                'stock.valuation.layer', [('company_id', 'in', self.env.companies.ids)], [], ['value:sum'],
+            )[()][0]
             
         # Overall transfer counters
         today = date.today()
         Move = self.env['stock.picking']
         domain = [('company_id', 'in', self.env.companies.ids), ('state', 'not in', ('cancel', 'done'))]
         
-        total_transfers = Move.search_count(domain)
+        state_counts = self._aggregate('stock.picking', [('company_id', 'in', self.env.companies.ids)], ['state'])
+        total_transfers = sum(
+            count for state, (count,) in state_counts.items() if state not in ('cancel', 'done')
+        )
         late_transfers = Move.search_count(domain + [('scheduled_date', '<', today)])
-        draft_transfers = Move.search_count([('company_id', 'in', self.env.companies.ids), ('state', '=', 'draft')])
+        draft_transfers = state_counts.get('draft', (0,))[0]
 
-        for pt in picking_types:
-            graph_data = []
-            if pt.kanban_dashboard_graph:
-                try:
-                    graph_data = json.loads(pt.kanban_dashboard_graph)
-                except Exception:
-                    pass
-            
-            name = f"{pt.name} ({pt.company_id.name or 'Unknown'})" if len(self.env.companies) > 1 else pt.name
-            
-            inventory_graphs.append({
-                'id': pt.id,
-                'name': name,
-                'code': pt.code,
-                'count_ready': pt.count_picking_ready,
-                'count_waiting': pt.count_picking_waiting,
-                'count_late': pt.count_picking_late,
-                'count_backorders': pt.count_picking_backorders,
-                'count_move_ready': pt.count_move_ready,
-                'graph_data': graph_data
-            })
-            
         # Recent Transfers
-        recent_pickings = Move.search(
+        recent_pickings = Move.search_fetch(
             [('company_id', 'in', self.env.companies.ids)], 
+            ['name', 'partner_id', 'scheduled_date', 'state', 'picking_type_id'],
             order='date desc', 
             limit=7
         )
+        recent_pickings.partner_id.fetch(['name'])
+        recent_pickings.picking_type_id.fetch(['name'])
         recent_pickings_data = []
         for p in recent_pickings:
             recent_pickings_data.append({
@@ -651,9 +823,8 @@ class TekprowessManufacturingDashboard(models.TransientModel):
                 'uom': product.uom_id.name
             })
             
-        currency = self.env.company.currency_id.symbol or '$'
+        currency = self._get_shared_data()['currency_symbol']
         return {
-            'inventory_graphs': inventory_graphs,
             'total_valuation': round(total_valuation, 2),
             'total_transfers': total_transfers,
             'late_transfers': late_transfers,
@@ -662,3 +833,77 @@ class TekprowessManufacturingDashboard(models.TransientModel):
             'recent_transfers': recent_pickings_data,
             'low_stock': low_stock_data
         }
+
+    # -------------------------------------------------------------------------
+    # Paginated graph lists (loaded by the client as the user scrolls)
+    # -------------------------------------------------------------------------
+
+    def _get_graph_page(self, model_name, domain, cursor, limit):
+        """Keyset pagination on ``id``: records after ``cursor``, plus the
+        cursor of the next page (False on the last page)."""
+        records = self.env[model_name].search(
+            domain + [('id', '>', cursor or 0)], order='id', limit=limit + 1,
+        )
+        next_cursor = records[limit - 1].id if len(records) > limit else False
+        return records[:limit], next_cursor
+
+    @api.model
+    @profiled
+    def get_journal_graphs(self, cursor=0, limit=12):
+        """One page of the native journal dashboard graphs."""
+        if 'account.journal' not in self.env:
+            return {'items': [], 'next_cursor': False}
+        journals, next_cursor = self._get_graph_page('account.journal', [
+            ('company_id', 'in', self.env.companies.ids),
+            ('type', 'in', ('sale', 'purchase', 'bank', 'cash')),
+        ], cursor, limit)
+        journal_graphs = []
+        multi_company = self._get_shared_data()['multi_company']
+        for j in journals:
+            if j.kanban_dashboard_graph:
+                try:
+                    graph_data = json.loads(j.kanban_dashboard_graph)
+                    name = f"{j.name} ({j.company_id.name or 'Unknown'})" if multi_company else j.name
+                    journal_graphs.append({
+                        'id': j.id,
+                        'name': name,
+                        'type': j.type,
+                        'graph_data': graph_data
+                    })
+                except Exception:
+                    pass
+        return {'items': journal_graphs, 'next_cursor': next_cursor}
+
+    @api.model
+    @profiled
+    def get_inventory_graphs(self, cursor=0, limit=12):
+        """One page of the operation types with their counters and graphs."""
+        if 'stock.picking.type' not in self.env:
+            return {'items': [], 'next_cursor': False}
+        picking_types, next_cursor = self._get_graph_page('stock.picking.type', [
+            ('company_id', 'in', self.env.companies.ids),
+        ], cursor, limit)
+        inventory_graphs = []
+        multi_company = self._get_shared_data()['multi_company']
+        for pt in picking_types:
+            graph_data = []
+            if pt.kanban_dashboard_graph:
+                try:
+                    graph_data = json.loads(pt.kanban_dashboard_graph)
+                except Exception:
+                    pass
+
+            name = f"{pt.name} ({pt.company_id.name or 'Unknown'})" if multi_company else pt.name
+
+            inventory_graphs.append({
+                'id': pt.id,
+                'name': name,
+                'code': pt.code,
+                'count_ready': pt.count_picking_ready,
+                'count_waiting': pt.count_picking_waiting,
+                'count_late': pt.count_picking_late,
+                'count_backorders': pt.count_picking_backorders,
+                'count_move_ready': pt.count_move_ready,
+                'graph_data': graph_data
+            })
+        return {'items': inventory_graphs, 'next_cursor': next_cursor}
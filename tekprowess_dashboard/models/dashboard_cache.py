@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class DashboardCache:
+    """Process-wide TTL + LRU cache for dashboard RPC payloads.
+
+    Entries are keyed by ``(dbname, dashboard, company ids, profile key,
+    version)``: users only ever share payloads computed under the same
+    companies and access profile (see ``tekprowess.dashboard.snapshot``),
+    and the version of the dashboard sources (see
+    ``tekprowess.dashboard.change``) moves with every committed change, so
+    that no worker serves a payload computed before it. Each worker process
+    holds its own cache; the worker performing a write also drops the
+    entries it outdated right away, the others let them age out by TTL and
+    LRU eviction.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, max_size):
+        if ttl <= 0 or max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, dbname, dashboards=None):
+        """Drop the entries of ``dbname``, restricted to ``dashboards`` if given."""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == dbname and (dashboards is None or key[1] in dashboards):
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+dashboard_cache = DashboardCache()
+
+# Models whose changes invalidate the cached payloads of each dashboard
+CACHE_TRIGGERS = {
+    'mrp.production': {'manufacturing'},
+    'mrp.workorder': {'manufacturing'},
+    'sale.order': {'sales'},
+    'purchase.order': {'purchase'},
+    'account.move': {'accounting'},
+    'stock.picking': {'inventory'},
+    'stock.move': {'inventory'},
+    'stock.valuation.layer': {'inventory'},
+}
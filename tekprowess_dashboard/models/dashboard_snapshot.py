@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api, fields
+from odoo.exceptions import AccessError
+from odoo.tools import SQL
+from datetime import timedelta
+import hashlib
+import json
+import re
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Source models of each dashboard, whose record rules decide who may share a
+# snapshot. The first model of each list must be installed for the dashboard
+# to be available.
+DASHBOARD_SOURCES = {
+    'manufacturing': ['mrp.production', 'mrp.workorder'],
+    'sales': ['sale.order'],
+    'purchase': ['purchase.order'],
+    'accounting': ['account.move'],
+    'inventory': ['stock.picking', 'stock.valuation.layer', 'stock.quant'],
+}
+
+# Record rule domains referring to the current user ("own documents" rules)
+USER_RULE = re.compile(r'\buser\b')
+
+
+class TekprowessDashboardSnapshot(models.Model):
+    """Payload of a dashboard computed for one company and access profile.
+
+    Snapshots are created when a user computes a dashboard live and kept up
+    to date by a cron computing them again as the user they were built for.
+    They are only served to users of the same access profile: same groups
+    and language, and the same user when a record rule of the dashboard
+    depends on the user.
+    """
+    _name = 'tekprowess.dashboard.snapshot'
+    _description = 'Tekprowess Dashboard KPI Snapshot'
+    _rec_name = 'dashboard'
+
+    company_id = fields.Many2one('res.company', string='Company', required=True, ondelete='cascade', index=True)
+    dashboard = fields.Selection([
+        ('manufacturing', 'Manufacturing'),
+        ('sales', 'Sales'),
+        ('purchase', 'Purchase'),
+        ('accounting', 'Accounting'),
+        ('inventory', 'Inventory'),
+    ], string='Dashboard', required=True)
+    profile_key = fields.Char(string='Access Profile', required=True)
+    user_id = fields.Many2one(
+        'res.users', string='Computed As', required=True, ondelete='cascade',
+        help="User of the access profile the snapshot is computed as.",
+    )
+    data = fields.Json(string='Data')
+    refreshed_at = fields.Datetime(string='Refreshed At')
+    version = fields.Integer(
+        string='Source Version',
+        help="Number of changes of the source records when the snapshot was computed.",
+    )
+
+    _sql_constraints = [
+        ('company_dashboard_profile_uniq', 'unique(company_id, dashboard, profile_key)',
+         'Only one snapshot per company, dashboard and access profile is allowed.'),
+    ]
+
+    @api.model
+    def _get_max_age(self):
+        """Staleness bound (seconds) after which a snapshot is no longer served."""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'tekprowess_dashboard.snapshot_max_age', 300))
+
+    @api.model
+    def _get_profile_key(self, dashboard):
+        """Key of the access profile of the current user for ``dashboard``:
+        users of the same profile see the same figures."""
+        user = self.env.user
+        profile = [sorted(user.groups_id.ids), self.env.lang or user.lang]
+        if self._has_user_rules(dashboard):
+            profile.append(user.id)
+        return hashlib.sha1(json.dumps(profile).encode()).hexdigest()
+
+    @api.model
+    def _has_user_rules(self, dashboard):
+        """Whether a record rule applying to the current user on the source
+        models of ``dashboard`` depends on the user itself."""
+        rules = self.env['ir.rule'].sudo().search([
+            ('model_id.model', 'in', DASHBOARD_SOURCES[dashboard]),
+            '|', ('global', '=', True), ('groups', 'in', self.env.user.groups_id.ids),
+        ])
+        return any(USER_RULE.search(rule.domain_force or '') for rule in rules)
+
+    @api.model
+    def _get_fresh_data(self, company, dashboard, profile_key, version):
+        """Return the snapshot data of ``company`` for ``dashboard`` and the
+        access profile, or None when there is no snapshot, it is older than
+        the staleness bound or its sources changed since (``version``)."""
+        max_age = self._get_max_age()
+        if max_age <= 0:
+            return None
+        snapshot = self.sudo().search([
+            ('company_id', '=', company.id),
+            ('dashboard', '=', dashboard),
+            ('profile_key', '=', profile_key),
+        ], limit=1)
+        if not snapshot or not snapshot.refreshed_at or snapshot.data is None:
+            return None
+        if snapshot.version != version:
+            return None
+        now = fields.Datetime.now()
+        # "Today" / "overdue" counters depend on the date, never serve yesterday's figures
+        if snapshot.refreshed_at.date() != now.date():
+            return None
+        if snapshot.refreshed_at < now - timedelta(seconds=max_age):
+            return None
+        return snapshot.data
+
+    @api.model
+    def _store(self, company, dashboard, profile_key, data, version):
+        """Keep the payload just computed live by the current user as the
+        snapshot of its access profile, replacing the snapshot computed
+        before a change of the sources or on a previous day."""
+        if self._get_max_age() <= 0:
+            return
+        self.env.cr.execute(SQL("""
+            INSERT INTO tekprowess_dashboard_snapshot
+                   (company_id, dashboard, profile_key, user_id, data, refreshed_at, version,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES (%(company)s, %(dashboard)s, %(profile)s, %(user)s, %(data)s::jsonb,
+                    now() AT TIME ZONE 'UTC', %(version)s,
+                    %(user)s, now() AT TIME ZONE 'UTC', %(user)s, now() AT TIME ZONE 'UTC')
+            ON CONFLICT (company_id, dashboard, profile_key) DO UPDATE
+               SET user_id = EXCLUDED.user_id, data = EXCLUDED.data, refreshed_at = EXCLUDED.refreshed_at,
+                   version = EXCLUDED.version, write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+             WHERE tekprowess_dashboard_snapshot.version < EXCLUDED.version
+                OR tekprowess_dashboard_snapshot.refreshed_at::date < EXCLUDED.refreshed_at::date
+        """, company=company.id, dashboard=dashboard, profile=profile_key, user=self.env.uid,
+            data=json.dumps(data), version=version))
+
+    @api.model
+    def _cron_refresh_snapshots(self):
+        """Recompute the snapshots whose source records changed since the last run.
+
+        A snapshot is only recomputed, as the user it was built for, when the
+        version of its sources moved or when it was computed on a previous
+        day. Snapshots whose user is archived, left the company or changed
+        access profile are dropped.
+        """
+        Change = self.env['tekprowess.dashboard.change']
+        Change._compact()
+        now = fields.Datetime.now()
+        for snapshot in self.search([]):
+            user, company = snapshot.user_id, snapshot.company_id
+            if not user.active or company not in user.company_ids:
+                snapshot.unlink()
+                continue
+            Dashboard = self.env['tekprowess.dashboard'].with_user(user).with_company(company).with_context(
+                allowed_company_ids=[company.id], lang=user.lang,
+            )
+            if Dashboard.env[self._name]._get_profile_key(snapshot.dashboard) != snapshot.profile_key:
+                snapshot.unlink()
+                continue
+            version = Change._get_version(company, snapshot.dashboard)
+            if (snapshot.refreshed_at and snapshot.refreshed_at.date() == now.date()
+                    and snapshot.version == version):
+                # Nothing changed, just extend the validity of the snapshot
+                snapshot.refreshed_at = now
+                continue
+            try:
+                data = getattr(Dashboard, '_compute_%s_data' % snapshot.dashboard)()
+            except AccessError:
+                snapshot.unlink()
+                continue
+            snapshot.write({'data': data, 'refreshed_at': now, 'version': version})
+            _logger.debug("Dashboard: refreshed %s snapshot for company %s", snapshot.dashboard, company.name)
+
+
+class TekprowessDashboardChange(models.Model):
+    """Log of the transactions changing the source records of a dashboard.
+
+    Every transaction creating, writing or deleting source records inserts
+    one row per dashboard and company it touched, so that the version of a
+    dashboard, the sum of the weights of its rows, moves with each commit
+    whatever the order in which concurrent transactions commit. Rows are
+    only inserted, never updated, and do not contend with each other; the
+    snapshot cron merges them without changing the sums, so that reading a
+    version only sums a few rows.
+    """
+    _name = 'tekprowess.dashboard.change'
+    _description = 'Tekprowess Dashboard Source Change'
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', string='Company', ondelete='cascade', readonly=True)
+    dashboard = fields.Char(string='Dashboard', required=True, readonly=True)
+    weight = fields.Integer(string='Changes', default=1, readonly=True)
+
+    def init(self):
+        self.env.cr.execute(SQL("""
+            CREATE INDEX IF NOT EXISTS tekprowess_dashboard_change_dashboard_company_index
+                ON tekprowess_dashboard_change (dashboard, company_id)
+        """))
+
+    @api.model
+    def _log(self, changes):
+        """Record the given (dashboard, company id or None) changes"""
+        if changes:
+            self.env.cr.execute(SQL(
+                "INSERT INTO tekprowess_dashboard_change (dashboard, company_id, weight) VALUES %s",
+                SQL(", ").join(SQL("(%s, %s, 1)", dashboard, company_id) for dashboard, company_id in changes),
+            ))
+
+    @api.model
+    def _get_version(self, companies, dashboard):
+        """Number of committed changes of the sources of ``dashboard`` for
+        ``companies`` (records without company included)."""
+        self.env.cr.execute(SQL("""
+            SELECT COALESCE(SUM(weight), 0) FROM tekprowess_dashboard_change
+             WHERE dashboard = %s AND (company_id IN %s OR company_id IS NULL)
+        """, dashboard, tuple(companies.ids)))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _compact(self):
+        """Merge the rows of each dashboard and company into one"""
+        self.env.cr.execute(SQL("""
+            WITH merged AS (
+                DELETE FROM tekprowess_dashboard_change
+                RETURNING dashboard, company_id, weight
+            )
+            INSERT INTO tekprowess_dashboard_change (dashboard, company_id, weight)
+            SELECT dashboard, company_id, SUM(weight) FROM merged GROUP BY dashboard, company_id
+        """))
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+from .models import KPI_CHANNEL
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = 'ir.websocket'
+
+    def _build_bus_channel_list(self, channels):
+        # The dashboards subscribe to a generic channel name, replaced here by
+        # the channels of the companies of the user so that the KPI deltas of
+        # a company only reach its own users.
+        if KPI_CHANNEL in channels:
+            channels = [channel for channel in channels if channel != KPI_CHANNEL]
+            if self.env.uid and self.env.user._is_internal():
+                channels.extend((company, KPI_CHANNEL) for company in self.env.user.company_ids)
+        return super()._build_bus_channel_list(channels)
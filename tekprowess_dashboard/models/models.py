@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+from collections import Counter
+
+from odoo import api, models
+from odoo.tools import SQL
+
+from .dashboard_cache import dashboard_cache, CACHE_TRIGGERS
+
+# Bus channel (per company) and notification type of the live dashboard updates
+KPI_CHANNEL = 'tekprowess_dashboard'
+KPI_NOTIFICATION = 'tekprowess_dashboard/kpi_delta'
+
+# Manufacturing dashboard counter of each manufacturing order state
+PRODUCTION_STATE_COUNTERS = {
+    'draft': 'draft',
+    'confirmed': 'confirmed',
+    'progress': 'progress',
+    'to_close': 'progress',
+    'done': 'done',
+    'cancel': 'cancel',
+}
+
+
+class Base(models.AbstractModel):
+    _inherit = 'base'
+
+    def _invalidate_dashboard_cache(self):
+        """Drop the cached dashboard payloads depending on this model once the
+        current transaction is committed."""
+        dashboards = CACHE_TRIGGERS.get(self._name)
+        if not dashboards or not self:
+            return
+        postcommit = self.env.cr.postcommit
+        pending = postcommit.data.get('tekprowess_dashboard.invalidate')
+        if pending is None:
+            pending = postcommit.data['tekprowess_dashboard.invalidate'] = set()
+            dbname = self.env.cr.dbname
+
+            @postcommit.add
+            def _invalidate():
+                dashboard_cache.invalidate(dbname, pending)
+        pending.update(dashboards)
+        self._log_dashboard_change(dashboards)
+
+    def _log_dashboard_change(self, dashboards):
+        """Bump the version of the snapshots of ``dashboards`` for the
+        companies of these records when the current transaction commits."""
+        company_ids = {None}
+        if 'company_id' in self._fields:
+            company_ids = {record.company_id.id or None for record in self.sudo()}
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get('tekprowess_dashboard.changes')
+        if pending is None:
+            pending = precommit.data['tekprowess_dashboard.changes'] = set()
+            env = self.env
+
+            @precommit.add
+            def _log():
+                # Changes flushed by later precommit hooks start a new set
+                changes = precommit.data.pop('tekprowess_dashboard.changes')
+                env['tekprowess.dashboard.change']._log(changes)
+        pending.update((dashboard, company_id) for dashboard in dashboards for company_id in company_ids)
+
+    def _add_kpi_delta(self, company_id, counters=(), workcenters=()):
+        """Accumulate a change of the manufacturing dashboard counters, sent
+        to the dashboards of ``company_id`` when the transaction commits."""
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get('tekprowess_dashboard.kpi_delta')
+        if pending is None:
+            pending = precommit.data['tekprowess_dashboard.kpi_delta'] = {}
+            env = self.env
+
+            @precommit.add
+            def _publish():
+                # The clients skip the deltas of the transactions already
+                # visible to the one their figures were computed in
+                env.cr.execute(SQL("SELECT txid_current()"))
+                txid = env.cr.fetchone()[0]
+                for company in env['res.company'].browse(list(pending)):
+                    delta = pending[company.id]
+                    counters = {key: value for key, value in delta['counters'].items() if value}
+                    workcenters = {key: value for key, value in delta['workcenters'].items() if value}
+                    if counters or workcenters:
+                        env['bus.bus']._sendone((company, KPI_CHANNEL), KPI_NOTIFICATION, {
+                            'company_id': company.id,
+                            'txid': txid,
+                            'counters': counters,
+                            'workcenters': workcenters,
+                        })
+        delta = pending.setdefault(company_id, {'counters': Counter(), 'workcenters': Counter()})
+        delta['counters'].update(counters)
+        delta['workcenters'].update(workcenters)
+
+    def _publish_kpi_state_change(self, new_state):
+        """Turn the state change of manufacturing or work orders into dashboard
+        counter deltas. The previous states are read from the database since
+        the cache already holds the new ones."""
+        if self._name == 'mrp.production':
+            self.env.cr.execute(SQL(
+                "SELECT company_id, state FROM mrp_production WHERE id IN %s AND state != %s",
+                tuple(self.ids), new_state,
+            ))
+            for company_id, old_state in self.env.cr.fetchall():
+                counters = Counter({PRODUCTION_STATE_COUNTERS.get(old_state): -1})
+                counters[PRODUCTION_STATE_COUNTERS.get(new_state)] += 1
+                if new_state == 'done':
+                    counters['month_done'] += 1
+                counters.pop(None, None)
+                self._add_kpi_delta(company_id, counters)
+        elif self._name == 'mrp.workorder' and new_state == 'done':
+            self.env.cr.execute(SQL(
+                "SELECT company_id, workcenter_id FROM mrp_workorder WHERE id IN %s AND state != 'done'",
+                tuple(self.ids),
+            ))
+            for company_id, workcenter_id in self.env.cr.fetchall():
+                self._add_kpi_delta(company_id, workcenters={workcenter_id: 1})
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._invalidate_dashboard_cache()
+        if self._name == 'mrp.production':
+            for production in records:
+                self._add_kpi_delta(production.company_id.id, {
+                    'total': 1,
+                    PRODUCTION_STATE_COUNTERS.get(production.state, 'draft'): 1,
+                })
+        return records
+
+    def _write(self, vals):
+        # _write also receives the flushed values of stored computed fields,
+        # e.g. the state of a picking recomputed from its moves
+        self._invalidate_dashboard_cache()
+        if self and vals.get('state') and self._name in ('mrp.production', 'mrp.workorder'):
+            self._publish_kpi_state_change(vals['state'])
+        return super()._write(vals)
+
+    def unlink(self):
+        self._invalidate_dashboard_cache()
+        return super().unlink()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api, fields, SUPERUSER_ID
+from odoo.tools import str2bool
+from contextlib import contextmanager
+import functools
+import json
+import random
+import threading
+import time
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _payload_size(result):
+    """Approximate size (bytes) of an RPC result once serialized."""
+    if isinstance(result, (bytes, str)):
+        return len(result)
+    if isinstance(result, (dict, list, tuple)):
+        try:
+            return len(json.dumps(result, default=str))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+@contextmanager
+def profile_call(env, name):
+    """Measure the queries, SQL time and Python time of the enclosed block
+    and store them in the performance log.
+
+    Yields a dict in which the caller may set ``result`` to also record the
+    payload size. Nested profiled calls are only recorded by the outermost
+    one, and only the share of the calls set by the
+    ``tekprowess_dashboard.perf_log_sample_rate`` parameter is measured.
+    """
+    if getattr(_local, 'active', False):
+        yield {}
+        return
+    ICP = env['ir.config_parameter'].sudo()
+    enabled = str2bool(ICP.get_param('tekprowess_dashboard.perf_log_enabled', 'True'), default=True)
+    if not enabled or random.random() >= float(ICP.get_param('tekprowess_dashboard.perf_log_sample_rate', 0.1)):
+        yield {}
+        return
+
+    # The cursors count their queries on the current thread when these exist
+    thread = threading.current_thread()
+    if not hasattr(thread, 'query_count'):
+        thread.query_count = 0
+        thread.query_time = 0
+    query_count, query_time = thread.query_count, thread.query_time
+    measure = {}
+    failed = True
+    _local.active = True
+    start = time.perf_counter()
+    try:
+        yield measure
+        failed = False
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.active = False
+        sql_time = thread.query_time - query_time
+        env['tekprowess.perf.log']._record({
+            'name': name,
+            'user_id': env.uid,
+            'company_id': env.company.id,
+            'query_count': thread.query_count - query_count,
+            'sql_time': sql_time * 1000,
+            'python_time': max(elapsed - sql_time, 0) * 1000,
+            # Only serialized for the measured calls, outside of the timings
+            'payload_size': _payload_size(measure.get('result')),
+            'failed': failed,
+        })
+
+
+def profiled(method):
+    """Decorator recording the calls of a model method in the performance log.
+
+    To be applied where the entry point is defined, so that the measure
+    covers the overrides of the inheriting models reaching it via super().
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with profile_call(self.env, '%s.%s' % (self._name, method.__name__)) as measure:
+            measure['result'] = result = method(self, *args, **kwargs)
+        return result
+    return wrapper
+
+
+class TekprowessPerfLog(models.Model):
+    _name = 'tekprowess.perf.log'
+    _description = 'Tekprowess RPC Performance Log'
+    _order = 'id desc'
+    _log_access = False
+
+    name = fields.Char(string='Entry Point', required=True, index=True, readonly=True)
+    date = fields.Datetime(string='Date', default=fields.Datetime.now, readonly=True)
+    user_id = fields.Many2one('res.users', string='User', ondelete='set null', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', ondelete='set null', readonly=True)
+    query_count = fields.Integer(string='Queries', readonly=True, aggregator='avg')
+    sql_time = fields.Float(string='SQL Time (ms)', digits=(16, 1), readonly=True, aggregator='avg')
+    python_time = fields.Float(string='Python Time (ms)', digits=(16, 1), readonly=True, aggregator='avg')
+    total_time = fields.Float(
+        string='Total Time (ms)', digits=(16, 1), compute='_compute_total_time',
+        store=True, aggregator='avg',
+    )
+    payload_size = fields.Integer(string='Payload Size (bytes)', readonly=True, aggregator='avg')
+    failed = fields.Boolean(string='Failed', readonly=True)
+
+    @api.depends('sql_time', 'python_time')
+    def _compute_total_time(self):
+        for log in self:
+            log.total_time = log.sql_time + log.python_time
+
+    @api.model
+    def _record(self, values):
+        """Store one measure in its own transaction, so that it is kept when
+        the profiled call fails, and drop the oldest entries beyond the
+        configured buffer size."""
+        try:
+            size = int(self.env['ir.config_parameter'].sudo().get_param(
+                'tekprowess_dashboard.perf_log_size', 5000))
+            with self.env.registry.cursor() as cr:
+                log = api.Environment(cr, SUPERUSER_ID, {})[self._name].create(values)
+                cr.execute("DELETE FROM tekprowess_perf_log WHERE id <= %s", [log.id - size])
+        except Exception:
+            _logger.warning("Performance log: could not record %s", values.get('name'), exc_info=True)
@@ -1,9 +1,57 @@
 /** @odoo-module **/
 
 import { registry } from "@web/core/registry";
-import { Component, onWillStart, onMounted, onPatched, onWillUnmount, useState, useRef } from "@odoo/owl";
+import { Component, onWillStart, onMounted, onPatched, onWillUnmount, onWillDestroy, useEffect, useState, useRef } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
 
+// Each action only fetches its own section; loaded sections are shared by
+// every dashboard action, so switching back to an app needs no new round trip.
+const SECTION_TTL = 60000;
+const sectionCache = {};
+
+// Journal / operation type graphs are fetched page by page as the user scrolls
+const GRAPH_PAGE_SIZE = 12;
+
+// Manufacturing counters are kept up to date by the deltas pushed on the bus
+const KPI_CHANNEL = "tekprowess_dashboard";
+const KPI_NOTIFICATION = "tekprowess_dashboard/kpi_delta";
+
+/**
+ * Whether the changes of transaction `txid` are already counted in the
+ * manufacturing section data: the transaction was visible to the one the
+ * data was computed in, or its delta was applied already. Data without
+ * transaction snapshot is never patched, it is refreshed instead.
+ */
+function isKpiDeltaCounted(data, txid) {
+    const snapshot = data.kpi_snapshot;
+    if (!snapshot || data.kpi_applied?.includes(txid)) return true;
+    return txid < snapshot.xmin || (txid < snapshot.xmax && !snapshot.xip.includes(txid));
+}
+
+/**
+ * Apply the counter / work center deltas pushed by the server to the
+ * manufacturing section data, unless they are counted already.
+ * Returns whether the data changed.
+ */
+function applyKpiDelta(data, { txid, counters, workcenters }) {
+    if (isKpiDeltaCounted(data, txid)) return false;
+    (data.kpi_applied ||= []).push(txid);
+    for (const [key, value] of Object.entries(counters)) {
+        data[key] = (data[key] || 0) + value;
+    }
+    if (counters.month_done && data.chart_done?.length) {
+        data.chart_done[data.chart_done.length - 1] += counters.month_done;
+    }
+    for (const wc of data.workcenters || []) {
+        const done = workcenters[wc.id];
+        if (done) {
+            wc.done += done;
+            wc.pct = wc.total ? Math.round((wc.done / wc.total) * 100) : 0;
+        }
+    }
+    return true;
+}
+
 /**
  * Tekprowess Manufacturing Dashboard
  * Shows Manufacturing / Sales / Purchase section based on the `dashboard_section`
@@ -16,12 +64,15 @@ export class ManufacturingDashboard extends Component {
     setup() {
         this.orm = useService("orm");
         this.action = useService("action");
+        this.busService = useService("bus_service");
+        this.companyService = useService("company");
 
         // Determine which section to show from the action context
         const ctx = this.props.action?.context || {};
         this.section = ctx.dashboard_section || "manufacturing"; // 'manufacturing' | 'sales' | 'purchase'
 
         this.chartRef = useRef("mainChart");
+        this.graphsSentinelRef = useRef("graphsSentinel");
         this._chart = null;
         this._chartJsLoaded = false;
         this._chartsRendered = false;
@@ -29,9 +80,20 @@ export class ManufacturingDashboard extends Component {
         this.state = useState({
             loading: true,
             data: {},
+            graphs: [],
+            graphsCursor: false,
         });
 
+        // Deltas received while the data loads, applied once it is there
+        this._pendingDeltas = [];
+
         onWillStart(async () => {
+            // Listen before loading, so that no change committed meanwhile is missed
+            if (this.section === "manufacturing") {
+                this._onKpiDelta = this._onKpiDelta.bind(this);
+                this.busService.subscribe(KPI_NOTIFICATION, this._onKpiDelta);
+                this.busService.addChannel(KPI_CHANNEL);
+            }
             await this._loadChartJs();
             await this._loadData();
         });
@@ -47,9 +109,31 @@ export class ManufacturingDashboard extends Component {
             }
         });
 
+        // Load the next page of graphs when the sentinel below the grid becomes visible
+        useEffect(
+            (el) => {
+                if (!el) return;
+                const observer = new IntersectionObserver((entries) => {
+                    if (entries.some((entry) => entry.isIntersecting)) {
+                        this._loadGraphs();
+                    }
+                }, { rootMargin: "200px" });
+                observer.observe(el);
+                return () => observer.disconnect();
+            },
+            () => [this.graphsSentinelRef.el]
+        );
+
         onWillUnmount(() => {
             if (this._chart) { this._chart.destroy(); this._chart = null; }
         });
+
+        onWillDestroy(() => {
+            if (this.section === "manufacturing") {
+                this.busService.unsubscribe(KPI_NOTIFICATION, this._onKpiDelta);
+                this.busService.deleteChannel(KPI_CHANNEL);
+            }
+        });
     }
 
     // -------------------------------------------------------------------------
@@ -67,28 +151,75 @@ export class ManufacturingDashboard extends Component {
         });
     }
 
-    async _loadData() {
+    async _loadData(force = false) {
         this.state.loading = true;
-        const methodMap = {
-            manufacturing: "get_manufacturing_data",
-            sales: "get_sales_data",
-            purchase: "get_purchase_data",
-            accounting: "get_accounting_data",
-            inventory: "get_inventory_data",
-        };
-        const method = methodMap[this.section] || "get_manufacturing_data";
         try {
-            const result = await this.orm.call(
+            const cached = sectionCache[this.section];
+            if (force || !cached || Date.now() - cached.loadedAt > SECTION_TTL) {
+                const { currency_symbol, chart_labels, sections } = await this.orm.call(
+                    "tekprowess.dashboard",
+                    "get_dashboard_bundle",
+                    [],
+                    { sections: [this.section] }
+                );
+                sectionCache[this.section] = {
+                    loadedAt: Date.now(),
+                    data: { currency_symbol, chart_labels, ...(sections[this.section] || {}) },
+                };
+            }
+            const data = sectionCache[this.section].data;
+            for (const delta of this._pendingDeltas.splice(0)) {
+                applyKpiDelta(data, delta);
+            }
+            this.state.data = { ...data };
+            if (this.section === "accounting" || this.section === "inventory") {
+                await this._loadGraphs(true);
+            }
+        } catch (e) {
+            console.error("Dashboard load error:", e);
+        } finally {
+            this.state.loading = false;
+        }
+    }
+
+    async _loadGraphs(reset = false) {
+        if (this._graphsLoading || (!reset && !this.state.graphsCursor)) return;
+        this._graphsLoading = true;
+        try {
+            const method = this.section === "inventory" ? "get_inventory_graphs" : "get_journal_graphs";
+            const page = await this.orm.call(
                 "tekprowess.dashboard",
                 method,
                 [],
-                {}
+                { cursor: reset ? 0 : this.state.graphsCursor, limit: GRAPH_PAGE_SIZE }
             );
-            this.state.data = result;
+            if (reset) {
+                this.state.graphs = page.items;
+            } else {
+                this.state.graphs.push(...page.items);
+                this._renderGraphs(page.items);
+            }
+            this.state.graphsCursor = page.next_cursor;
         } catch (e) {
-            console.error("Dashboard load error:", e);
+            console.error("Dashboard graphs load error:", e);
         } finally {
-            this.state.loading = false;
+            this._graphsLoading = false;
+        }
+    }
+
+    _onKpiDelta(delta) {
+        if (!this.companyService.activeCompanyIds.includes(delta.company_id)) return;
+        if (this.state.loading) {
+            this._pendingDeltas.push(delta);
+            return;
+        }
+        const section = sectionCache.manufacturing?.data;
+        // Patch the shared section so other dashboard actions see the new figures too
+        if (!section || !applyKpiDelta(section, delta)) return;
+        this.state.data = { ...section };
+        if (this._chart) {
+            this._chart.data.datasets[1].data = section.chart_done || [];
+            this._chart.update();
         }
     }
 
@@ -97,7 +228,7 @@ export class ManufacturingDashboard extends Component {
         if (this._journalCharts) { this._journalCharts.forEach(c => c.destroy()); }
         this._journalCharts = [];
         this._chartsRendered = false;
-        await this._loadData();
+        await this._loadData(true);
     }
 
     // -------------------------------------------------------------------------
@@ -238,107 +369,70 @@ export class ManufacturingDashboard extends Component {
                 },
                 options: this._dualAxisOptions(),
             });
-
-            // Native Journal Graphs (Bank, Cash, Sale, Purchase)
-            if (d.journal_graphs && d.journal_graphs.length) {
-                setTimeout(() => {
-                    d.journal_graphs.forEach(jg => {
-                        const jCanvas = document.getElementById("journal_chart_" + jg.id);
-                        if (!jCanvas || !jg.graph_data || !jg.graph_data.length) return;
-
-                        const pdata = jg.graph_data[0].values || [];
-                        const isSample = jg.graph_data[0].is_sample_data || pdata.some(v => ["o_sample_data", "sample"].includes(v.type));
-                        const isBar = (jg.type === "sale" || jg.type === "purchase");
-
-                        const color = isSample ? "#d3d3d3" : (jg.type === "sale" ? "#27ae60" :
-                            jg.type === "purchase" ? "#e74c3c" : "#875a7b");
-
-                        const lbls = pdata.map(v => isBar ? v.label : v.x);
-                        // Zero out random Odoo mock data so empty journals don't show fake values!
-                        const vals = pdata.map(v => isSample ? 0 : (isBar ? v.value : v.y));
-
-                        const chart = new Chart(jCanvas, {
-                            type: isBar ? "bar" : "line",
-                            data: {
-                                labels: lbls,
-                                datasets: [{
-                                    label: jg.name + (isSample ? " (No Data)" : ""),
-                                    data: vals,
-                                    backgroundColor: isBar ? color : (isSample ? "rgba(211, 211, 211, 0.2)" : "rgba(135, 90, 123, 0.1)"),
-                                    borderColor: color,
-                                    borderWidth: 2,
-                                    fill: !isBar,
-                                    tension: isBar ? 0 : 0.4,
-                                    borderRadius: isBar ? 4 : 0,
-                                    pointRadius: isBar ? 0 : 2,
-                                }]
-                            },
-                            options: {
-                                responsive: true,
-                                maintainAspectRatio: false,
-                                plugins: { legend: { display: false } },
-                                scales: {
-                                    x: { grid: { display: false }, ticks: { font: { size: 10 } } },
-                                    y: { display: false }
-                                },
-                                animation: { duration: 500 }
-                            }
-                        });
-                        this._journalCharts.push(chart);
-                    });
-                }, 100);
-            }
-        } else if (this.section === "inventory") {
-            // Inventory Native Picking Type Graphs
-            if (d.inventory_graphs && d.inventory_graphs.length) {
-                setTimeout(() => {
-                    d.inventory_graphs.forEach(jg => {
-                        const jCanvas = document.getElementById("inventory_chart_" + jg.id);
-                        if (!jCanvas || !jg.graph_data || !jg.graph_data.length) return;
-
-                        const pdata = jg.graph_data[0].values || [];
-                        const isSample = jg.graph_data[0].is_sample_data || pdata.some(v => ["o_sample_data", "sample"].includes(v.type));
-                        const isBar = true; // Inventory graphs are always bars
-
-                        const color = isSample ? "#d3d3d3" : (jg.code === "incoming" ? "#27ae60" :
-                            jg.code === "outgoing" ? "#e74c3c" : "#714B67");
-
-                        const lbls = pdata.map(v => isBar ? v.label : v.x);
-                        // Zero out random Odoo mock data
-                        const vals = pdata.map(v => isSample ? 0 : (isBar ? v.value : v.y));
-
-                        const chart = new Chart(jCanvas, {
-                            type: isBar ? "bar" : "line",
-                            data: {
-                                labels: lbls,
-                                datasets: [{
-                                    label: jg.name + (isSample ? " (No Data)" : ""),
-                                    data: vals,
-                                    backgroundColor: isBar ? color : (isSample ? "rgba(211, 211, 211, 0.2)" : "rgba(135, 90, 123, 0.1)"),
-                                    borderColor: color,
-                                    borderWidth: 2,
-                                    fill: !isBar,
-                                    tension: isBar ? 0 : 0.4,
-                                    borderRadius: isBar ? 4 : 0,
-                                    pointRadius: isBar ? 0 : 2,
-                                }]
-                            },
-                            options: {
-                                responsive: true,
-                                maintainAspectRatio: false,
-                                plugins: { legend: { display: false } },
-                                scales: {
-                                    x: { grid: { display: false }, ticks: { font: { size: 10 } } },
-                                    y: { display: false }
-                                },
-                                animation: { duration: 500 }
-                            }
-                        });
-                        this._journalCharts.push(chart);
-                    });
-                }, 100);
-            }
         }
+        this._renderGraphs(this.state.graphs);
+    }
+
+    /**
+     * Render the native journal / operation type graphs of the given items.
+     */
+    _renderGraphs(items) {
+        const Chart = window.Chart;
+        if (!Chart || !items.length) return;
+        const isInventory = this.section === "inventory";
+        setTimeout(() => {
+            items.forEach(jg => {
+                const jCanvas = document.getElementById((isInventory ? "inventory_chart_" : "journal_chart_") + jg.id);
+                if (!jCanvas || !jg.graph_data || !jg.graph_data.length) return;
+
+                const pdata = jg.graph_data[0].values || [];
+                const isSample = jg.graph_data[0].is_sample_data || pdata.some(v => ["o_sample_data", "sample"].includes(v.type));
+                // Inventory graphs are always bars
+                const isBar = isInventory || jg.type === "sale" || jg.type === "purchase";
+
+                let color;
+                if (isSample) {
+                    color = "#d3d3d3";
+                } else if (isInventory) {
+                    color = jg.code === "incoming" ? "#27ae60" : jg.code === "outgoing" ? "#e74c3c" : "#714B67";
+                } else {
+                    color = jg.type === "sale" ? "#27ae60" : jg.type === "purchase" ? "#e74c3c" : "#875a7b";
+                }
+
+                const lbls = pdata.map(v => isBar ? v.label : v.x);
+                // Zero out random Odoo mock data so empty journals don't show fake values!
+                const vals = pdata.map(v => isSample ? 0 : (isBar ? v.value : v.y));
+
+                const chart = new Chart(jCanvas, {
+                    type: isBar ? "bar" : "line",
+                    data: {
+                        labels: lbls,
+                        datasets: [{
+                            label: jg.name + (isSample ? " (No Data)" : ""),
+                            data: vals,
+                            backgroundColor: isBar ? color : (isSample ? "rgba(211, 211, 211, 0.2)" : "rgba(135, 90, 123, 0.1)"),
+                            borderColor: color,
+                            borderWidth: 2,
+                            fill: !isBar,
+                            tension: isBar ? 0 : 0.4,
+                            borderRadius: isBar ? 4 : 0,
+                            pointRadius: isBar ? 0 : 2,
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: { legend: { display: false } },
+                        scales: {
+                            x: { grid: { display: false }, ticks: { font: { size: 10 } } },
+                            y: { display: false }
+                        },
+                        animation: { duration: 500 }
+                    }
+                });
+                this._journalCharts.push(chart);
+            });
+        }, 100);
     }
 
     _barOptions() {
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+
+# Number of generated records per document model for each benchmark tier
+TIERS = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+
+def _weighted_case(random_column, weights):
+    """SQL CASE expression picking one of ``weights`` values with the given
+    probability, driven by a random column in [0, 1)."""
+    total = sum(weight for _value, weight in weights)
+    cumulated = 0.0
+    clauses = []
+    for value, weight in weights[:-1]:
+        cumulated += weight / total
+        clauses.append("WHEN %s < %s THEN '%s'" % (random_column, round(cumulated, 6), value))
+    return "CASE %s ELSE '%s' END" % (' '.join(clauses), weights[-1][0])
+
+
+def _days_ago(random_column, days=365):
+    """Timestamp spread uniformly over the last ``days`` days."""
+    return "(now() AT TIME ZONE 'UTC') - %s * interval '%s days'" % (random_column, days)
+
+
+class DashboardDataGenerator:
+    """Seed the dashboard source models with realistic volumes.
+
+    A handful of template documents is created through the ORM, then cloned
+    in SQL with ``generate_series`` with randomized states, dates and amounts
+    (orders and invoices over the last year). Only the document headers read
+    by the dashboards are generated, not their lines.
+    """
+
+    def __init__(self, env):
+        self.env = env
+        self.cr = env.cr
+        self.company = env.company
+
+    def generate(self, count):
+        self.env.flush_all()
+        partner = self.env['res.partner'].create({'name': 'Benchmark Partner'})
+        if 'sale.order' in self.env:
+            self._generate_sale_orders(partner, count)
+        if 'purchase.order' in self.env:
+            self._generate_purchase_orders(partner, count)
+        if 'mrp.production' in self.env:
+            self._generate_productions(count)
+        if 'account.move' in self.env:
+            self._generate_invoices(partner, count)
+        if 'stock.picking' in self.env:
+            self._generate_pickings(partner, count)
+        self.cr.execute("ANALYZE")
+        self.env.invalidate_all()
+
+    def _clone(self, table, template_ids, count, overrides):
+        """Insert ``count`` copies of the ``template_ids`` rows of ``table``,
+        replacing the columns of ``overrides`` by SQL expressions.
+
+        The expressions may use ``gs`` (row number) and the random columns
+        ``rnd.r_state``, ``rnd.r_date``, ``rnd.r_amount``, ``rnd.r_pay`` and
+        ``rnd.r_pick``.
+        """
+        self.cr.execute("""
+            SELECT column_name FROM information_schema.columns
+             WHERE table_name = %s AND column_name != 'id'
+             ORDER BY ordinal_position
+        """, [table])
+        columns = [row[0] for row in self.cr.fetchall()]
+        select = [overrides.get(column, 't."%s"' % column) for column in columns]
+        self.cr.execute("""
+            INSERT INTO "{table}" ({columns})
+            SELECT {select}
+              FROM generate_series(1, %(count)s) AS gs
+              JOIN "{table}" t ON t.id = (%(ids)s::int[])[1 + gs %% %(nb_ids)s]
+             CROSS JOIN LATERAL (
+                SELECT random() AS r_state, random() AS r_date, random() AS r_amount,
+                       random() AS r_pay, random() AS r_pick
+                 WHERE gs IS NOT NULL
+             ) rnd
+        """.format(
+            table=table,
+            columns=', '.join('"%s"' % column for column in columns),
+            select=', '.join(select),
+        ), {'count': count, 'ids': list(template_ids), 'nb_ids': len(template_ids)})
+
+    def _max_id(self, table):
+        self.cr.execute('SELECT COALESCE(MAX(id), 0) FROM "%s"' % table)
+        return self.cr.fetchone()[0]
+
+    def _generate_sale_orders(self, partner, count):
+        template = self.env['sale.order'].create({'partner_id': partner.id})
+        self.env.flush_all()
+        self._clone('sale_order', template.ids, count, {
+            'name': "t.name || '/' || gs",
+            'state': _weighted_case('rnd.r_state', [
+                ('draft', 15), ('sent', 10), ('sale', 60), ('done', 5), ('cancel', 10),
+            ]),
+            'invoice_status': _weighted_case('rnd.r_pay', [
+                ('to invoice', 30), ('invoiced', 50), ('no', 20),
+            ]),
+            'date_order': _days_ago('rnd.r_date'),
+            'commitment_date': _days_ago('rnd.r_pick', 30),
+            'amount_total': "round((rnd.r_amount * 10000)::numeric, 2)",
+        })
+
+    def _generate_purchase_orders(self, partner, count):
+        template = self.env['purchase.order'].create({'partner_id': partner.id})
+        self.env.flush_all()
+        self._clone('purchase_order', template.ids, count, {
+            'name': "t.name || '/' || gs",
+            'state': _weighted_case('rnd.r_state', [
+                ('draft', 15), ('sent', 10), ('purchase', 60), ('done', 5), ('cancel', 10),
+            ]),
+            'invoice_status': _weighted_case('rnd.r_pay', [
+                ('to invoice', 30), ('invoiced', 50), ('no', 20),
+            ]),
+            'date_order': _days_ago('rnd.r_date'),
+            'date_planned': _days_ago('rnd.r_pick', 30),
+            'amount_total': "round((rnd.r_amount * 10000)::numeric, 2)",
+        })
+
+    def _generate_productions(self, count):
+        product = self.env['product.product'].create({'name': 'Benchmark Product', 'type': 'consu'})
+        template = self.env['mrp.production'].create({'product_id': product.id, 'product_qty': 1})
+        workcenters = self.env['mrp.workcenter'].create([
+            {'name': 'Benchmark Workcenter %s' % index} for index in range(10)
+        ])
+        workorder = self.env['mrp.workorder'].create({
+            'name': 'Benchmark Operation',
+            'production_id': template.id,
+            'workcenter_id': workcenters[0].id,
+            'product_uom_id': template.product_uom_id.id,
+        })
+        self.env.flush_all()
+
+        last_id = self._max_id('mrp_production')
+        self._clone('mrp_production', template.ids, count, {
+            'name': "t.name || '/' || gs",
+            'state': _weighted_case('rnd.r_state', [
+                ('draft', 10), ('confirmed', 25), ('progress', 15), ('to_close', 5), ('done', 40), ('cancel', 5),
+            ]),
+            'date_start': _days_ago('rnd.r_date', 180),
+            'date_finished': "%s + rnd.r_pick * interval '3 days'" % _days_ago('rnd.r_date', 180),
+        })
+        # Ids of a single INSERT are consecutive
+        self.cr.execute("SELECT MIN(id) FROM mrp_production WHERE id > %s", [last_id])
+        first_id = self.cr.fetchone()[0]
+        # Two work orders per manufacturing order on average
+        self._clone('mrp_workorder', workorder.ids, count * 2, {
+            'production_id': "(%s + floor(rnd.r_pick * %s))::int" % (first_id, count),
+            'workcenter_id': "(%s::int[])[1 + floor(rnd.r_amount * %s)::int]" % (
+                "ARRAY[%s]" % ','.join(str(wc_id) for wc_id in workcenters.ids), len(workcenters)),
+            'state': _weighted_case('rnd.r_state', [
+                ('pending', 10), ('waiting', 10), ('ready', 20), ('progress', 15), ('done', 40), ('cancel', 5),
+            ]),
+            'duration': "round((rnd.r_date * 240)::numeric, 2)",
+            'duration_expected': "round((rnd.r_pay * 240)::numeric, 2)",
+        })
+
+    def _generate_invoices(self, partner, count):
+        Journal = self.env['account.journal']
+        templates = self.env['account.move']
+        for move_type, journal_type in (('out_invoice', 'sale'), ('in_invoice', 'purchase')):
+            journal = Journal.search([('type', '=', journal_type), ('company_id', '=', self.company.id)], limit=1)
+            if journal:
+                templates |= templates.create({
+                    'move_type': move_type,
+                    'partner_id': partner.id,
+                    'journal_id': journal.id,
+                    'invoice_date': fields.Date.today(),
+                })
+        if not templates:
+            return
+        self.env.flush_all()
+        self._clone('account_move', templates.ids, count, {
+            'name': "t.name || '/' || gs",
+            'state': _weighted_case('rnd.r_state', [('draft', 10), ('posted', 85), ('cancel', 5)]),
+            'payment_state': _weighted_case('rnd.r_pay', [
+                ('paid', 45), ('not_paid', 40), ('partial', 10), ('in_payment', 5),
+            ]),
+            'date': "(%s)::date" % _days_ago('rnd.r_date'),
+            'invoice_date': "(%s)::date" % _days_ago('rnd.r_date'),
+            'invoice_date_due': "(%s + interval '30 days')::date" % _days_ago('rnd.r_date'),
+            'amount_total': "round((rnd.r_amount * 10000)::numeric, 2)",
+            'amount_residual': "CASE WHEN rnd.r_pay < 0.45 THEN 0"
+                               " ELSE round((rnd.r_amount * 10000 * rnd.r_pay)::numeric, 2) END",
+        })
+
+    def _generate_pickings(self, partner, count):
+        picking_type = self.env['stock.picking.type'].search([
+            ('code', '=', 'outgoing'), ('company_id', '=', self.company.id),
+        ], limit=1)
+        if not picking_type:
+            return
+        template = self.env['stock.picking'].create({
+            'partner_id': partner.id,
+            'picking_type_id': picking_type.id,
+        })
+        self.env.flush_all()
+        self._clone('stock_picking', template.ids, count, {
+            'name': "t.name || '/' || gs",
+            'state': _weighted_case('rnd.r_state', [
+                ('draft', 10), ('waiting', 10), ('confirmed', 15), ('assigned', 25), ('done', 35), ('cancel', 5),
+            ]),
+            'scheduled_date': "%s + interval '30 days'" % _days_ago('rnd.r_date'),
+            'date': _days_ago('rnd.r_date'),
+        })
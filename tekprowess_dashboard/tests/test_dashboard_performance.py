@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import time
+
+from odoo.tests import TransactionCase, tagged
+
+from .common import DashboardDataGenerator, TIERS
+
+_logger = logging.getLogger(__name__)
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), 'perf_baselines.json')
+
+# Allowed slowdown over the stored latency before the benchmark fails
+LATENCY_TOLERANCE = 0.5
+
+DASHBOARD_METHODS = [
+    'get_manufacturing_data',
+    'get_sales_data',
+    'get_purchase_data',
+    'get_accounting_data',
+    'get_inventory_data',
+    'get_journal_graphs',
+    'get_inventory_graphs',
+]
+
+
+@tagged('post_install', '-at_install', '-standard', 'tekprowess_dashboard_perf')
+class TestDashboardPerformance(TransactionCase):
+    """Benchmark of the dashboard endpoints on generated data.
+
+    Run with ``--test-tags tekprowess_dashboard_perf``. The volume is chosen
+    with the ``TEKPROWESS_DASHBOARD_BENCH_TIER`` environment variable (10k,
+    100k or 1m records per document model, 10k by default). With
+    ``TEKPROWESS_DASHBOARD_BENCH_UPDATE=1`` the measured figures are stored as
+    the new baselines of the tier instead of being checked. Tiers without
+    baselines are skipped; within a recorded tier, an endpoint without
+    baseline fails the benchmark.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tier = os.environ.get('TEKPROWESS_DASHBOARD_BENCH_TIER', '10k')
+        cls.update_baselines = os.environ.get('TEKPROWESS_DASHBOARD_BENCH_UPDATE') == '1'
+        DashboardDataGenerator(cls.env).generate(TIERS[cls.tier])
+
+        # Measure the computations, not the cache or the snapshots, and keep
+        # the performance log out of the measures (it writes in its own cursor)
+        ICP = cls.env['ir.config_parameter'].sudo()
+        ICP.set_param('tekprowess_dashboard.cache_ttl', 0)
+        ICP.set_param('tekprowess_dashboard.snapshot_max_age', 0)
+        ICP.set_param('tekprowess_dashboard.perf_log_enabled', False)
+
+        with open(BASELINES_FILE) as baselines_file:
+            cls.baselines = json.load(baselines_file)
+
+    def _measure(self, method):
+        """Return the number of queries and the time (ms) of one call."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries_before = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        getattr(self.env['tekprowess.dashboard'], method)()
+        elapsed = (time.perf_counter() - start) * 1000
+        return self.env.cr.sql_log_count - queries_before, elapsed
+
+    def test_dashboard_endpoints(self):
+        baselines = self.baselines.get(self.tier, {})
+        if not baselines and not self.update_baselines:
+            self.skipTest("No %s baselines, record them with TEKPROWESS_DASHBOARD_BENCH_UPDATE=1" % self.tier)
+        measures = {}
+        for method in DASHBOARD_METHODS:
+            with self.subTest(method=method):
+                queries, elapsed = self._measure(method)
+                _logger.info("Dashboard benchmark [%s] %s: %d queries, %.0f ms",
+                             self.tier, method, queries, elapsed)
+                measures[method] = {'queries': queries, 'ms': round(elapsed)}
+
+                if self.update_baselines:
+                    continue
+                baseline = baselines.get(method)
+                self.assertTrue(
+                    baseline,
+                    "No %s baseline for %s, record them with TEKPROWESS_DASHBOARD_BENCH_UPDATE=1"
+                    % (self.tier, method))
+                self.assertLessEqual(
+                    queries, baseline['queries'],
+                    "%s issues more queries than its baseline" % method)
+                self.assertLessEqual(
+                    elapsed, baseline['ms'] * (1 + LATENCY_TOLERANCE),
+                    "%s is slower than its baseline" % method)
+
+        if self.update_baselines:
+            self.baselines[self.tier] = measures
+            with open(BASELINES_FILE, 'w') as baselines_file:
+                json.dump(self.baselines, baselines_file, indent=4, sort_keys=True)
@@ -14,3 +14,4 @@ from . import stock_move
 from . import menu
 from . import mrp_maintenance_inheritance
 from . import stock_scrap
+from . import gantt
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+from odoo.addons.tekprowess_dashboard.models.perf_log import profiled
+
+
+class Base(models.AbstractModel):
+    _inherit = 'base'
+
+    # Gantt entry points of the production and work order planning, recorded
+    # in the performance log
+
+    @api.model
+    @profiled
+    def get_gantt_data(self, *args, **kwargs):
+        return super().get_gantt_data(*args, **kwargs)
+
+    @api.model
+    @profiled
+    def web_gantt_reschedule(self, *args, **kwargs):
+        return super().web_gantt_reschedule(*args, **kwargs)